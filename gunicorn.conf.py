@@ -0,0 +1,43 @@
+"""
+gunicorn.conf.py
+
+Configuração do gunicorn para a API UpPath:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+A aplicação é carregada no processo mestre (`preload_app`) e cada worker, logo
+após o fork, cria o próprio pool de conexões e se aquece (sessões mínimas,
+cache de comandos e dados de referência) em segundo plano: até terminar,
+`/api/v1/ready` responde 503. Assim um banco fora do ar não prende o worker
+no hook e ele não é morto pelo `timeout` em ciclo.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', f'0.0.0.0:{os.getenv("PORT", "5000")}')
+workers = int(os.getenv('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Conexões e threads não podem ser herdadas do mestre: tudo é criado aqui
+    from src.api import amostrador, aquecimento
+
+    amostrador.iniciar()
+    aquecimento.aquecer_em_segundo_plano()
+
+
+def worker_exit(server, worker):
+    from src.services import DAO as db
+
+    db.fechar_pool()
@@ -0,0 +1,300 @@
+"""
+admissao.py
+
+Controle de admissão das rotas que usam o banco.
+
+Cada worker tem um portão com um número máximo de requisições em execução e
+uma fila curta. Quem não consegue vaga dentro do tempo máximo de espera (ou
+encontra a fila cheia) recebe `503` com `Retry-After` imediatamente, em vez de
+ficar preso em `db.get_cursor()` até o timeout do gunicorn.
+
+Nas rotas `/dashboard/company/<id_empresa>/...` a requisição entra com a
+empresa como chave (`vaga(id_empresa)`):
+    - cada empresa tem uma quota de requisições simultâneas;
+    - a fila é atendida por *weighted fair queuing*: cada requisição recebe um
+      tempo virtual de término (`início + 1/peso`) e a vaga vai para a de menor
+      tempo cuja empresa esteja abaixo da quota. Uma empresa com muitas
+      requisições enfileiradas não passa na frente das demais.
+
+Esperas feitas fora do portão, como a de requisições coalescidas pelo
+cálculo de outra (`aguardando()`), ocupam lugares da mesma fila.
+"""
+
+import functools
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from src.config import get_admissao_config
+from src.services import metricas
+
+
+class Saturado(Exception):
+    """Portão sem vaga: a requisição deve ser rejeitada com 503."""
+
+    def __init__(self, portao: str, motivo: str, retry_after: int):
+        super().__init__(f'{portao}: {motivo}')
+        self.portao = portao
+        self.motivo = motivo
+        self.retry_after = retry_after
+
+
+class _Espera:
+    __slots__ = ('chave', 'fim', 'seq', 'vez')
+
+    def __init__(self, chave, fim: float, seq: int):
+        self.chave = chave
+        self.fim = fim
+        self.seq = seq
+        self.vez = threading.Event()
+
+
+class Portao:
+    """Limite de concorrência com quotas por chave e fila justa ponderada.
+
+    Requisições sem chave (`chave=None`) só respeitam o limite global.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        limite: int,
+        fila: int,
+        espera: float,
+        retry_after: int,
+        quota: int = None,
+        quotas: Dict = None,
+        pesos: Dict = None,
+    ):
+        self.nome = nome
+        self.limite = limite
+        self.fila_maxima = fila
+        self.espera = espera
+        self.retry_after = retry_after
+        self.quota_padrao = quota or limite
+        self.quotas = dict(quotas or {})
+        self.pesos = dict(pesos or {})
+        self._lock = threading.Lock()
+        self._em_execucao = 0
+        self._por_chave: Dict[object, int] = {}
+        self._fila = []
+        self._aguardando = 0
+        self._virtual = 0.0
+        self._ultimo_fim: Dict[object, float] = {}
+        self._seq = itertools.count()
+        self._publicar()
+
+    def _quota(self, chave) -> int:
+        if chave is None:
+            return self.limite
+        return self.quotas.get(chave, self.quota_padrao)
+
+    def _pode_executar(self, chave) -> bool:
+        return (
+            self._em_execucao < self.limite
+            and self._por_chave.get(chave, 0) < self._quota(chave)
+        )
+
+    def _ocupar(self, chave) -> None:
+        self._em_execucao += 1
+        self._por_chave[chave] = self._por_chave.get(chave, 0) + 1
+
+    def _publicar(self, chave=None) -> None:
+        metricas.admissao_em_execucao.set(self.nome, valor=self._em_execucao)
+        metricas.admissao_na_fila.set(
+            self.nome, valor=len(self._fila) + self._aguardando
+        )
+        if chave is not None:
+            metricas.admissao_empresa_em_execucao.set(
+                self.nome, chave, valor=self._por_chave.get(chave, 0)
+            )
+
+    def _rejeitar(self, motivo: str):
+        metricas.admissao_rejeitadas.inc(self.nome, motivo)
+        return Saturado(self.nome, motivo, self.retry_after)
+
+    def _fila_cheia(self) -> bool:
+        return len(self._fila) + self._aguardando >= self.fila_maxima
+
+    def _despachar(self) -> None:
+        """Entrega vagas livres às esperas elegíveis de menor tempo virtual."""
+        while self._fila and self._em_execucao < self.limite:
+            elegiveis = [e for e in self._fila if self._pode_executar(e.chave)]
+            if not elegiveis:
+                return
+            proxima = min(elegiveis, key=lambda e: (e.fim, e.seq))
+            self._fila.remove(proxima)
+            self._virtual = max(self._virtual, proxima.fim)
+            self._ocupar(proxima.chave)
+            self._publicar(proxima.chave)
+            proxima.vez.set()
+
+    def entrar(self, chave=None) -> None:
+        """Ocupa uma vaga, esperando na fila; levanta `Saturado` se não conseguir."""
+        with self._lock:
+            if not self._fila and self._pode_executar(chave):
+                self._ocupar(chave)
+                self._publicar(chave)
+                return
+            if self._fila_cheia():
+                raise self._rejeitar('fila_cheia')
+            if chave is not None and sum(
+                1 for e in self._fila if e.chave == chave
+            ) >= 2 * self._quota(chave):
+                raise self._rejeitar('cota_empresa')
+            inicio_virtual = max(self._virtual, self._ultimo_fim.get(chave, 0.0))
+            fim = inicio_virtual + 1.0 / self.pesos.get(chave, 1.0)
+            self._ultimo_fim[chave] = fim
+            espera = _Espera(chave, fim, next(self._seq))
+            self._fila.append(espera)
+            self._publicar()
+            # Pode haver vaga para esta chave mesmo com fila (outras no limite)
+            self._despachar()
+
+        inicio = time.perf_counter()
+        liberado = espera.vez.wait(self.espera)
+        with self._lock:
+            # A vaga pode ter sido entregue logo após o timeout
+            if not (liberado or espera.vez.is_set()):
+                self._fila.remove(espera)
+                self._publicar()
+                metricas.admissao_espera.observar(
+                    self.nome, valor=time.perf_counter() - inicio
+                )
+                raise self._rejeitar('espera')
+        metricas.admissao_espera.observar(self.nome, valor=time.perf_counter() - inicio)
+
+    def reservar_espera(self) -> None:
+        """Ocupa um lugar na fila para uma espera feita fora do portão."""
+        with self._lock:
+            if self._fila_cheia():
+                raise self._rejeitar('fila_cheia')
+            self._aguardando += 1
+            self._publicar()
+
+    def liberar_espera(self) -> None:
+        with self._lock:
+            self._aguardando -= 1
+            self._publicar()
+
+    def sair(self, chave=None) -> None:
+        """Libera a vaga e a entrega à próxima espera elegível."""
+        with self._lock:
+            self._em_execucao -= 1
+            restantes = self._por_chave.get(chave, 1) - 1
+            if restantes:
+                self._por_chave[chave] = restantes
+            else:
+                self._por_chave.pop(chave, None)
+                if not any(e.chave == chave for e in self._fila):
+                    self._ultimo_fim.pop(chave, None)
+            self._publicar(chave)
+            self._despachar()
+
+    def estado(self):
+        with self._lock:
+            return {
+                'em_execucao': self._em_execucao,
+                'na_fila': len(self._fila),
+                'aguardando': self._aguardando,
+                'por_chave': dict(self._por_chave),
+            }
+
+
+_portao = None
+_portao_lock = threading.Lock()
+
+
+def portao() -> Optional[Portao]:
+    """Portão das rotas de banco deste processo (None se desligado)."""
+    global _portao
+    if _portao is None:
+        with _portao_lock:
+            if _portao is None:
+                cfg = get_admissao_config()
+                if cfg['limite'] <= 0:
+                    return None
+                _portao = Portao(
+                    'db',
+                    cfg['limite'],
+                    cfg['fila'],
+                    cfg['espera'],
+                    cfg['retry_after'],
+                    quota=cfg['quota'],
+                    quotas=cfg['quotas'],
+                    pesos=cfg['pesos'],
+                )
+    return _portao
+
+
+@contextmanager
+def vaga(chave=None):
+    """Ocupa uma vaga no portão durante o bloco (levanta `Saturado` se não houver)."""
+    atual = portao()
+    if atual is None:
+        yield
+        return
+    atual.entrar(chave)
+    try:
+        yield
+    finally:
+        atual.sair(chave)
+
+
+@contextmanager
+def aguardando():
+    """Conta o bloco como um lugar na fila do portão (levanta `Saturado` se cheia).
+
+    Para esperas que não ocupam vaga mas prendem a thread da requisição, como
+    a de quem aguarda o cálculo coalescido de outra requisição.
+    """
+    atual = portao()
+    if atual is None:
+        yield
+        return
+    atual.reservar_espera()
+    try:
+        yield
+    finally:
+        atual.liberar_espera()
+
+
+def saturado(motivo: str) -> Saturado:
+    """`Saturado` do portão deste processo para uma espera que se esgotou fora dele."""
+    atual = portao()
+    if atual is None:
+        return Saturado('db', motivo, get_admissao_config()['retry_after'])
+    return atual._rejeitar(motivo)
+
+
+def ocupar(chave=None) -> Callable[[], None]:
+    """Ocupa uma vaga fora de um bloco `with` e retorna a função que a libera.
+
+    Para respostas em streaming, cuja vaga (e conexão) dura até o fim do envio.
+    A função pode ser chamada mais de uma vez; só a primeira libera.
+    """
+    atual = portao()
+    if atual is None:
+        return lambda: None
+    atual.entrar(chave)
+    liberada = threading.Event()
+
+    def liberar():
+        if not liberada.is_set():
+            liberada.set()
+            atual.sair(chave)
+
+    return liberar
+
+
+def limitar(func):
+    """Decorator para funções que usam o banco: passa pelo portão de admissão."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with vaga():
+            return func(*args, **kwargs)
+
+    return wrapper
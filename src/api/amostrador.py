@@ -0,0 +1,169 @@
+"""
+amostrador.py
+
+Profiler estatístico contínuo: uma thread em segundo plano lê as pilhas de
+todas as threads do worker (`sys._current_frames()`) em uma frequência fixa e
+agrega as pilhas no formato "collapsed" (uma linha `f1;f2;f3 contagem`),
+aceito por flamegraph.pl, speedscope e similares.
+
+As contagens ficam em fatias de tempo; só as fatias dentro da janela
+(`UPPATH_SAMPLER_JANELA`) são mantidas. O intervalo entre amostras se ajusta
+para que a coleta nunca ocupe mais que ~1% do tempo do processo.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Optional
+
+from src.config import get_sampler_hz, get_sampler_janela
+from src.services import metricas
+
+logger = logging.getLogger(__name__)
+
+# Fração máxima do tempo que a coleta pode consumir
+CUSTO_MAXIMO = 0.01
+
+# Duração (s) de cada fatia da janela
+_FATIA = 10.0
+
+# Funções em que threads ociosas ficam bloqueadas (excluídas com ociosas=False)
+_OCIOSAS = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socketserver.py', 'serve_forever'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+}
+
+
+class Amostrador:
+    """Coleta periódica de pilhas agregadas em uma janela deslizante."""
+
+    def __init__(self, hz: float, janela: float):
+        self.intervalo = 1.0 / hz
+        self.janela = janela
+        self._fatias = deque()  # (inicio da fatia, Counter de pilhas)
+        self._rotulos: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.amostras = 0
+        self.custo = 0.0
+        self.inicio = time.monotonic()
+
+    def _rotulo(self, code) -> str:
+        rotulo = self._rotulos.get(code)
+        if rotulo is None:
+            arquivo = os.path.basename(code.co_filename)
+            rotulo = self._rotulos[code] = f'{code.co_name} ({arquivo}:{code.co_firstlineno})'
+        return rotulo
+
+    def _coletar(self) -> None:
+        propria = threading.get_ident()
+        pilhas = []
+        for ident, frame in sys._current_frames().items():
+            if ident == propria:
+                continue
+            partes = []
+            while frame is not None:
+                partes.append(self._rotulo(frame.f_code))
+                frame = frame.f_back
+            partes.reverse()
+            pilhas.append(';'.join(partes))
+
+        agora = time.monotonic()
+        with self._lock:
+            if not self._fatias or agora - self._fatias[-1][0] >= _FATIA:
+                self._fatias.append((agora, Counter()))
+                while self._fatias and agora - self._fatias[0][0] > self.janela:
+                    self._fatias.popleft()
+            self._fatias[-1][1].update(pilhas)
+
+    def _loop(self) -> None:
+        espera = self.intervalo
+        while not self._parar.wait(espera):
+            inicio = time.perf_counter()
+            try:
+                self._coletar()
+            except Exception as e:  # nunca derrubar o worker por causa do profiler
+                logger.error(f'Erro no amostrador de pilhas: {e}')
+            custo = time.perf_counter() - inicio
+            self.amostras += 1
+            self.custo += custo
+            metricas.amostrador_amostras.inc()
+            metricas.amostrador_segundos.inc(valor=custo)
+            # Respeita o limite de custo mesmo com muitas threads/pilhas profundas
+            espera = max(self.intervalo, custo / CUSTO_MAXIMO - custo)
+
+    def iniciar(self) -> None:
+        self._thread = threading.Thread(
+            target=self._loop, name='uppath-amostrador', daemon=True
+        )
+        self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def collapsed(self, segundos: float = None, ociosas: bool = True) -> str:
+        """Pilhas da janela (ou dos últimos `segundos`) no formato collapsed."""
+        limite = time.monotonic() - (segundos or self.janela) - _FATIA
+        total = Counter()
+        with self._lock:
+            for inicio, contagens in self._fatias:
+                if inicio >= limite:
+                    total.update(contagens)
+        linhas = []
+        for pilha, contagem in total.most_common():
+            if not ociosas and _ociosa(pilha):
+                continue
+            linhas.append(f'{pilha} {contagem}')
+        return '\n'.join(linhas) + ('\n' if linhas else '')
+
+    def estatisticas(self) -> Dict[str, float]:
+        decorrido = time.monotonic() - self.inicio
+        return {
+            'frequencia_hz': 1.0 / self.intervalo,
+            'janela_segundos': self.janela,
+            'amostras': self.amostras,
+            'custo_relativo': self.custo / decorrido if decorrido else 0.0,
+        }
+
+
+def _ociosa(pilha: str) -> bool:
+    folha = pilha.rsplit(';', 1)[-1]
+    nome, _, local = folha.partition(' (')
+    return (local.split(':', 1)[0], nome) in _OCIOSAS
+
+
+_amostrador: Optional[Amostrador] = None
+_pid: Optional[int] = None
+
+
+def iniciar() -> Optional[Amostrador]:
+    """Inicia o amostrador do processo atual, se `UPPATH_SAMPLER_HZ` > 0.
+
+    Seguro para chamar mais de uma vez e após `fork` (threads não sobrevivem
+    ao fork; o worker filho cria o próprio amostrador).
+    """
+    global _amostrador, _pid
+    hz = get_sampler_hz()
+    if hz <= 0:
+        return None
+    if _amostrador is not None and _pid == os.getpid():
+        return _amostrador
+    _amostrador = Amostrador(hz, get_sampler_janela())
+    _pid = os.getpid()
+    _amostrador.iniciar()
+    logger.info(f'Amostrador de pilhas ativo ({hz:g} Hz, pid {_pid}).')
+    return _amostrador
+
+
+def atual() -> Optional[Amostrador]:
+    """Amostrador ativo neste processo (ou None)."""
+    return _amostrador if _pid == os.getpid() else None
@@ -9,6 +9,7 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
 # Adicionar raiz do projeto ao path
@@ -16,6 +17,7 @@ project_root = Path(__file__).parent.parent.parent.resolve()
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
+from src.api import amostrador, instrumentacao, profiling  # noqa: E402
 from src.api.routes import api_bp  # noqa: E402
 
 # Carregar variáveis de ambiente
@@ -23,9 +25,20 @@ env_path = project_root / '.env'
 load_dotenv(dotenv_path=env_path)
 
 
+class _JSONProvider(DefaultJSONProvider):
+    """Serializa registros compactos (`src.models.registros`) via `to_json()`."""
+
+    @staticmethod
+    def default(obj):
+        if hasattr(obj, 'to_json'):
+            return obj.to_json()
+        return DefaultJSONProvider.default(obj)
+
+
 def create_app():
     """Factory function para criar a aplicação Flask."""
     app = Flask(__name__)
+    app.json = _JSONProvider(app)
 
     # Configurações
     app.config['JSON_SORT_KEYS'] = False
@@ -38,13 +51,29 @@ def create_app():
             r'/api/*': {
                 'origins': '*',  # Em produção, especifique os domínios permitidos
                 'methods': ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-                'allow_headers': ['Content-Type', 'Authorization'],
+                'allow_headers': [
+                    'Content-Type',
+                    'Authorization',
+                    'X-Request-Id',
+                    'X-Admin-Token',
+                ],
+                'expose_headers': [
+                    'Server-Timing',
+                    'X-Request-Id',
+                    'ETag',
+                    'Content-Range',
+                    'Accept-Ranges',
+                ],
             }
         },
     )
 
     # Registrar blueprints
     app.register_blueprint(api_bp)
+    instrumentacao.registrar(app)
+    profiling.registrar(app)
+    # O amostrador (thread) não é iniciado aqui: com `preload_app` esta função
+    # roda no mestre do gunicorn; ele é iniciado no `post_fork` de cada worker
 
     @app.route('/')
     def index():
@@ -65,6 +94,7 @@ def create_app():
 
 if __name__ == '__main__':
     app = create_app()
+    amostrador.iniciar()
     print('=' * 60)
     print('UpPath API - Servidor iniciado')
     print('=' * 60)
@@ -0,0 +1,117 @@
+"""
+aquecimento.py
+
+Aquecimento do worker antes de receber tráfego: cria o pool de conexões,
+abre as sessões mínimas, executa uma vez cada comando dos dashboards em cada
+sessão (preenchendo o cache de comandos do driver) e carrega os dados de
+referência.
+
+Disparado em segundo plano pelo hook `post_fork` do `gunicorn.conf.py`;
+`/api/v1/ready` só responde pronto depois que o aquecimento terminar com
+sucesso (e o dispara de novo se ele falhou).
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from src.services import DAO as db
+from src.services import consultas, referencia
+
+logger = logging.getLogger(__name__)
+
+# ID inexistente: os comandos são preparados e executados sem retornar linhas
+_ID_AQUECIMENTO = -1
+
+_CONSULTAS_EMPRESA = (
+    consultas.consulta_distribuicao_nivel_carreira,
+    consultas.consulta_media_bem_estar_empresa,
+    consultas.consulta_trilhas_mais_utilizadas_empresa,
+    consultas.consulta_funcionarios_baixa_motivacao,
+)
+_CONSULTAS_USUARIO = (
+    consultas.consulta_bem_estar_user,
+    consultas.consulta_progresso_trilhas_user,
+    consultas.consulta_recomendacoes_user,
+)
+
+_lock = threading.Lock()
+_estado: Dict[str, object] = {
+    'pronto': False,
+    'em_andamento': False,
+    'erro': None,
+    'duracao': None,
+}
+
+
+def _erro(resultado) -> Optional[str]:
+    """Mensagem de erro devolvida por uma consulta (`{'error'}`/`[{'error'}]`)."""
+    if isinstance(resultado, list) and resultado:
+        resultado = resultado[0]
+    if isinstance(resultado, dict) and 'error' in resultado:
+        return str(resultado['error'])
+    return None
+
+
+def _preparar_comandos(conn) -> None:
+    cur = conn.cursor()
+    try:
+        for consulta in _CONSULTAS_EMPRESA + _CONSULTAS_USUARIO:
+            # As consultas capturam os erros e os devolvem no resultado: um
+            # comando que falhou aqui não pode deixar o worker "pronto"
+            erro = _erro(consulta(cur, _ID_AQUECIMENTO))
+            if erro is not None:
+                raise RuntimeError(f'{consulta.__name__}: {erro}')
+    finally:
+        cur.close()
+
+
+def aquecer() -> bool:
+    """Executa o aquecimento no processo atual; retorna True se concluído."""
+    with _lock:
+        if _estado['pronto'] or _estado['em_andamento']:
+            return bool(_estado['pronto'])
+        _estado['em_andamento'] = True
+
+    inicio = time.perf_counter()
+    erro: Optional[str] = None
+    try:
+        pool = db.criar_pool()
+        # Segura `min` conexões ao mesmo tempo para aquecer sessões distintas
+        conexoes = [pool.acquire() for _ in range(max(pool.min, 1))]
+        try:
+            for conn in conexoes:
+                _preparar_comandos(conn)
+        finally:
+            for conn in conexoes:
+                conn.close()
+        carregados = referencia.carregar()
+        logger.info(
+            f'Aquecimento concluído em {time.perf_counter() - inicio:.2f}s '
+            f'({len(conexoes)} sessão(ões), {carregados["empresas"]} empresa(s), '
+            f'{carregados["trilhas"]} trilha(s), {carregados["cursos"]} curso(s)).'
+        )
+    except Exception as e:
+        erro = str(e)
+        logger.error(f'Erro no aquecimento do worker: {e}')
+
+    with _lock:
+        _estado['em_andamento'] = False
+        _estado['pronto'] = erro is None
+        _estado['erro'] = erro
+        _estado['duracao'] = time.perf_counter() - inicio
+    return erro is None
+
+
+def aquecer_em_segundo_plano() -> None:
+    """Dispara o aquecimento em uma thread (ex: fora do gunicorn ou após falha)."""
+    with _lock:
+        if _estado['pronto'] or _estado['em_andamento']:
+            return
+    threading.Thread(target=aquecer, name='uppath-aquecimento', daemon=True).start()
+
+
+def estado() -> Dict[str, object]:
+    with _lock:
+        return dict(_estado)
@@ -0,0 +1,126 @@
+"""
+cache_dashboard.py
+
+Cache em memória (por worker) das últimas respostas bem-sucedidas dos
+dashboards corporativos, com descarte LRU por quantidade de entradas.
+
+- Com o banco indisponível (disjuntor aberto), as rotas respondem com a
+  última versão conhecida em vez de erro.
+- Nos dashboards corporativos, *stale-while-revalidate*: passado o TTL
+  "soft" a resposta em cache continua sendo usada e uma única atualização é
+  feita em segundo plano; passado o TTL "hard" ela é recalculada na hora.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from src.config import get_cache_dashboard_entradas, get_swr_config
+from src.services import metricas
+
+logger = logging.getLogger(__name__)
+
+
+def possui_erro(dados: Any) -> bool:
+    """Indica se o resultado (ou alguma seção dele) é um erro das consultas."""
+    if isinstance(dados, dict):
+        if 'error' in dados:
+            return True
+        return any(possui_erro(v) for v in dados.values() if isinstance(v, (dict, list)))
+    if isinstance(dados, list) and dados:
+        primeiro = dados[0]
+        return isinstance(primeiro, dict) and 'error' in primeiro
+    return False
+
+
+class CacheDashboard:
+    def __init__(self, nome: str, max_entradas: int):
+        self.nome = nome
+        self.max_entradas = max_entradas
+        self._dados: 'OrderedDict[Hashable, Tuple[Any, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._revalidando = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidacoes = 0
+        self.revalidacoes_erro = 0
+        metricas.registrar_cache(nome, self.estatisticas)
+
+    def obter(self, chave: Hashable) -> Optional[Tuple[Any, float]]:
+        """Retorna (dados, idade em segundos) ou None."""
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                self.misses += 1
+                return None
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            dados, guardado_em = item
+        return dados, time.monotonic() - guardado_em
+
+    def guardar(self, chave: Hashable, dados: Any) -> None:
+        if not self.max_entradas or possui_erro(dados):
+            return
+        with self._lock:
+            self._dados[chave] = (dados, time.monotonic())
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_entradas:
+                self._dados.popitem(last=False)
+
+    def _pool_threads(self) -> ThreadPoolExecutor:
+        # Threads não sobrevivem ao fork: cada worker cria o próprio pool
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=get_swr_config()['threads'],
+                thread_name_prefix='uppath-revalidacao',
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def revalidar(self, chave: Hashable, calcular: Callable[[], Any]) -> None:
+        """Agenda uma atualização da chave em segundo plano (uma por vez por chave)."""
+        with self._lock:
+            if chave in self._revalidando:
+                return
+            self._revalidando.add(chave)
+            executor = self._pool_threads()
+        executor.submit(self._revalidar, chave, calcular)
+
+    def _revalidar(self, chave: Hashable, calcular: Callable[[], Any]) -> None:
+        try:
+            dados = calcular()
+            if possui_erro(dados):
+                self.revalidacoes_erro += 1
+                logger.warning(f'Falha ao atualizar cache de {chave[0]}: resultado com erro')
+                return
+            self.guardar(chave, dados)
+            self.revalidacoes += 1
+        except Exception as e:
+            self.revalidacoes_erro += 1
+            logger.warning(f'Falha ao atualizar cache de {chave[0]}: {e}')
+        finally:
+            with self._lock:
+                self._revalidando.discard(chave)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._dados.clear()
+
+    def estatisticas(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._dados),
+                'revalidations': self.revalidacoes,
+                'revalidation_errors': self.revalidacoes_erro,
+            }
+
+
+cache = CacheDashboard('dashboard', get_cache_dashboard_entradas())
@@ -0,0 +1,195 @@
+"""
+coalescencia.py
+
+Coalescência (*single-flight*) de requisições idênticas simultâneas.
+
+Dentro do worker, a primeira requisição de uma chave (rota + parâmetros)
+executa o cálculo e as demais que chegarem enquanto ele está em andamento
+aguardam e recebem o mesmo resultado (ou a mesma exceção).
+
+Com `UPPATH_COALESCER_DIR` definido, a coalescência também vale entre os
+workers da máquina: o cálculo é feito sob uma trava de arquivo (`flock`) e o
+resultado é gravado em JSON no mesmo diretório; quem obtém a trava depois e
+encontra um resultado gravado após o início da sua espera usa esse resultado.
+Em sistemas sem `fcntl` (Windows) apenas a coalescência no worker é usada.
+Travas e resultados sem uso há mais que o dobro da espera (no mínimo
+`INTERVALO_LIMPEZA` segundos) são removidos por uma varredura feita no máximo
+a cada `INTERVALO_LIMPEZA` segundos por worker.
+
+Quem espera (no worker ou pela trava) ocupa um lugar na fila do controle de
+admissão (`admissao.aguardando()`) e, passado `UPPATH_COALESCER_ESPERA_S`,
+desiste com `admissao.Saturado` (503): calcular sozinho multiplicaria o
+trabalho justamente quando o cálculo está lento.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from src.api import admissao
+from src.config import get_coalescer_dir, get_coalescer_espera
+from src.services import metricas
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo (s) entre varreduras dos arquivos antigos em cada worker
+INTERVALO_LIMPEZA = 60.0
+
+
+class _Chamada:
+    __slots__ = ('pronta', 'resultado', 'erro')
+
+    def __init__(self):
+        self.pronta = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+_lock = threading.Lock()
+_em_andamento: Dict[Hashable, _Chamada] = {}
+_ultima_limpeza = float('-inf')
+
+
+def _serializar(obj):
+    if hasattr(obj, 'to_json'):
+        return obj.to_json()
+    return str(obj)
+
+
+def _idade_maxima() -> float:
+    # Um resultado só é aproveitado por quem começou a esperar depois de o
+    # cálculo começar, então arquivos bem mais velhos que a espera não servem
+    return max(2 * get_coalescer_espera(), INTERVALO_LIMPEZA)
+
+
+def _limpar(diretorio: str) -> None:
+    """Remove travas, resultados e temporários sem uso há `_idade_maxima()` s."""
+    global _ultima_limpeza
+    agora = time.monotonic()
+    with _lock:
+        if agora - _ultima_limpeza < INTERVALO_LIMPEZA:
+            return
+        _ultima_limpeza = agora
+
+    corte = time.time() - _idade_maxima()
+    removidos = 0
+    try:
+        entradas = list(os.scandir(diretorio))
+    except OSError as e:
+        logger.warning(f'Falha ao listar {diretorio}: {e}')
+        return
+    for entrada in entradas:
+        if not entrada.name.endswith(('.lock', '.json', '.tmp')):
+            continue
+        try:
+            if entrada.stat().st_mtime >= corte:
+                continue
+            if entrada.name.endswith('.lock'):
+                # Só remove travas livres (quem a usa agora segura o flock)
+                with open(entrada.path, 'a') as trava:
+                    try:
+                        fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                    os.unlink(entrada.path)
+            else:
+                os.unlink(entrada.path)
+            removidos += 1
+        except OSError:
+            continue
+    if removidos:
+        logger.debug(f'Coalescência: {removidos} arquivo(s) antigo(s) removido(s).')
+
+
+def _entre_workers(chave: Hashable, calcular: Callable[[], Any], diretorio: str) -> Any:
+    nome = hashlib.sha1(repr(chave).encode()).hexdigest()
+    caminho_trava = os.path.join(diretorio, f'{nome}.lock')
+    caminho_resultado = os.path.join(diretorio, f'{nome}.json')
+    inicio = time.time()
+    limite = time.monotonic() + get_coalescer_espera()
+
+    with open(caminho_trava, 'a') as trava:
+        try:
+            fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            with admissao.aguardando():
+                while True:
+                    if time.monotonic() >= limite:
+                        raise admissao.saturado('coalescencia')
+                    time.sleep(0.01)
+                    try:
+                        fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        pass
+        try:
+            # Marca a trava como em uso para a limpeza não removê-la
+            os.utime(caminho_trava)
+            try:
+                if os.path.getmtime(caminho_resultado) >= inicio:
+                    with open(caminho_resultado, encoding='utf-8') as arquivo:
+                        resultado = json.load(arquivo)
+                    metricas.coalescidas.inc('arquivo')
+                    return resultado
+            except (OSError, ValueError):
+                pass
+
+            resultado = calcular()
+            try:
+                fd, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as arquivo:
+                    json.dump(resultado, arquivo, ensure_ascii=False, default=_serializar)
+                os.replace(temporario, caminho_resultado)
+            except (OSError, TypeError, ValueError):
+                pass
+            return resultado
+        finally:
+            fcntl.flock(trava, fcntl.LOCK_UN)
+            _limpar(diretorio)
+
+
+def _calcular(chave: Hashable, calcular: Callable[[], Any]) -> Any:
+    diretorio = get_coalescer_dir()
+    if diretorio and fcntl is not None:
+        os.makedirs(diretorio, exist_ok=True)
+        return _entre_workers(chave, calcular, diretorio)
+    return calcular()
+
+
+def executar(chave: Hashable, calcular: Callable[[], Any]) -> Any:
+    """Executa `calcular()` uma única vez por chave entre chamadas simultâneas."""
+    with _lock:
+        chamada = _em_andamento.get(chave)
+        lider = chamada is None
+        if lider:
+            chamada = _em_andamento[chave] = _Chamada()
+
+    if not lider:
+        with admissao.aguardando():
+            if not chamada.pronta.wait(get_coalescer_espera()):
+                raise admissao.saturado('coalescencia')
+        metricas.coalescidas.inc('processo')
+        if chamada.erro is not None:
+            raise chamada.erro
+        return chamada.resultado
+
+    try:
+        chamada.resultado = _calcular(chave, calcular)
+        return chamada.resultado
+    except Exception as e:
+        chamada.erro = e
+        raise
+    finally:
+        with _lock:
+            _em_andamento.pop(chave, None)
+        chamada.pronta.set()
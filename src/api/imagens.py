@@ -0,0 +1,296 @@
+"""
+imagens.py
+
+Entrega das imagens (BLOB) de trilhas e cursos.
+
+- A conexão e a vaga no controle de admissão só são usadas para ler o LOB:
+  imagens de até um bloco são lidas de uma vez para a memória; maiores são
+  copiadas em blocos para um arquivo temporário (em memória até um bloco) e
+  enviadas dele. Conexão e vaga são liberadas antes do envio, então clientes
+  lentos não prendem o pool nem as vagas dos dashboards.
+- Content-Type e Content-Length vêm das colunas de metadados
+  (`imagem_*_mime`, `imagem_*_tamanho`).
+- ETag forte a partir da versão da imagem (`imagem_*_versao`, marcada por
+  trigger quando a imagem muda) e do tamanho, com If-None-Match (304),
+  Range/If-Range (206/416) e Cache-Control longo. Alterações em outras
+  colunas (ou na miniatura) não mudam o ETag da imagem original.
+- Miniaturas (`thumb=True`) ficam em um cache LRU por worker limitado em
+  bytes e revalidado pelo ETag a cada requisição. Sem miniatura gerada
+  (`src.services.miniaturas`), ou com ela pendente porque a imagem mudou, a
+  imagem original é enviada.
+"""
+
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional, Tuple
+
+from flask import Response, request
+
+from src.api import admissao
+from src.config import get_imagem_config
+from src.services import DAO as db
+from src.services import metricas
+from src.services.miniaturas import ENTIDADES
+from src.services.row_factory import MODO_TUPLA, consultar_um
+
+
+class CacheBytes:
+    """Cache LRU limitado pela soma dos tamanhos dos valores (bytes)."""
+
+    def __init__(self, nome: str, limite: int):
+        self.limite = limite
+        self._dados: 'OrderedDict[Hashable, Tuple[str, str, Optional[str], bytes]]' = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        metricas.registrar_cache(nome, self.estatisticas)
+
+    def cabe(self, tamanho: int) -> bool:
+        # Um item não pode ocupar mais que 1/8 do cache
+        return 0 < tamanho <= self.limite // 8
+
+    def obter(self, chave: Hashable, etag: str):
+        """Retorna (etag, mime, nome, dados) se a versão em cache for `etag`."""
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None or item[0] != etag:
+                self.misses += 1
+                return None
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return item
+
+    def guardar(self, chave: Hashable, item: Tuple[str, str, Optional[str], bytes]) -> None:
+        if not self.cabe(len(item[3])):
+            return
+        with self._lock:
+            anterior = self._dados.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[3])
+            self._dados[chave] = item
+            self._bytes += len(item[3])
+            while self._bytes > self.limite:
+                _, removido = self._dados.popitem(last=False)
+                self._bytes -= len(removido[3])
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._dados),
+                'bytes': self._bytes,
+            }
+
+
+thumbs = CacheBytes('thumbs', get_imagem_config()['cache_thumbs'])
+
+
+_VERSAO = "NVL(TO_CHAR({coluna}_versao, 'YYYYMMDDHH24MISSFF6'), '0')"
+
+
+def _sql(entidade: str, thumb: bool) -> str:
+    tabela, chave, coluna = ENTIDADES[entidade]
+    versao = _VERSAO.format(coluna=coluna)
+    if thumb:
+        return f"""
+            SELECT {versao},
+                   CASE WHEN {coluna}_thumb_pendente IS NULL THEN {coluna}_thumb END,
+                   NVL({coluna}_thumb_tamanho, DBMS_LOB.GETLENGTH({coluna}_thumb)),
+                   NVL({coluna}_thumb_mime, {coluna}_mime), {coluna}_nome,
+                   NVL({coluna}_thumb_lado, 0)
+            FROM {tabela}
+            WHERE {chave} = :id
+            """
+    return f"""
+        SELECT {versao}, {coluna},
+               NVL({coluna}_tamanho, DBMS_LOB.GETLENGTH({coluna})),
+               {coluna}_mime, {coluna}_nome
+        FROM {tabela}
+        WHERE {chave} = :id
+        """
+
+
+def _faixa(etag: str, tamanho: int):
+    """Interpreta Range/If-Range: (inicio, fim), None (inteiro) ou False (416)."""
+    faixa = request.range
+    if faixa is None or faixa.units != 'bytes' or len(faixa.ranges) != 1:
+        return None
+    if_range = request.if_range
+    if if_range.date is not None or (if_range.etag and if_range.etag != etag):
+        return None
+    intervalo = faixa.range_for_length(tamanho)
+    return intervalo if intervalo is not None else False
+
+
+def _responder(
+    etag: str,
+    mime: Optional[str],
+    nome: Optional[str],
+    tamanho: int,
+    corpo: Callable[[int, int], Iterable[bytes]],
+    ao_fechar: Callable[[], None] = None,
+) -> Response:
+    """Monta a resposta (200/206/304/416) com os cabeçalhos de cache."""
+    max_age = get_imagem_config()['max_age']
+    status, inicio, fim = 200, 0, tamanho
+    if request.if_none_match.contains(etag):
+        status = 304
+    else:
+        intervalo = _faixa(etag, tamanho)
+        if intervalo is False:
+            status = 416
+        elif intervalo is not None:
+            status, (inicio, fim) = 206, intervalo
+
+    if status in (304, 416):
+        if ao_fechar is not None:
+            ao_fechar()
+        response = Response(status=status)
+        if status == 416:
+            response.headers['Content-Range'] = f'bytes */{tamanho}'
+    else:
+        response = Response(
+            corpo(inicio, fim),
+            status=status,
+            mimetype=mime or 'application/octet-stream',
+        )
+        response.headers['Content-Length'] = str(fim - inicio)
+        if status == 206:
+            response.headers['Content-Range'] = f'bytes {inicio}-{fim - 1}/{tamanho}'
+        if nome:
+            response.headers.set('Content-Disposition', 'inline', filename=nome)
+        if ao_fechar is not None:
+            response.call_on_close(ao_fechar)
+    response.set_etag(etag)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    return response
+
+
+def _ler_lob(lob, bloco: int) -> Callable[[int, int], Iterable[bytes]]:
+    def corpo(inicio: int, fim: int):
+        # Blocos múltiplos do chunk do LOB (leituras alinhadas no servidor)
+        chunk = lob.getchunksize() or bloco
+        tamanho_bloco = max(chunk, bloco // chunk * chunk)
+        posicao = inicio
+        while posicao < fim:
+            dados = lob.read(posicao + 1, min(tamanho_bloco, fim - posicao))
+            if not dados:
+                return
+            posicao += len(dados)
+            yield dados
+
+    return corpo
+
+
+def _copiar_lob(
+    lob, bloco: int, fechar: Callable[[], None]
+) -> Tuple[Callable[[int, int], Iterable[bytes]], Callable[[], None]]:
+    """Corpo que copia a faixa do LOB para um temporário e chama `fechar()`
+    antes do envio; retorna (corpo, função que descarta o temporário)."""
+    arquivo = tempfile.SpooledTemporaryFile(max_size=bloco)
+
+    def corpo(inicio: int, fim: int):
+        try:
+            for dados in _ler_lob(lob, bloco)(inicio, fim):
+                arquivo.write(dados)
+        except Exception:
+            arquivo.close()
+            raise
+        finally:
+            fechar()
+        arquivo.seek(0)
+        return iter(lambda: arquivo.read(bloco), b'')
+
+    def descartar():
+        try:
+            arquivo.close()
+        finally:
+            fechar()
+
+    return corpo, descartar
+
+
+def _fatias(dados: bytes) -> Callable[[int, int], Iterable[bytes]]:
+    return lambda inicio, fim: [dados[inicio:fim]]
+
+
+@metricas.instrumentar('imagem')
+def servir(entidade: str, id_: int, thumb: bool = False) -> Optional[Response]:
+    """Resposta com a imagem (ou miniatura) do registro; None se não houver.
+
+    Levanta `admissao.Saturado` se não houver vaga no portão de admissão.
+    """
+    liberar = admissao.ocupar()
+    try:
+        conn = db._connect()
+        cursor = conn.cursor()
+    except Exception:
+        liberar()
+        raise
+
+    fechada = []
+
+    def fechar():
+        # Chamada ao fim da leitura e de novo ao fim da resposta
+        if fechada:
+            return
+        fechada.append(True)
+        try:
+            cursor.close()
+            conn.close()
+        finally:
+            liberar()
+
+    try:
+        if thumb:
+            linha = consultar_um(cursor, _sql(entidade, True), {'id': id_}, MODO_TUPLA)
+            if linha is not None and linha[1] is not None:
+                return _servir_thumb(entidade, id_, linha, fechar)
+        linha = consultar_um(cursor, _sql(entidade, False), {'id': id_}, MODO_TUPLA)
+    except Exception:
+        fechar()
+        raise
+    if linha is None or linha[1] is None:
+        fechar()
+        return None
+    versao, lob, tamanho, mime, nome = linha
+    etag = f'{entidade}-{id_}-{versao}-{tamanho}'
+    bloco = get_imagem_config()['bloco']
+    if int(tamanho) <= bloco and not request.if_none_match.contains(etag):
+        # Imagem pequena: lida de uma vez, a conexão não espera o cliente
+        try:
+            dados = lob.read() if int(tamanho) else b''
+        finally:
+            fechar()
+        return _responder(etag, mime, nome, len(dados), _fatias(dados))
+    return _responder(etag, mime, nome, int(tamanho), *_copiar_lob(lob, bloco, fechar))
+
+
+def _servir_thumb(entidade: str, id_: int, linha, fechar) -> Response:
+    versao, lob, tamanho, mime, nome, lado = linha
+    etag = f'{entidade}-{id_}-{versao}-t{lado}-{tamanho}'
+    chave = (entidade, id_)
+    item = thumbs.obter(chave, etag)
+    if (
+        item is None
+        and not request.if_none_match.contains(etag)
+        and thumbs.cabe(int(tamanho))
+    ):
+        item = (etag, mime, nome, lob.read())
+        thumbs.guardar(chave, item)
+    if item is not None:
+        fechar()
+        return _responder(etag, item[1], item[2], len(item[3]), _fatias(item[3]))
+    return _responder(
+        etag,
+        mime,
+        nome,
+        int(tamanho),
+        *_copiar_lob(lob, get_imagem_config()['bloco'], fechar),
+    )
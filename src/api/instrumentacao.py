@@ -0,0 +1,84 @@
+"""
+instrumentacao.py
+
+Hooks do Flask para medir cada requisição:
+    - latência por rota (métricas Prometheus);
+    - cabeçalho `Server-Timing` com conexão, cada SQL, conversão de linhas e
+      serialização JSON;
+    - `X-Request-Id` (recebido do cliente ou gerado) para correlacionar com os logs.
+"""
+
+import logging
+import re
+import time
+import uuid
+
+from flask import g, request
+
+from src.config import get_slow_query_ms
+from src.services import metricas
+
+logger = logging.getLogger(__name__)
+
+_REQUEST_ID_VALIDO = re.compile(r'^[\w.\-]{1,128}$')
+
+
+def _request_id() -> str:
+    recebido = request.headers.get('X-Request-Id', '')
+    if _REQUEST_ID_VALIDO.match(recebido):
+        return recebido
+    return uuid.uuid4().hex
+
+
+def _inicio_requisicao():
+    g.inicio_requisicao = time.perf_counter()
+    g.request_id = _request_id()
+    metricas.iniciar_requisicao(g.request_id)
+
+
+def _server_timing(tempos, total: float) -> str:
+    contagem = {}
+    partes = []
+    for nome, duracao, descricao in tempos:
+        # Nomes repetidos (várias consultas) recebem sufixo: sql-1, sql-2...
+        if nome in ('sql', 'rows'):
+            contagem[nome] = contagem.get(nome, 0) + 1
+            nome = f'{nome}-{contagem[nome]}'
+        parte = nome
+        if descricao:
+            parte += f';desc="{descricao}"'
+        partes.append(f'{parte};dur={duracao * 1000:.2f}')
+    partes.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(partes)
+
+
+def _fim_requisicao(response):
+    inicio = g.pop('inicio_requisicao', None)
+    if inicio is None:
+        return response
+    total = time.perf_counter() - inicio
+    tempos = metricas.encerrar_requisicao()
+
+    # Usa o template da rota (ex: /api/v1/dashboard/user/<int:id_user>/completo)
+    # para não criar uma série por ID
+    rota = request.url_rule.rule if request.url_rule else 'desconhecida'
+    metricas.http_duracao.observar(
+        rota, request.method, response.status_code, valor=total
+    )
+
+    response.headers['Server-Timing'] = _server_timing(tempos, total)
+    response.headers['X-Request-Id'] = g.request_id
+
+    limite_ms = get_slow_query_ms()
+    if response.status_code >= 500 or (limite_ms and total * 1000 >= limite_ms):
+        logger.warning(
+            f'{request.method} {request.path} {response.status_code} '
+            f'{total * 1000:.1f}ms request_id={g.request_id}'
+        )
+    return response
+
+
+def registrar(app):
+    """Registra os hooks de instrumentação na aplicação Flask."""
+    app.before_request(_inicio_requisicao)
+    app.after_request(_fim_requisicao)
@@ -0,0 +1,143 @@
+"""
+profiling.py
+
+Profiling sob demanda de uma requisição: `?_profile=1` em qualquer rota
+`/api/v1` executa a requisição sob o cProfile e devolve, no lugar do payload,
+o relatório das funções mais caras.
+
+Só funciona com `UPPATH_ADMIN_TOKEN` definido e o mesmo valor enviado no
+cabeçalho `X-Admin-Token`. Com `UPPATH_PROFILE_DIR` definido, o perfil
+completo também é salvo em um arquivo `.prof` (abrir com snakeviz, pstats...).
+
+Parâmetros opcionais:
+    _profile_sort: cumulative (padrão), tottime ou calls
+    _profile_top:  quantidade de funções no relatório (padrão 40)
+"""
+
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+
+from flask import Response, g, request
+
+from src.config import get_admin_token, get_profile_dir
+
+logger = logging.getLogger(__name__)
+
+_ORDENACOES = ('cumulative', 'tottime', 'calls')
+_TOP_PADRAO = 40
+
+# O cProfile só admite um profiler ativo por vez no processo (Python 3.12+)
+_lock = threading.Lock()
+
+
+def autorizado() -> bool:
+    """Indica se a requisição traz o token administrativo configurado."""
+    token = get_admin_token()
+    if not token:
+        return False
+    recebido = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(recebido.encode(), token.encode())
+
+
+def ativo() -> bool:
+    """Indica se a requisição atual está sendo executada sob o profiler."""
+    return g.get('profiler') is not None
+
+
+def _solicitado() -> bool:
+    return (
+        request.args.get('_profile') == '1'
+        and request.blueprint == 'api'
+        and autorizado()
+    )
+
+
+def _inicio_profile():
+    if not _solicitado():
+        return None
+    if not _lock.acquire(blocking=False):
+        return Response(
+            'Outro profiling já está em andamento.\n', 409, mimetype='text/plain'
+        )
+    g.profiler = cProfile.Profile()
+    g.profiler_inicio = time.perf_counter()
+    g.profiler.enable()
+    return None
+
+
+def _parar():
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _lock.release()
+    return profiler
+
+
+def _salvar(profiler) -> str:
+    diretorio = get_profile_dir()
+    if not diretorio:
+        return None
+    os.makedirs(diretorio, exist_ok=True)
+    endpoint = (request.endpoint or 'desconhecido').replace('.', '_')
+    nome = f'{time.strftime("%Y%m%d-%H%M%S")}_{endpoint}_{g.get("request_id", "")}.prof'
+    caminho = os.path.join(diretorio, nome)
+    profiler.dump_stats(caminho)
+    return caminho
+
+
+def _fim_profile(response):
+    profiler = _parar()
+    if profiler is None:
+        return response
+    duracao = time.perf_counter() - g.pop('profiler_inicio')
+
+    ordenacao = request.args.get('_profile_sort', 'cumulative')
+    if ordenacao not in _ORDENACOES:
+        ordenacao = 'cumulative'
+    try:
+        top = int(request.args.get('_profile_top', _TOP_PADRAO))
+    except ValueError:
+        top = _TOP_PADRAO
+
+    try:
+        caminho = _salvar(profiler)
+    except OSError as e:
+        logger.error(f'Erro ao salvar perfil: {e}')
+        caminho = None
+
+    saida = io.StringIO()
+    saida.write(
+        f'{request.method} {request.full_path}\n'
+        f'status original: {response.status_code}  '
+        f'tempo: {duracao * 1000:.1f}ms  '
+        f'tamanho: {response.calculate_content_length() or 0} bytes\n'
+    )
+    if caminho:
+        saida.write(f'perfil salvo em: {caminho}\n')
+    saida.write('\n')
+    stats = pstats.Stats(profiler, stream=saida)
+    stats.strip_dirs().sort_stats(ordenacao).print_stats(top)
+
+    logger.info(
+        f'Profiling de {request.path} ({duracao * 1000:.1f}ms)'
+        + (f' salvo em {caminho}' if caminho else '')
+    )
+    return Response(saida.getvalue(), 200, mimetype='text/plain')
+
+
+def _teardown_profile(exc=None):
+    # Garante que o profiler não fique ativo se after_request não rodar
+    _parar()
+
+
+def registrar(app):
+    """Registra os hooks de profiling na aplicação Flask."""
+    app.before_request(_inicio_profile)
+    app.after_request(_fim_profile)
+    app.teardown_request(_teardown_profile)
@@ -5,15 +5,33 @@ Define todos os endpoints da API REST do UpPath.
 """
 
 import datetime
+import math
+import time
 from typing import Any
 
-from flask import Blueprint, jsonify
-
+from flask import Blueprint, Response, jsonify, request
+
+from src.api import (
+    admissao,
+    amostrador,
+    aquecimento,
+    cache_dashboard,
+    coalescencia,
+    imagens,
+    profiling,
+)
+from src.config import get_swr_config
 from src.services import DAO as db
-from src.services import consultas
+from src.services import analise_bem_estar, consultas, metricas, referencia
+from src.services.disjuntor import disjuntor
+from src.services.exceptions import CircuitoAberto
+from src.utils.validators import ValidationError, parse_date_fast
 
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
+# Maior `limite` aceito nos dashboards de usuário
+MAX_LIMITE = 1000
+
 
 def _json_serializer(obj: Any) -> str:
     """Serializa objetos datetime para ISO 8601."""
@@ -22,9 +40,17 @@ def _json_serializer(obj: Any) -> str:
     return str(obj)
 
 
+def _jsonify(payload: Any):
+    """`jsonify` medindo o tempo de serialização (Server-Timing: json)."""
+    inicio = time.perf_counter()
+    response = jsonify(payload)
+    metricas.registrar_tempo('json', time.perf_counter() - inicio)
+    return response
+
+
 def _error_response(message: str, status_code: int = 400):
     """Retorna resposta de erro padronizada."""
-    return jsonify({'error': message, 'success': False}), status_code
+    return _jsonify({'error': message, 'success': False}), status_code
 
 
 def _success_response(data: Any, message: str = None):
@@ -32,7 +58,7 @@ def _success_response(data: Any, message: str = None):
     response = {'success': True, 'data': data}
     if message:
         response['message'] = message
-    return jsonify(response), 200
+    return _jsonify(response), 200
 
 
 # ============================================================================
@@ -40,19 +66,106 @@ def _success_response(data: Any, message: str = None):
 # ============================================================================
 
 
+@admissao.limitar
+def _ping_banco():
+    with db.get_cursor() as cursor:
+        cursor.execute('SELECT 1 FROM dual')
+        cursor.fetchone()
+
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
-    """Endpoint para verificar se a API está funcionando."""
+    """Endpoint para verificar se a API está funcionando.
+
+    Com `?deep=1`, mede o tempo de ida e volta de um comando no banco.
+    """
+    dados = {'status': 'healthy', 'timestamp': datetime.datetime.now().isoformat()}
+    if request.args.get('deep') != '1':
+        return _success_response(dados)
+    inicio = time.perf_counter()
+    try:
+        _ping_banco()
+    except admissao.Saturado:
+        raise
+    except Exception as e:
+        return _error_response(f'Banco de dados indisponível: {str(e)}', 503)
+    dados['db_latency_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+    dados['pool'] = db.pool_ativo() is not None
+    dados['circuito'] = disjuntor.estado
+    return _success_response(dados)
+
+
+@api_bp.route('/ready', methods=['GET'])
+def readiness_check():
+    """Pronto para tráfego apenas após o aquecimento do worker."""
+    estado = aquecimento.estado()
+    if not estado['pronto']:
+        # Fora do gunicorn (ou após falha) o aquecimento é disparado aqui
+        aquecimento.aquecer_em_segundo_plano()
+        motivo = estado['erro'] or 'aquecimento em andamento'
+        return _error_response(f'Worker não está pronto: {motivo}', 503)
     return _success_response(
-        {'status': 'healthy', 'timestamp': datetime.datetime.now().isoformat()}
+        {'status': 'ready', 'warmup_seconds': round(estado['duracao'], 3)}
     )
 
 
+@api_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas do processo no formato texto do Prometheus."""
+    return Response(metricas.render(), mimetype='text/plain; version=0.0.4')
+
+
+@api_bp.route('/admin/amostras', methods=['GET'])
+def admin_amostras():
+    """Pilhas do amostrador contínuo no formato collapsed (flamegraph).
+
+    Parâmetros: `segundos` (padrão: janela inteira) e `ociosas=0` para
+    descartar threads bloqueadas em espera.
+    """
+    if not profiling.autorizado():
+        return _error_response('Não autorizado', 403)
+    ativo = amostrador.atual()
+    if ativo is None:
+        return _error_response('Amostrador desativado (UPPATH_SAMPLER_HZ)', 404)
+    segundos = request.args.get('segundos', type=float)
+    ociosas = request.args.get('ociosas', '1') != '0'
+    response = Response(ativo.collapsed(segundos, ociosas), mimetype='text/plain')
+    for campo, valor in ativo.estatisticas().items():
+        response.headers[f'X-Amostrador-{campo.replace("_", "-")}'] = f'{valor:g}'
+    return response
+
+
+@api_bp.route('/admin/referencia/invalidar', methods=['POST'])
+def admin_invalidar_referencia():
+    """Descarta o cache de empresas/trilhas/cursos de todos os workers.
+
+    `tabela` (padrão: todas) escolhe entre empresas, trilhas e cursos. Este
+    worker recarrega no próximo acesso; os demais ao notar a nova versão em
+    `rollup_controle` (em até `referencia.RECARGA_MINIMA` segundos).
+    """
+    if not profiling.autorizado():
+        return _error_response('Não autorizado', 403)
+    tabela = request.args.get('tabela') or None
+    if tabela is not None and tabela not in referencia.TABELAS:
+        return _error_response(
+            f'Tabela inválida (use {", ".join(referencia.TABELAS)})', 400
+        )
+    try:
+        referencia.publicar_invalidacao(tabela)
+    except CircuitoAberto as e:
+        return _error_response(str(e), 503)
+    except Exception as e:
+        return _error_response(f'Erro ao invalidar as referências: {str(e)}', 500)
+    return _success_response({'invalidadas': [tabela] if tabela else list(referencia.TABELAS)})
+
+
 @api_bp.route('/info', methods=['GET'])
 def api_info():
     """Retorna informações sobre os endpoints disponíveis."""
     endpoints = {
         'health': '/api/v1/health',
+        'ready': '/api/v1/ready',
+        'metrics': '/api/v1/metrics',
         'user_dashboard': {
             'bem_estar': '/api/v1/dashboard/user/<int:id_user>/bem-estar',
             'trilhas': '/api/v1/dashboard/user/<int:id_user>/trilhas',
@@ -62,66 +175,279 @@ def api_info():
         'company_dashboard': {
             'nivel_carreira': '/api/v1/dashboard/company/<int:id_empresa>/nivel-carreira',
             'bem_estar': '/api/v1/dashboard/company/<int:id_empresa>/bem-estar',
+            'bem_estar_analytics': (
+                '/api/v1/dashboard/company/<int:id_empresa>/bem-estar/analytics'
+            ),
             'trilhas': '/api/v1/dashboard/company/<int:id_empresa>/trilhas',
             'baixa_motivacao': '/api/v1/dashboard/company/<int:id_empresa>/baixa-motivacao',
+            'anomalias': '/api/v1/dashboard/company/<int:id_empresa>/anomalias',
             'completo': '/api/v1/dashboard/company/<int:id_empresa>/completo',
         },
+        'users_dashboard': '/api/v1/dashboard/users?ids=1,2,3',
+        'companies_dashboard': '/api/v1/dashboard/companies?ids=1,2,3|all',
+        'imagens': {
+            'trilha': '/api/v1/trilhas/<int:id_trilha>/imagem[?thumb=1]',
+            'curso': '/api/v1/cursos/<int:id_curso>/imagem[?thumb=1]',
+        },
     }
     return _success_response(endpoints, 'API UpPath v1.0')
 
 
+# ============================================================================
+# EXECUÇÃO DAS CONSULTAS
+# ============================================================================
+
+
+def _chave_cache():
+    """Rota + parâmetros da requisição (sem os parâmetros internos `_...`)."""
+    args = tuple(
+        sorted((k, v) for k, v in request.args.items(multi=True) if not k.startswith('_'))
+    )
+    return request.path, args
+
+
+def _parse_ids(valor: str):
+    """Converte `1,2,3` em lista de ints (None se inválido)."""
+    try:
+        ids = [int(parte) for parte in valor.split(',') if parte.strip()]
+    except ValueError:
+        return None
+    return list(dict.fromkeys(ids)) or None
+
+
+def _consultar(consulta, *args, **kwargs):
+    with db.get_cursor() as cursor:
+        return consulta(cursor, *args, **kwargs)
+
+
+def _resposta_sem_banco(chave, erro: CircuitoAberto, usar_cache: bool):
+    """Banco indisponível: última resposta conhecida ou 503 com Retry-After."""
+    em_cache = cache_dashboard.cache.obter(chave) if usar_cache else None
+    if em_cache is None:
+        response, status = _error_response(str(erro), 503)
+        response.headers['Retry-After'] = str(
+            max(math.ceil(disjuntor.segundos_para_teste()), 1)
+        )
+        return response, status
+    dados, idade = em_cache
+    return _resposta_cache(dados, idade, 'STALE')
+
+
+def _resposta_cache(dados, idade: float, estado: str):
+    response, status = _success_response(dados)
+    response.headers['X-Cache'] = estado
+    response.headers['Age'] = str(int(idade))
+    return response, status
+
+
+def _servir(
+    calcular,
+    mensagem_erro: str,
+    empresa: int = None,
+    coalescer: bool = False,
+    swr: bool = False,
+):
+    """Executa `calcular()` e responde com o resultado (ou erro padronizado).
+
+    O cálculo ocupa uma vaga no controle de admissão (com a quota de `empresa`,
+    se informada). Com `coalescer`, requisições idênticas simultâneas
+    compartilham um único cálculo (e uma única vaga). Com `swr`, respostas em
+    cache mais novas que o TTL "hard" são usadas direto (atualizadas em
+    segundo plano após o TTL "soft").
+
+    Com `swr` (dashboards corporativos), respostas sem erro ficam no cache do
+    dashboard, que também é usado quando o disjuntor do banco estiver aberto.
+    As demais rotas não passam pelo cache.
+
+    Sob `?_profile=1` o cálculo sempre roda nesta requisição: o cache e a
+    coalescência ignoram os parâmetros `_...` e devolveriam o resultado de
+    outra execução, sem nada para medir.
+    """
+    chave = _chave_cache()
+    if profiling.ativo():
+        swr = coalescer = False
+
+    def executar():
+        with admissao.vaga(empresa):
+            return calcular()
+
+    ttl = get_swr_config()
+    if swr and ttl['soft']:
+        em_cache = cache_dashboard.cache.obter(chave)
+        if em_cache is not None and em_cache[1] < ttl['hard']:
+            dados, idade = em_cache
+            if idade < ttl['soft']:
+                return _resposta_cache(dados, idade, 'HIT')
+            cache_dashboard.cache.revalidar(chave, executar)
+            return _resposta_cache(dados, idade, 'STALE')
+
+    try:
+        if coalescer:
+            dados = coalescencia.executar(chave, executar)
+        else:
+            dados = executar()
+    except admissao.Saturado:
+        raise
+    except CircuitoAberto as e:
+        return _resposta_sem_banco(chave, e, swr)
+    except Exception as e:
+        return _error_response(f'{mensagem_erro}: {str(e)}', 500)
+    if swr:
+        cache_dashboard.cache.guardar(chave, dados)
+        return _resposta_cache(dados, 0, 'MISS')
+    return _success_response(dados)
+
+
 # ============================================================================
 # DASHBOARD INDIVIDUAL (USUÁRIO)
 # ============================================================================
 
 
+def _opcoes_periodo():
+    """Lê `desde`, `ate` (DD/MM/YYYY ou YYYY-MM-DD) e `limite` da query string.
+
+    Levanta ValidationError com a mensagem para o cliente se forem inválidos.
+    """
+    opcoes = {}
+    for nome in ('desde', 'ate'):
+        valor = request.args.get(nome, '').strip()
+        if valor:
+            data = parse_date_fast(valor)
+            if data is None:
+                raise ValidationError(f'Data inválida em "{nome}": {valor}')
+            opcoes[nome] = data
+    if 'desde' in opcoes and 'ate' in opcoes and opcoes['desde'] > opcoes['ate']:
+        raise ValidationError('"desde" deve ser anterior a "ate"')
+    valor = request.args.get('limite', '').strip()
+    if valor:
+        if not valor.isdigit() or not 0 < int(valor) <= MAX_LIMITE:
+            raise ValidationError(f'"limite" deve estar entre 1 e {MAX_LIMITE}')
+        opcoes['limite'] = int(valor)
+    return opcoes
+
+
+def _dashboard_usuario(id_user: int, opcoes=None):
+    opcoes = opcoes or {}
+    with db.get_cursor() as cursor:
+        return {
+            'id_usuario': id_user,
+            'bem_estar': consultas.consulta_bem_estar_user(cursor, id_user, **opcoes),
+            'trilhas': consultas.consulta_progresso_trilhas_user(
+                cursor, id_user, **opcoes
+            ),
+            'recomendacoes': consultas.consulta_recomendacoes_user(
+                cursor, id_user, **opcoes
+            ),
+        }
+
+
+def _servir_usuario(consulta, id_user: int, mensagem_erro: str):
+    try:
+        opcoes = _opcoes_periodo()
+    except ValidationError as e:
+        return _error_response(str(e), 400)
+    return _servir(
+        lambda: _consultar(consulta, id_user, **opcoes),
+        mensagem_erro,
+    )
+
+
 @api_bp.route('/dashboard/user/<int:id_user>/bem-estar', methods=['GET'])
 def user_bem_estar(id_user: int):
     """Retorna evolução do bem-estar do usuário."""
-    try:
-        with db.get_cursor() as cursor:
-            dados = consultas.consulta_bem_estar_user(cursor, id_user)
-            return _success_response(dados)
-    except Exception as e:
-        return _error_response(f'Erro ao buscar bem-estar: {str(e)}', 500)
+    return _servir_usuario(
+        consultas.consulta_bem_estar_user, id_user, 'Erro ao buscar bem-estar'
+    )
 
 
 @api_bp.route('/dashboard/user/<int:id_user>/trilhas', methods=['GET'])
 def user_trilhas(id_user: int):
     """Retorna progresso nas trilhas do usuário."""
-    try:
-        with db.get_cursor() as cursor:
-            dados = consultas.consulta_progresso_trilhas_user(cursor, id_user)
-            return _success_response(dados)
-    except Exception as e:
-        return _error_response(f'Erro ao buscar trilhas: {str(e)}', 500)
+    return _servir_usuario(
+        consultas.consulta_progresso_trilhas_user, id_user, 'Erro ao buscar trilhas'
+    )
 
 
 @api_bp.route('/dashboard/user/<int:id_user>/recomendacoes', methods=['GET'])
 def user_recomendacoes(id_user: int):
     """Retorna recomendações recebidas pelo usuário."""
-    try:
-        with db.get_cursor() as cursor:
-            dados = consultas.consulta_recomendacoes_user(cursor, id_user)
-            return _success_response(dados)
-    except Exception as e:
-        return _error_response(f'Erro ao buscar recomendações: {str(e)}', 500)
+    return _servir_usuario(
+        consultas.consulta_recomendacoes_user, id_user, 'Erro ao buscar recomendações'
+    )
 
 
 @api_bp.route('/dashboard/user/<int:id_user>/completo', methods=['GET'])
 def user_dashboard_completo(id_user: int):
     """Retorna dashboard completo do usuário com todas as informações."""
     try:
-        with db.get_cursor() as cursor:
-            dashboard = {
-                'id_usuario': id_user,
-                'bem_estar': consultas.consulta_bem_estar_user(cursor, id_user),
-                'trilhas': consultas.consulta_progresso_trilhas_user(cursor, id_user),
-                'recomendacoes': consultas.consulta_recomendacoes_user(cursor, id_user),
-            }
-            return _success_response(dashboard)
-    except Exception as e:
-        return _error_response(f'Erro ao buscar dashboard: {str(e)}', 500)
+        opcoes = _opcoes_periodo()
+    except ValidationError as e:
+        return _error_response(str(e), 400)
+    return _servir(
+        lambda: _dashboard_usuario(id_user, opcoes),
+        'Erro ao buscar dashboard',
+        coalescer=True,
+    )
+
+
+# ============================================================================
+# DASHBOARD DE VÁRIOS USUÁRIOS (GESTOR)
+# ============================================================================
+
+_SECOES_USUARIOS = {
+    'bem_estar': consultas.consulta_bem_estar_users,
+    'trilhas': consultas.consulta_progresso_trilhas_users,
+    'recomendacoes': consultas.consulta_recomendacoes_users,
+}
+
+
+def _dashboard_usuarios(ids, secoes, opcoes):
+    por_secao = {}
+    with db.get_cursor() as cursor:
+        for secao in secoes:
+            dados = _SECOES_USUARIOS[secao](cursor, ids, **opcoes)
+            if 'error' in dados:
+                raise RuntimeError(dados['error'])
+            por_secao[secao] = dados
+    return {
+        id_user: {secao: por_secao[secao].get(id_user, []) for secao in secoes}
+        for id_user in ids
+    }
+
+
+@api_bp.route('/dashboard/users', methods=['GET'])
+def users_dashboard():
+    """Dashboards de vários usuários (visão do gestor): `?ids=1,2,3`.
+
+    `secoes` (padrão: todas) escolhe entre bem_estar, trilhas e recomendacoes,
+    e `desde`/`ate`/`limite` funcionam como nos endpoints individuais (o
+    limite vale por usuário). Cada seção é uma única consulta para todos os
+    usuários. Retorna um mapa {id_usuario: {secao: dados}}.
+    """
+    ids = _parse_ids(request.args.get('ids', '').strip())
+    if ids is None:
+        return _error_response('Informe ids=1,2,3', 400)
+    if len(ids) > consultas.MAX_IDS_LOTE:
+        return _error_response(
+            f'Máximo de {consultas.MAX_IDS_LOTE} usuários por requisição', 400
+        )
+    secoes = [
+        secao
+        for secao in request.args.get('secoes', ','.join(_SECOES_USUARIOS)).split(',')
+        if secao
+    ]
+    invalidas = [secao for secao in secoes if secao not in _SECOES_USUARIOS]
+    if invalidas or not secoes:
+        return _error_response(f'Seções válidas: {", ".join(_SECOES_USUARIOS)}', 400)
+    try:
+        opcoes = _opcoes_periodo()
+    except ValidationError as e:
+        return _error_response(str(e), 400)
+    return _servir(
+        lambda: _dashboard_usuarios(ids, secoes, opcoes),
+        'Erro ao buscar dashboards dos usuários',
+        coalescer=True,
+    )
 
 
 # ============================================================================
@@ -129,77 +455,252 @@ def user_dashboard_completo(id_user: int):
 # ============================================================================
 
 
+def _dashboard_empresa(id_empresa: int):
+    with db.get_cursor() as cursor:
+        return {
+            'id_empresa': id_empresa,
+            'nivel_carreira': consultas.consulta_distribuicao_nivel_carreira(
+                cursor, id_empresa
+            ),
+            'bem_estar': consultas.consulta_media_bem_estar_empresa(cursor, id_empresa),
+            'trilhas': consultas.consulta_trilhas_mais_utilizadas_empresa(
+                cursor, id_empresa
+            ),
+            'baixa_motivacao': consultas.consulta_funcionarios_baixa_motivacao(
+                cursor, id_empresa
+            ),
+        }
+
+
 @api_bp.route('/dashboard/company/<int:id_empresa>/nivel-carreira', methods=['GET'])
 def company_nivel_carreira(id_empresa: int):
     """Retorna distribuição de níveis de carreira na empresa."""
-    try:
-        with db.get_cursor() as cursor:
-            dados = consultas.consulta_distribuicao_nivel_carreira(cursor, id_empresa)
-            return _success_response(dados)
-    except Exception as e:
-        return _error_response(f'Erro ao buscar níveis de carreira: {str(e)}', 500)
+    return _servir(
+        lambda: _consultar(consultas.consulta_distribuicao_nivel_carreira, id_empresa),
+        'Erro ao buscar níveis de carreira',
+        empresa=id_empresa,
+        swr=True,
+    )
 
 
 @api_bp.route('/dashboard/company/<int:id_empresa>/bem-estar', methods=['GET'])
 def company_bem_estar(id_empresa: int):
     """Retorna média de bem-estar da empresa."""
-    try:
-        with db.get_cursor() as cursor:
-            dados = consultas.consulta_media_bem_estar_empresa(cursor, id_empresa)
-            return _success_response(dados)
-    except Exception as e:
-        return _error_response(f'Erro ao buscar bem-estar da empresa: {str(e)}', 500)
+    return _servir(
+        lambda: _consultar(consultas.consulta_media_bem_estar_empresa, id_empresa),
+        'Erro ao buscar bem-estar da empresa',
+        empresa=id_empresa,
+        swr=True,
+    )
 
 
 @api_bp.route('/dashboard/company/<int:id_empresa>/trilhas', methods=['GET'])
 def company_trilhas(id_empresa: int):
     """Retorna trilhas mais utilizadas na empresa."""
-    try:
-        with db.get_cursor() as cursor:
-            dados = consultas.consulta_trilhas_mais_utilizadas_empresa(
-                cursor, id_empresa
-            )
-            return _success_response(dados)
-    except Exception as e:
-        return _error_response(f'Erro ao buscar trilhas da empresa: {str(e)}', 500)
+    return _servir(
+        lambda: _consultar(
+            consultas.consulta_trilhas_mais_utilizadas_empresa, id_empresa
+        ),
+        'Erro ao buscar trilhas da empresa',
+        empresa=id_empresa,
+        swr=True,
+    )
 
 
 @api_bp.route('/dashboard/company/<int:id_empresa>/baixa-motivacao', methods=['GET'])
 def company_baixa_motivacao(id_empresa: int):
-    """Retorna funcionários com baixa motivação (<5)."""
+    """Retorna funcionários com baixa motivação (<5).
+
+    Com `?atual=1`, apenas o registro mais recente de cada funcionário.
+    """
+    atual = request.args.get('atual', '').lower() in ('1', 'true')
+    return _servir(
+        lambda: _consultar(
+            consultas.consulta_funcionarios_baixa_motivacao, id_empresa, atual
+        ),
+        'Erro ao buscar funcionários com baixa motivação',
+        empresa=id_empresa,
+        swr=True,
+    )
+
+
+@api_bp.route('/dashboard/company/<int:id_empresa>/bem-estar/analytics', methods=['GET'])
+def company_bem_estar_analytics(id_empresa: int):
+    """Estatísticas de bem-estar da empresa (percentis, tendência semanal, risco).
+
+    Aceita `desde`/`ate` e `janela` (semanas da média móvel, padrão 4).
+    """
+    if not analise_bem_estar.disponivel():
+        return _error_response('Análise indisponível: numpy não instalado', 501)
     try:
-        with db.get_cursor() as cursor:
-            dados = consultas.consulta_funcionarios_baixa_motivacao(cursor, id_empresa)
-            return _success_response(dados)
-    except Exception as e:
-        return _error_response(
-            f'Erro ao buscar funcionários com baixa motivação: {str(e)}', 500
-        )
+        opcoes = _opcoes_periodo()
+    except ValidationError as e:
+        return _error_response(str(e), 400)
+    opcoes.pop('limite', None)
+    valor = request.args.get('janela', '').strip()
+    if valor:
+        if not valor.isdigit() or not 0 < int(valor) <= analise_bem_estar.MAX_JANELA:
+            return _error_response(
+                f'"janela" deve estar entre 1 e {analise_bem_estar.MAX_JANELA}', 400
+            )
+        opcoes['janela'] = int(valor)
+    return _servir(
+        lambda: _consultar(
+            analise_bem_estar.analisar_bem_estar_empresa, id_empresa, **opcoes
+        ),
+        'Erro ao calcular estatísticas de bem-estar',
+        empresa=id_empresa,
+        coalescer=True,
+        swr=True,
+    )
+
+
+@api_bp.route('/dashboard/company/<int:id_empresa>/anomalias', methods=['GET'])
+def company_anomalias(id_empresa: int):
+    """Retorna anomalias de bem-estar detectadas nos funcionários da empresa.
+
+    Aceita `desde`/`ate` e `limite`.
+    """
+    try:
+        opcoes = _opcoes_periodo()
+    except ValidationError as e:
+        return _error_response(str(e), 400)
+    return _servir(
+        lambda: _consultar(consultas.consulta_anomalias_empresa, id_empresa, **opcoes),
+        'Erro ao buscar anomalias da empresa',
+        empresa=id_empresa,
+        swr=True,
+    )
 
 
 @api_bp.route('/dashboard/company/<int:id_empresa>/completo', methods=['GET'])
 def company_dashboard_completo(id_empresa: int):
     """Retorna dashboard completo da empresa com todas as informações."""
+    return _servir(
+        lambda: _dashboard_empresa(id_empresa),
+        'Erro ao buscar dashboard da empresa',
+        empresa=id_empresa,
+        coalescer=True,
+        swr=True,
+    )
+
+
+# ============================================================================
+# DASHBOARD DE VÁRIAS EMPRESAS
+# ============================================================================
+
+_SECOES_EMPRESAS = {
+    'nivel_carreira': consultas.consulta_distribuicao_nivel_carreira_empresas,
+    'bem_estar': consultas.consulta_media_bem_estar_empresas,
+    'trilhas': consultas.consulta_trilhas_mais_utilizadas_empresas,
+}
+_VAZIO_EMPRESAS = {
+    'nivel_carreira': list,
+    'bem_estar': lambda: {
+        'media_estresse': None,
+        'media_motivacao': None,
+        'media_sono': None,
+    },
+    'trilhas': list,
+}
+
+
+def _dashboard_empresas(ids, secoes):
+    with db.get_cursor() as cursor:
+        por_secao = {}
+        for secao in secoes:
+            dados = _SECOES_EMPRESAS[secao](cursor, ids)
+            if 'error' in dados:
+                raise RuntimeError(dados['error'])
+            por_secao[secao] = dados
+        if ids is None:
+            # Empresas do cache de referência + as criadas depois da última carga
+            ids_resposta = list(referencia.empresas.nomes(cursor))
+            conhecidas = set(ids_resposta)
+            ids_resposta += sorted(
+                {id_ for dados in por_secao.values() for id_ in dados} - conhecidas
+            )
+        else:
+            ids_resposta = ids
+    return {
+        id_empresa: {
+            secao: por_secao[secao].get(id_empresa) or _VAZIO_EMPRESAS[secao]()
+            for secao in secoes
+        }
+        for id_empresa in ids_resposta
+    }
+
+
+@api_bp.route('/dashboard/companies', methods=['GET'])
+def companies_dashboard():
+    """Dashboards de várias empresas: `?ids=1,2,3` ou `?ids=all`.
+
+    `secoes` (padrão `nivel_carreira,bem_estar`) escolhe entre nivel_carreira,
+    bem_estar e trilhas. Cada seção é calculada para todas as empresas em uma
+    única consulta. Retorna um mapa {id_empresa: {secao: dados}}.
+    """
+    valor = request.args.get('ids', '').strip()
+    if valor == 'all':
+        ids = None
+    else:
+        ids = _parse_ids(valor)
+        if ids is None:
+            return _error_response('Informe ids=1,2,3 ou ids=all', 400)
+        if len(ids) > consultas.MAX_IDS_LOTE:
+            return _error_response(
+                f'Máximo de {consultas.MAX_IDS_LOTE} empresas por requisição', 400
+            )
+    secoes = [
+        secao
+        for secao in request.args.get('secoes', 'nivel_carreira,bem_estar').split(',')
+        if secao
+    ]
+    invalidas = [secao for secao in secoes if secao not in _SECOES_EMPRESAS]
+    if invalidas or not secoes:
+        return _error_response(
+            f'Seções válidas: {", ".join(_SECOES_EMPRESAS)}', 400
+        )
+    return _servir(
+        lambda: _dashboard_empresas(ids, secoes),
+        'Erro ao buscar dashboards das empresas',
+        coalescer=True,
+    )
+
+
+# ============================================================================
+# IMAGENS (TRILHAS E CURSOS)
+# ============================================================================
+
+
+def _imagem(entidade: str, id_: int):
+    thumb = request.args.get('thumb', '').lower() in ('1', 'true')
     try:
-        with db.get_cursor() as cursor:
-            dashboard = {
-                'id_empresa': id_empresa,
-                'nivel_carreira': consultas.consulta_distribuicao_nivel_carreira(
-                    cursor, id_empresa
-                ),
-                'bem_estar': consultas.consulta_media_bem_estar_empresa(
-                    cursor, id_empresa
-                ),
-                'trilhas': consultas.consulta_trilhas_mais_utilizadas_empresa(
-                    cursor, id_empresa
-                ),
-                'baixa_motivacao': consultas.consulta_funcionarios_baixa_motivacao(
-                    cursor, id_empresa
-                ),
-            }
-            return _success_response(dashboard)
+        response = imagens.servir(entidade, id_, thumb)
+    except admissao.Saturado:
+        raise
+    except CircuitoAberto as e:
+        response, status = _error_response(str(e), 503)
+        response.headers['Retry-After'] = str(
+            max(math.ceil(disjuntor.segundos_para_teste()), 1)
+        )
+        return response, status
     except Exception as e:
-        return _error_response(f'Erro ao buscar dashboard da empresa: {str(e)}', 500)
+        return _error_response(f'Erro ao buscar imagem: {str(e)}', 500)
+    if response is None:
+        return _error_response('Imagem não encontrada', 404)
+    return response
+
+
+@api_bp.route('/trilhas/<int:id_trilha>/imagem', methods=['GET'])
+def trilha_imagem(id_trilha: int):
+    """Imagem da trilha (`?thumb=1`: miniatura), com ETag e Range."""
+    return _imagem('trilhas', id_trilha)
+
+
+@api_bp.route('/cursos/<int:id_curso>/imagem', methods=['GET'])
+def curso_imagem(id_curso: int):
+    """Imagem do curso (`?thumb=1`: miniatura), com ETag e Range."""
+    return _imagem('cursos', id_curso)
 
 
 # ============================================================================
@@ -207,6 +708,16 @@ def company_dashboard_completo(id_empresa: int):
 # ============================================================================
 
 
+@api_bp.errorhandler(admissao.Saturado)
+def saturado(error):
+    """Portão de admissão sem vaga: rejeição rápida com Retry-After."""
+    response, status = _error_response(
+        'Servidor sobrecarregado, tente novamente em instantes', 503
+    )
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, status
+
+
 @api_bp.errorhandler(404)
 def not_found(error):
     """Tratamento para rotas não encontradas."""
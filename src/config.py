@@ -11,3 +11,198 @@ def get_db_config() -> Optional[Dict[str, str]]:
     if not (user and password and dsn):
         return None
     return {'user': user, 'password': password, 'dsn': dsn}
+
+
+def _env_float(nome: str, padrao: float) -> float:
+    try:
+        return float(os.getenv(nome, padrao))
+    except (TypeError, ValueError):
+        return padrao
+
+
+def _env_int(nome: str, padrao: int) -> int:
+    try:
+        return int(os.getenv(nome, padrao))
+    except (TypeError, ValueError):
+        return padrao
+
+
+def get_pool_config() -> Dict[str, int]:
+    """Tamanhos do pool de conexões por processo e do cache de comandos."""
+    minimo = max(_env_int('UPPATH_POOL_MIN', 2), 0)
+    return {
+        'min': minimo,
+        'max': max(_env_int('UPPATH_POOL_MAX', 8), minimo, 1),
+        'increment': max(_env_int('UPPATH_POOL_INCREMENT', 1), 1),
+        'stmtcachesize': max(_env_int('UPPATH_STMT_CACHE', 50), 0),
+    }
+
+
+def get_conexao_config() -> Dict[str, float]:
+    """Limites ao abrir conexões: segundos por tentativa de conexão TCP e
+    novas tentativas (o total fica limitado a `timeout × (tentativas + 1)`)."""
+    return {
+        'timeout': max(_env_float('UPPATH_DB_CONNECT_TIMEOUT_S', 10.0), 0.1),
+        'tentativas': max(_env_int('UPPATH_DB_RETRY_COUNT', 0), 0),
+    }
+
+
+def get_sessao_ping() -> float:
+    """Segundos ociosos após os quais a conexão da sessão da CLI é testada."""
+    return max(_env_float('UPPATH_SESSAO_PING_S', 60.0), 0.0)
+
+
+def get_slow_query_ms() -> float:
+    """Limite (ms) para registrar consultas no log de consultas lentas (0 desliga)."""
+    return _env_float('UPPATH_SLOW_QUERY_MS', 500.0)
+
+
+def get_admin_token() -> Optional[str]:
+    """Token dos recursos administrativos da API (profiling); None desliga."""
+    return os.getenv('UPPATH_ADMIN_TOKEN') or None
+
+
+def get_profile_dir() -> Optional[str]:
+    """Diretório onde salvar os arquivos .prof do profiling sob demanda."""
+    return os.getenv('UPPATH_PROFILE_DIR') or None
+
+
+def get_sampler_hz() -> float:
+    """Frequência (amostras/s) do amostrador contínuo de pilhas (0 desliga)."""
+    return _env_float('UPPATH_SAMPLER_HZ', 0.0)
+
+
+def get_sampler_janela() -> float:
+    """Janela (segundos) mantida pelo amostrador contínuo de pilhas."""
+    return _env_float('UPPATH_SAMPLER_JANELA', 300.0)
+
+
+def _env_mapa(nome: str, conversor) -> Dict[int, float]:
+    """Lê um mapa `id:valor,id:valor` (ex: UPPATH_TENANT_QUOTAS=3:4,7:1)."""
+    mapa = {}
+    for item in (os.getenv(nome) or '').split(','):
+        chave, _, valor = item.partition(':')
+        try:
+            mapa[int(chave)] = conversor(valor)
+        except ValueError:
+            continue
+    return mapa
+
+
+def get_admissao_config() -> Dict[str, object]:
+    """Controle de admissão das rotas que usam o banco (limite 0 desliga).
+
+    Por padrão o limite acompanha o tamanho máximo do pool de conexões e cada
+    empresa pode ocupar no máximo metade dele (`UPPATH_TENANT_QUOTA`).
+    Quotas e pesos por empresa: `UPPATH_TENANT_QUOTAS` e `UPPATH_TENANT_PESOS`.
+    """
+    limite = _env_int('UPPATH_ADMISSAO_LIMITE', get_pool_config()['max'])
+    return {
+        'limite': max(limite, 0),
+        'fila': max(_env_int('UPPATH_ADMISSAO_FILA', 2 * max(limite, 1)), 0),
+        'espera': max(_env_float('UPPATH_ADMISSAO_ESPERA_MS', 250.0), 0.0) / 1000,
+        'retry_after': max(_env_int('UPPATH_RETRY_AFTER', 1), 1),
+        'quota': max(_env_int('UPPATH_TENANT_QUOTA', max(limite // 2, 1)), 1),
+        'quotas': _env_mapa('UPPATH_TENANT_QUOTAS', int),
+        'pesos': _env_mapa('UPPATH_TENANT_PESOS', float),
+    }
+
+
+def get_disjuntor_config() -> Dict[str, float]:
+    """Disjuntor do acesso ao banco (falhas 0 desliga)."""
+    return {
+        'falhas': max(_env_int('UPPATH_DISJUNTOR_FALHAS', 5), 0),
+        'aberto': max(_env_float('UPPATH_DISJUNTOR_ABERTO_S', 30.0), 0.1),
+    }
+
+
+def get_cache_dashboard_entradas() -> int:
+    """Quantidade máxima de respostas de dashboard guardadas por worker."""
+    return max(_env_int('UPPATH_CACHE_ENTRADAS', 1000), 0)
+
+
+def get_referencia_ttl() -> float:
+    """Segundos até recarregar o cache de empresas/trilhas/cursos (0 desliga)."""
+    return max(_env_float('UPPATH_REFERENCIA_TTL', 300.0), 0.0)
+
+
+def get_rollup_config() -> Dict[str, float]:
+    """Detecção de anomalias.
+
+    `janela`: segundos em que registros recentes ficam acima da marca d'água
+    (deixados para a próxima execução do `detect-anomalies`), para transações
+    confirmadas com atraso não caírem abaixo dela.
+    """
+    return {
+        'janela': max(_env_float('UPPATH_ROLLUP_JANELA_S', 300.0), 0.0),
+    }
+
+
+def get_coalescer_dir() -> Optional[str]:
+    """Diretório dos arquivos de trava/resultado da coalescência entre workers."""
+    return os.getenv('UPPATH_COALESCER_DIR') or None
+
+
+def get_coalescer_espera() -> float:
+    """Espera máxima (s) por um cálculo idêntico em andamento antes de responder 503."""
+    return _env_float('UPPATH_COALESCER_ESPERA_S', 30.0)
+
+
+def get_swr_config() -> Dict[str, float]:
+    """TTLs (s) do stale-while-revalidate dos dashboards corporativos.
+
+    Até `soft` a resposta em cache é usada como está; entre `soft` e `hard` ela
+    é usada e atualizada em segundo plano; após `hard` é recalculada na hora.
+    `soft` 0 desliga.
+    """
+    soft = max(_env_float('UPPATH_SWR_SOFT_S', 60.0), 0.0)
+    return {
+        'soft': soft,
+        'hard': max(_env_float('UPPATH_SWR_HARD_S', 600.0), soft),
+        'threads': max(_env_int('UPPATH_SWR_THREADS', 2), 1),
+    }
+
+
+def get_anomalia_config() -> Dict[str, float]:
+    """Parâmetros da detecção de anomalias de bem-estar (EWMA por usuário).
+
+    `alpha` é o peso de cada registro novo na média/variância exponencial,
+    `limiar` o |z| a partir do qual o registro é anômalo e `minimo` quantos
+    registros o usuário precisa ter antes de ser avaliado.
+    """
+    alpha = _env_float('UPPATH_ANOMALIA_ALPHA', 0.1)
+    return {
+        'alpha': alpha if 0 < alpha <= 1 else 0.1,
+        'limiar': max(_env_float('UPPATH_ANOMALIA_LIMIAR', 3.0), 0.1),
+        'minimo': max(_env_int('UPPATH_ANOMALIA_MINIMO', 5), 1),
+    }
+
+
+def get_imagem_config() -> Dict[str, int]:
+    """Entrega das imagens de trilhas/cursos (BLOBs).
+
+    `max_age`: Cache-Control (s); `bloco`: bytes lidos do LOB por vez;
+    `cache_thumbs`: limite em bytes do cache de miniaturas por worker (0 desliga).
+    """
+    return {
+        'max_age': max(_env_int('UPPATH_IMAGEM_MAX_AGE', 604800), 0),
+        'bloco': max(_env_int('UPPATH_IMAGEM_BLOCO', 262144), 8192),
+        'cache_thumbs': max(_env_int('UPPATH_CACHE_THUMBS_BYTES', 32 * 1024 * 1024), 0),
+    }
+
+
+def get_miniatura_config() -> Dict[str, object]:
+    """Geração das miniaturas de trilhas/cursos.
+
+    `lado`: maior lado da miniatura (px); `formato`: JPEG, PNG ou WEBP;
+    `qualidade`: JPEG/WEBP (1-95); `lote`: registros por commit;
+    `bloco`: bytes lidos/gravados no LOB por vez.
+    """
+    formato = os.getenv('UPPATH_THUMB_FORMATO', 'JPEG').upper()
+    return {
+        'lado': min(max(_env_int('UPPATH_THUMB_LADO', 320), 16), 4096),
+        'formato': formato if formato in ('JPEG', 'PNG', 'WEBP') else 'JPEG',
+        'qualidade': min(max(_env_int('UPPATH_THUMB_QUALIDADE', 85), 1), 95),
+        'lote': max(_env_int('UPPATH_THUMB_LOTE', 50), 1),
+        'bloco': get_imagem_config()['bloco'],
+    }
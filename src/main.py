@@ -2,10 +2,16 @@
 main.py
 
 Ponto de entrada principal do sistema UpPath CRUD.
-Inicializa o banco de dados antes de exibir o menu.
+Inicializa o banco de dados antes de exibir o menu. O menu interativo usa uma
+única conexão durante toda a execução (`DAO.sessao()`), reaberta
+automaticamente se cair.
+
+Com argumentos, executa um subcomando não interativo (ver `src/ui/comandos.py`):
+    python src/main.py list-users --format ndjson
 """
 
 import sys
+from contextlib import ExitStack
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -21,8 +27,18 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 
-def main():
-    """Função principal que inicializa o sistema e exibe o menu."""
+def main(argv=None):
+    """Função principal que inicializa o sistema e exibe o menu.
+
+    Retorna o código de saída do processo.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        from src.ui import comandos
+
+        return comandos.executar(argv)
+
     # agora que o .env foi carregado e o sys.path ajustado, importe os
     # módulos que dependem das variáveis de ambiente/projeto
     from src.services import DAO as db
@@ -33,55 +49,58 @@ def main():
     ColorMsg.print_title('Sistema UpPath - Gestão de Usuários')
     ColorMsg.print_title('=' * 60)
 
-    # Inicializa tabelas e sequence (executado apenas uma vez)
-    try:
-        ColorMsg.print_info('\nInicializando banco de dados...')
-        db.init_table()
-        ColorMsg.print_success('OK - Banco de dados inicializado com sucesso!')
-    except Exception as e:
-        ColorMsg.print_error(f'\nERRO ao inicializar banco de dados: {e}')
-        ColorMsg.print_warning(
-            'Verifique se as variáveis de ambiente estão configuradas:'
-        )
-        ColorMsg.print_warning('  - ORACLE_USER')
-        ColorMsg.print_warning('  - ORACLE_PASSWORD')
-        ColorMsg.print_warning('  - ORACLE_DSN')
-        return
-
-    # Menu principal
-    while True:
-        ColorMsg.print_menu('\n' + '=' * 60)
-        ColorMsg.print_menu('MENU PRINCIPAL')
-        ColorMsg.print_menu('=' * 60)
-        ColorMsg.print_menu('1 - Criar usuário')
-        ColorMsg.print_menu('2 - Listar usuários')
-        ColorMsg.print_menu('3 - Buscar usuário por ID')
-        ColorMsg.print_menu('4 - Atualizar usuário')
-        ColorMsg.print_menu('5 - Deletar usuário')
-        ColorMsg.print_menu('6 - Querries')
-        ColorMsg.print_menu('0 - Sair')
-        ColorMsg.print_menu('=' * 60)
-
-        opcao = ColorMsg.input_prompt('Escolha uma opção: ').strip()
-
-        if opcao == '1':
-            crud_usuarios.criar_usuario()
-        elif opcao == '2':
-            crud_usuarios.listar_usuarios()
-        elif opcao == '3':
-            crud_usuarios.buscar_usuario_por_id()
-        elif opcao == '4':
-            crud_usuarios.atualizar_usuario()
-        elif opcao == '5':
-            crud_usuarios.deletar_usuario()
-        elif opcao == '6':
-            painel_queries.querries()
-        elif opcao == '0':
-            ColorMsg.print_info('\nEncerrando sistema...')
-            break
-        else:
-            ColorMsg.print_error('✗ Opção inválida. Tente novamente.')
+    with ExitStack() as pilha:
+        # Inicializa tabelas e sequence (executado apenas uma vez)
+        try:
+            ColorMsg.print_info('\nInicializando banco de dados...')
+            # Conexão da sessão: todas as ações do menu reutilizam a mesma
+            pilha.enter_context(db.sessao())
+            db.init_table()
+            ColorMsg.print_success('OK - Banco de dados inicializado com sucesso!')
+        except Exception as e:
+            ColorMsg.print_error(f'\nERRO ao inicializar banco de dados: {e}')
+            ColorMsg.print_warning(
+                'Verifique se as variáveis de ambiente estão configuradas:'
+            )
+            ColorMsg.print_warning('  - ORACLE_USER')
+            ColorMsg.print_warning('  - ORACLE_PASSWORD')
+            ColorMsg.print_warning('  - ORACLE_DSN')
+            return 1
+
+        # Menu principal
+        while True:
+            ColorMsg.print_menu('\n' + '=' * 60)
+            ColorMsg.print_menu('MENU PRINCIPAL')
+            ColorMsg.print_menu('=' * 60)
+            ColorMsg.print_menu('1 - Criar usuário')
+            ColorMsg.print_menu('2 - Listar usuários')
+            ColorMsg.print_menu('3 - Buscar usuário por ID')
+            ColorMsg.print_menu('4 - Atualizar usuário')
+            ColorMsg.print_menu('5 - Deletar usuário')
+            ColorMsg.print_menu('6 - Querries')
+            ColorMsg.print_menu('0 - Sair')
+            ColorMsg.print_menu('=' * 60)
+
+            opcao = ColorMsg.input_prompt('Escolha uma opção: ').strip()
+
+            if opcao == '1':
+                crud_usuarios.criar_usuario()
+            elif opcao == '2':
+                crud_usuarios.listar_usuarios()
+            elif opcao == '3':
+                crud_usuarios.buscar_usuario_por_id()
+            elif opcao == '4':
+                crud_usuarios.atualizar_usuario()
+            elif opcao == '5':
+                crud_usuarios.deletar_usuario()
+            elif opcao == '6':
+                painel_queries.querries()
+            elif opcao == '0':
+                ColorMsg.print_info('\nEncerrando sistema...')
+                return 0
+            else:
+                ColorMsg.print_error('✗ Opção inválida. Tente novamente.')
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
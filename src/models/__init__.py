@@ -0,0 +1 @@
+"""Modelos de dados compactos (registros de usuários e séries de bem-estar)."""
@@ -0,0 +1,107 @@
+"""
+registros.py
+
+Representações compactas para listas grandes e caches em memória.
+
+- `Usuario`: registro com `__slots__` (sem dict por instância).
+- `SerieBemEstar`: série de `bem_estar` em colunas `array` (alguns bytes por
+  registro em vez de um dict por linha).
+
+Ambos são convertidos para dicts apenas quando serializados (`to_json`).
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List
+
+_EPOCH = datetime(1970, 1, 1)
+_MICRO = timedelta(microseconds=1)
+
+
+class Usuario:
+    """Registro de `usuarios` com os campos na ordem do SELECT do DAO."""
+
+    __slots__ = (
+        'id_usuario',
+        'id_empresa',
+        'nome_completo',
+        'email',
+        'senha_hash',
+        'nivel_carreira',
+        'ocupacao',
+        'genero',
+        'data_nascimento',
+        'data_cadastro',
+        'is_admin',
+    )
+
+    def __init__(self, *valores):
+        for campo, valor in zip(self.__slots__, valores):
+            setattr(self, campo, valor)
+
+    def get(self, campo: str, default: Any = None) -> Any:
+        """Acesso no estilo dict (compatível com o código que usa `usuario.get`)."""
+        return getattr(self, campo, default)
+
+    def __getitem__(self, campo: str) -> Any:
+        try:
+            return getattr(self, campo)
+        except AttributeError:
+            raise KeyError(campo) from None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {campo: getattr(self, campo, None) for campo in self.__slots__}
+
+    to_json = to_dict
+
+    def __repr__(self):
+        return f'Usuario(id_usuario={self.id_usuario!r}, email={self.email!r})'
+
+
+class SerieBemEstar:
+    """Série de registros de `bem_estar` armazenada por colunas.
+
+    `data_registro` fica em microssegundos desde 1970 (`array('q')`) e os níveis
+    (0 a 10) em `array('b')`.
+    """
+
+    __slots__ = ('datas', 'estresse', 'motivacao', 'sono')
+
+    CAMPOS = ('data_registro', 'nivel_estresse', 'nivel_motivacao', 'qualidade_sono')
+
+    def __init__(self):
+        self.datas = array('q')
+        self.estresse = array('b')
+        self.motivacao = array('b')
+        self.sono = array('b')
+
+    @classmethod
+    def from_rows(cls, linhas: Iterable[tuple]) -> 'SerieBemEstar':
+        """Monta a série a partir de tuplas (data_registro, estresse, motivacao, sono)."""
+        serie = cls()
+        for linha in linhas:
+            serie.append(*linha)
+        return serie
+
+    def append(self, data_registro: datetime, estresse: int, motivacao: int, sono: int):
+        self.datas.append((data_registro - _EPOCH) // _MICRO)
+        self.estresse.append(estresse)
+        self.motivacao.append(motivacao)
+        self.sono.append(sono)
+
+    def __len__(self) -> int:
+        return len(self.datas)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self.datas)):
+            yield {
+                'data_registro': (_EPOCH + self.datas[i] * _MICRO).isoformat(),
+                'nivel_estresse': self.estresse[i],
+                'nivel_motivacao': self.motivacao[i],
+                'qualidade_sono': self.sono[i],
+            }
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    to_json = to_dicts
@@ -4,6 +4,7 @@ Camada para sincronizar usuários com banco Oracle e executar consultas.
 
 import logging
 import os
+import time
 from typing import Dict
 
 try:
@@ -11,19 +12,16 @@ try:
 except ImportError:
     oracledb = None
 
+from . import metricas
+from .disjuntor import disjuntor
+
 logging.basicConfig(
     level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
 
-def _connect(conn_info: Dict = None):
-    """Cria e retorna uma conexão direta com o banco Oracle.
-
-    Quem usar esta função deve fechar a conexão com `conn.close()` quando terminar.
-    """
-    if oracledb is None:
-        raise ModuleNotFoundError('oracledb não encontrado')
-
+def _credenciais(conn_info: Dict = None):
+    """Resolve (user, password, dsn) a partir de `conn_info` ou do ambiente."""
     if conn_info is None:
         try:
             from src.config import get_db_config
@@ -48,7 +46,152 @@ def _connect(conn_info: Dict = None):
     if not (user and password and dsn):
         raise ValueError('Informação de conexão Oracle incompleta')
 
-    return oracledb.connect(user=user, password=password, dsn=dsn)
+    return user, password, dsn
+
+
+def _nova_conexao(conn_info: Dict = None):
+    """Abre uma nova conexão física com o banco Oracle."""
+    if oracledb is None:
+        raise ModuleNotFoundError('oracledb não encontrado')
+
+    from src.config import get_conexao_config
+
+    limites = get_conexao_config()
+    user, password, dsn = _credenciais(conn_info)
+    return oracledb.connect(
+        user=user,
+        password=password,
+        dsn=dsn,
+        tcp_connect_timeout=limites['timeout'],
+        retry_count=limites['tentativas'],
+    )
+
+
+# Pool de conexões do processo (criado por `criar_pool`, ex: no post_fork do gunicorn)
+_pool = None
+
+
+def criar_pool(conn_info: Dict = None):
+    """Cria o pool de conexões do processo atual (idempotente).
+
+    Tamanhos e cache de comandos vêm de `src.config.get_pool_config()` e o
+    tempo limite de conexão de `src.config.get_conexao_config()`.
+    Conexões obtidas do pool voltam para ele em `conn.close()`.
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+    if oracledb is None:
+        raise ModuleNotFoundError('oracledb não encontrado')
+
+    from src.config import get_conexao_config, get_pool_config
+
+    cfg = get_pool_config()
+    limites = get_conexao_config()
+    user, password, dsn = _credenciais(conn_info)
+    _pool = oracledb.create_pool(
+        user=user,
+        password=password,
+        dsn=dsn,
+        min=cfg['min'],
+        max=cfg['max'],
+        increment=cfg['increment'],
+        stmtcachesize=cfg['stmtcachesize'],
+        tcp_connect_timeout=limites['timeout'],
+        retry_count=limites['tentativas'],
+    )
+    logging.info(
+        f'Pool de conexões criado (min={cfg["min"]}, max={cfg["max"]}, '
+        f'pid {os.getpid()}).'
+    )
+    return _pool
+
+
+def fechar_pool():
+    """Fecha o pool de conexões do processo, se existir."""
+    global _pool
+    if _pool is None:
+        return
+    try:
+        _pool.close(force=True)
+    except Exception as e:
+        logging.error(f'Erro ao fechar pool de conexões: {e}')
+    finally:
+        _pool = None
+
+
+def pool_ativo():
+    """Retorna o pool do processo (ou None se não foi criado)."""
+    return _pool
+
+
+# Conexão compartilhada por todas as chamadas enquanto `sessao()` estiver ativa
+_sessao = None
+_sessao_info: Dict = None
+_sessao_uso = 0.0
+
+
+class _ConexaoSessao:
+    """Envolve a conexão da sessão: `close()` não encerra a conexão real.
+
+    Assim o código existente (que sempre fecha a conexão ao terminar) pode
+    reutilizar a mesma conexão sem alterações.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def close(self):
+        pass
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+
+def _connect(conn_info: Dict = None):
+    """Cria e retorna uma conexão com o banco Oracle.
+
+    Dentro de um bloco `sessao()` retorna a conexão da sessão; se houver pool
+    (`criar_pool`), a conexão vem dele. Com o disjuntor aberto, levanta
+    `CircuitoAberto` sem tentar conectar.
+    Quem usar esta função deve fechar a conexão com `conn.close()` quando terminar.
+    """
+    if conn_info is None and _sessao is not None:
+        return _ConexaoSessao(_conexao_sessao())
+    return _abrir(conn_info)
+
+
+def _abrir(conn_info: Dict = None, usar_pool: bool = True):
+    """Obtém uma conexão (do pool ou nova) com métricas e disjuntor."""
+    teste = disjuntor.permitir()
+    inicio = time.perf_counter()
+    try:
+        if usar_pool and conn_info is None and _pool is not None:
+            conn = _pool.acquire()
+        else:
+            conn = _nova_conexao(conn_info)
+        if teste:
+            # Acesso de teste do disjuntor meio-aberto: confirma aqui com um
+            # ida-e-volta, já que nem todo uso da conexão reporta o resultado
+            try:
+                conn.ping()
+            except Exception:
+                conn.close()
+                raise
+            disjuntor.sucesso()
+        return conn
+    except (ValueError, ModuleNotFoundError):
+        # Erros de configuração não indicam banco indisponível
+        metricas.conexao_erros.inc()
+        raise
+    except Exception:
+        metricas.conexao_erros.inc()
+        disjuntor.falha()
+        raise
+    finally:
+        duracao = time.perf_counter() - inicio
+        metricas.conexao_duracao.observar(valor=duracao)
+        metricas.registrar_tempo('conn', duracao)
 
 
 def init_table(conn_info: Dict = None):
@@ -258,6 +401,550 @@ def init_table(conn_info: Dict = None):
         )
         logging.info('Tabela recomendacoes verificada/criada.')
 
+        # Tabelas de agregados (rollups) dos dashboards corporativos e das
+        # suas variações pendentes, gravadas pelos triggers `rollup_*_trg` e
+        # consolidadas por `rollups.atualizar_rollups` (ver
+        # src/services/rollups.py), e do
+        # estado atual/alertas de bem-estar (trigger `bem_estar_atual_trg` e
+        # `alertas.varrer_alertas`) e das
+        # linhas de base/anomalias por usuário (`anomalias.detectar_anomalias`)
+        for nome, ddl in (
+            (
+                'rollup_bem_estar_dia',
+                """
+                CREATE TABLE rollup_bem_estar_dia (
+                    id_empresa NUMBER(6) NOT NULL,
+                    dia DATE NOT NULL,
+                    soma_estresse NUMBER(12) NOT NULL,
+                    soma_motivacao NUMBER(12) NOT NULL,
+                    soma_sono NUMBER(12) NOT NULL,
+                    registros NUMBER(10) NOT NULL,
+                    CONSTRAINT rollup_bem_estar_dia_PK PRIMARY KEY (id_empresa, dia)
+                )""",
+            ),
+            (
+                'rollup_trilha_empresa',
+                """
+                CREATE TABLE rollup_trilha_empresa (
+                    id_empresa NUMBER(6) NOT NULL,
+                    id_trilha NUMBER(6) NOT NULL,
+                    total_usuarios NUMBER(10) NOT NULL,
+                    CONSTRAINT rollup_trilha_empresa_PK PRIMARY KEY (id_empresa, id_trilha)
+                )""",
+            ),
+            (
+                'rollup_delta_bem_estar',
+                """
+                CREATE TABLE rollup_delta_bem_estar (
+                    id_delta NUMBER(12) NOT NULL,
+                    id_empresa NUMBER(6) NOT NULL,
+                    dia DATE NOT NULL,
+                    d_estresse NUMBER(12) NOT NULL,
+                    d_motivacao NUMBER(12) NOT NULL,
+                    d_sono NUMBER(12) NOT NULL,
+                    d_registros NUMBER(10) NOT NULL,
+                    CONSTRAINT rollup_delta_bem_estar_PK PRIMARY KEY (id_delta)
+                )""",
+            ),
+            (
+                'rollup_delta_trilhas',
+                """
+                CREATE TABLE rollup_delta_trilhas (
+                    id_delta NUMBER(12) NOT NULL,
+                    id_empresa NUMBER(6) NOT NULL,
+                    id_trilha NUMBER(6) NOT NULL,
+                    d_total NUMBER(10) NOT NULL,
+                    CONSTRAINT rollup_delta_trilhas_PK PRIMARY KEY (id_delta)
+                )""",
+            ),
+            (
+                'bem_estar_atual',
+                """
+                CREATE TABLE bem_estar_atual (
+                    id_usuario NUMBER(6) NOT NULL,
+                    id_registro NUMBER(8) NOT NULL,
+                    data_registro TIMESTAMP NOT NULL,
+                    nivel_estresse NUMBER(2) NOT NULL,
+                    nivel_motivacao NUMBER(2) NOT NULL,
+                    qualidade_sono NUMBER(2) NOT NULL,
+                    alertado NUMBER(1),
+                    CONSTRAINT bem_estar_atual_PK PRIMARY KEY (id_usuario)
+                )""",
+            ),
+            (
+                'alertas_motivacao',
+                """
+                CREATE TABLE alertas_motivacao (
+                    id_registro NUMBER(8) NOT NULL,
+                    id_usuario NUMBER(6) NOT NULL,
+                    id_empresa NUMBER(6),
+                    nivel_motivacao NUMBER(2) NOT NULL,
+                    data_registro TIMESTAMP NOT NULL,
+                    criado_em TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL,
+                    CONSTRAINT alertas_motivacao_PK PRIMARY KEY (id_registro)
+                )""",
+            ),
+            (
+                'baseline_bem_estar',
+                """
+                CREATE TABLE baseline_bem_estar (
+                    id_usuario NUMBER(6) NOT NULL,
+                    marca NUMBER(8) NOT NULL,
+                    marca_data TIMESTAMP,
+                    registros NUMBER(10) NOT NULL,
+                    checksum NUMBER(20) DEFAULT 0 NOT NULL,
+                    media_estresse BINARY_DOUBLE NOT NULL,
+                    media_motivacao BINARY_DOUBLE NOT NULL,
+                    media_sono BINARY_DOUBLE NOT NULL,
+                    var_estresse BINARY_DOUBLE NOT NULL,
+                    var_motivacao BINARY_DOUBLE NOT NULL,
+                    var_sono BINARY_DOUBLE NOT NULL,
+                    atualizado_em TIMESTAMP NOT NULL,
+                    CONSTRAINT baseline_bem_estar_PK PRIMARY KEY (id_usuario)
+                )""",
+            ),
+            (
+                'anomalias_bem_estar',
+                """
+                CREATE TABLE anomalias_bem_estar (
+                    id_registro NUMBER(8) NOT NULL,
+                    id_usuario NUMBER(6) NOT NULL,
+                    id_empresa NUMBER(6),
+                    data_registro TIMESTAMP NOT NULL,
+                    z_estresse NUMBER(8, 2) NOT NULL,
+                    z_motivacao NUMBER(8, 2) NOT NULL,
+                    z_sono NUMBER(8, 2) NOT NULL,
+                    detectado_em TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL,
+                    CONSTRAINT anomalias_bem_estar_PK PRIMARY KEY (id_registro)
+                )""",
+            ),
+            (
+                'rollup_controle',
+                """
+                CREATE TABLE rollup_controle (
+                    nome VARCHAR2(30) NOT NULL,
+                    marca NUMBER(8),
+                    marca_data TIMESTAMP,
+                    registros NUMBER(12) DEFAULT 0 NOT NULL,
+                    checksum NUMBER(20) DEFAULT 0 NOT NULL,
+                    atualizado_em TIMESTAMP,
+                    CONSTRAINT rollup_controle_PK PRIMARY KEY (nome)
+                )""",
+            ),
+        ):
+            cur.execute(
+                """
+                BEGIN
+                    EXECUTE IMMEDIATE :ddl;
+                EXCEPTION
+                    WHEN OTHERS THEN
+                        IF SQLCODE != -955 THEN
+                            RAISE;
+                        END IF;
+                END;
+                """,
+                {'ddl': ddl},
+            )
+            logging.info(f'Tabela {nome} verificada/criada.')
+
+        cur.execute(
+            """
+            MERGE INTO rollup_controle c
+            USING (
+                SELECT 'bem_estar' AS nome FROM dual
+                UNION ALL
+                SELECT 'usuario_trilha' FROM dual
+                UNION ALL
+                SELECT 'alertas_motivacao' FROM dual
+                UNION ALL
+                SELECT 'anomalias' FROM dual
+                UNION ALL
+                SELECT 'miniaturas_trilhas' FROM dual
+                UNION ALL
+                SELECT 'miniaturas_cursos' FROM dual
+                UNION ALL
+                SELECT 'referencia_empresas' FROM dual
+                UNION ALL
+                SELECT 'referencia_trilhas' FROM dual
+                UNION ALL
+                SELECT 'referencia_cursos' FROM dual
+            ) n ON (c.nome = n.nome)
+            WHEN NOT MATCHED THEN INSERT (nome) VALUES (n.nome)
+            """
+        )
+
+        # Listagem de anomalias por empresa e período
+        cur.execute(
+            """
+            BEGIN
+                EXECUTE IMMEDIATE 'CREATE INDEX anomalias_empresa_ix ON anomalias_bem_estar (id_empresa, data_registro)';
+            EXCEPTION
+                WHEN OTHERS THEN
+                    IF SQLCODE NOT IN (-955, -1408) THEN
+                        RAISE;
+                    END IF;
+            END;
+            """
+        )
+        logging.info('Índice anomalias_empresa_ix verificado/criado.')
+
+        # Marca por data e soma de verificação das linhas de base (linhas de
+        # base antigas, sem marca_data, são recalculadas pelo job)
+        cur.execute(
+            """
+            BEGIN
+                EXECUTE IMMEDIATE 'ALTER TABLE baseline_bem_estar ADD (
+                    marca_data TIMESTAMP,
+                    checksum NUMBER(20) DEFAULT 0 NOT NULL
+                )';
+            EXCEPTION
+                WHEN OTHERS THEN
+                    IF SQLCODE != -1430 THEN
+                        RAISE;
+                    END IF;
+            END;
+            """
+        )
+        logging.info('Colunas de baseline_bem_estar verificadas/criadas.')
+
+        # Último registro de cada usuário (trigger de bem_estar_atual, anomalias)
+        cur.execute(
+            """
+            BEGIN
+                EXECUTE IMMEDIATE 'CREATE INDEX bem_estar_usuario_ix ON bem_estar (id_usuario, data_registro, id_registro)';
+            EXCEPTION
+                WHEN OTHERS THEN
+                    IF SQLCODE NOT IN (-955, -1408) THEN
+                        RAISE;
+                    END IF;
+            END;
+            """
+        )
+        logging.info('Índice bem_estar_usuario_ix verificado/criado.')
+
+        # bem_estar_atual criada antes do trigger (mantida pela antiga
+        # varredura incremental): a próxima varredura a povoa de novo
+        cur.execute(
+            """
+            BEGIN
+                EXECUTE IMMEDIATE 'ALTER TABLE bem_estar_atual ADD (alertado NUMBER(1))';
+                UPDATE rollup_controle SET atualizado_em = NULL
+                WHERE nome = 'alertas_motivacao';
+            EXCEPTION
+                WHEN OTHERS THEN
+                    IF SQLCODE != -1430 THEN
+                        RAISE;
+                    END IF;
+            END;
+            """
+        )
+
+        # Mantém bem_estar_atual na mesma transação que altera bem_estar. Os
+        # usuários afetados são recalculados ao fim do comando (sem o erro de
+        # tabela mutante), em ordem de id e com a linha do usuário travada, para
+        # transações simultâneas do mesmo usuário não gravarem estados antigos.
+        # `alertado` volta a NULL quando a motivação atual deixa de ser baixa
+        # (< 5, alertas.LIMITE_MOTIVACAO).
+        cur.execute(
+            """
+            CREATE OR REPLACE TRIGGER bem_estar_atual_trg
+            FOR INSERT OR UPDATE OR DELETE ON bem_estar
+            COMPOUND TRIGGER
+                TYPE t_usuarios IS TABLE OF BOOLEAN INDEX BY PLS_INTEGER;
+                usuarios_afetados t_usuarios;
+                v_usuario PLS_INTEGER;
+                v_travado PLS_INTEGER;
+
+                AFTER EACH ROW IS
+                BEGIN
+                    IF INSERTING OR UPDATING THEN
+                        usuarios_afetados(:NEW.id_usuario) := TRUE;
+                    END IF;
+                    IF DELETING OR UPDATING THEN
+                        usuarios_afetados(:OLD.id_usuario) := TRUE;
+                    END IF;
+                END AFTER EACH ROW;
+
+                AFTER STATEMENT IS
+                BEGIN
+                    v_usuario := usuarios_afetados.FIRST;
+                    WHILE v_usuario IS NOT NULL LOOP
+                        SELECT id_usuario INTO v_travado
+                        FROM usuarios WHERE id_usuario = v_usuario
+                        FOR UPDATE;
+
+                        MERGE INTO bem_estar_atual a
+                        USING (
+                            SELECT id_usuario, id_registro, data_registro,
+                                   nivel_estresse, nivel_motivacao, qualidade_sono
+                            FROM bem_estar
+                            WHERE id_usuario = v_usuario
+                            ORDER BY data_registro DESC, id_registro DESC
+                            FETCH FIRST 1 ROWS ONLY
+                        ) n
+                        ON (a.id_usuario = n.id_usuario)
+                        WHEN MATCHED THEN UPDATE SET
+                            a.id_registro = n.id_registro,
+                            a.data_registro = n.data_registro,
+                            a.nivel_estresse = n.nivel_estresse,
+                            a.nivel_motivacao = n.nivel_motivacao,
+                            a.qualidade_sono = n.qualidade_sono,
+                            a.alertado = CASE WHEN n.nivel_motivacao < 5 THEN a.alertado END
+                        WHEN NOT MATCHED THEN INSERT
+                            (id_usuario, id_registro, data_registro,
+                             nivel_estresse, nivel_motivacao, qualidade_sono)
+                        VALUES
+                            (n.id_usuario, n.id_registro, n.data_registro,
+                             n.nivel_estresse, n.nivel_motivacao, n.qualidade_sono);
+
+                        IF SQL%ROWCOUNT = 0 THEN
+                            DELETE FROM bem_estar_atual WHERE id_usuario = v_usuario;
+                        END IF;
+                        v_usuario := usuarios_afetados.NEXT(v_usuario);
+                    END LOOP;
+                END AFTER STATEMENT;
+            END bem_estar_atual_trg;
+            """
+        )
+        logging.info('Trigger bem_estar_atual_trg verificado/criado.')
+
+        # Variações dos rollups. A criação da sequence marca a migração de um
+        # esquema anterior (rollups mantidos só pelo job): os rollups voltam a
+        # ser recalculados na próxima execução do job e, até lá, as consultas
+        # leem as tabelas originais.
+        cur.execute(
+            """
+            BEGIN
+                EXECUTE IMMEDIATE 'CREATE SEQUENCE rollup_delta_seq CACHE 100';
+                UPDATE rollup_controle SET atualizado_em = NULL
+                WHERE nome IN ('bem_estar', 'usuario_trilha');
+            EXCEPTION
+                WHEN OTHERS THEN
+                    IF SQLCODE != -955 THEN
+                        RAISE;
+                    END IF;
+            END;
+            """
+        )
+        cur.execute(
+            """
+            BEGIN
+                EXECUTE IMMEDIATE 'DROP TABLE rollup_membros';
+            EXCEPTION
+                WHEN OTHERS THEN
+                    IF SQLCODE != -942 THEN
+                        RAISE;
+                    END IF;
+            END;
+            """
+        )
+        for tabela in ('rollup_delta_bem_estar', 'rollup_delta_trilhas'):
+            cur.execute(
+                f"""
+                BEGIN
+                    EXECUTE IMMEDIATE 'CREATE INDEX {tabela}_ix ON {tabela} (id_empresa)';
+                EXCEPTION
+                    WHEN OTHERS THEN
+                        IF SQLCODE NOT IN (-955, -1408) THEN
+                            RAISE;
+                        END IF;
+                END;
+                """
+            )
+
+        # Cada alteração grava a sua variação na mesma transação. A linha do
+        # usuário é travada ao ler a empresa, serializando com a troca de
+        # empresa (que move os totais do usuário para a nova empresa).
+        cur.execute(
+            """
+            CREATE OR REPLACE TRIGGER rollup_bem_estar_trg
+            AFTER INSERT OR DELETE OR UPDATE OF
+                id_usuario, data_registro, nivel_estresse, nivel_motivacao, qualidade_sono
+            ON bem_estar
+            FOR EACH ROW
+            DECLARE
+                v_empresa usuarios.id_empresa%TYPE;
+            BEGIN
+                IF DELETING OR UPDATING THEN
+                    SELECT id_empresa INTO v_empresa
+                    FROM usuarios WHERE id_usuario = :OLD.id_usuario
+                    FOR UPDATE;
+                    IF v_empresa IS NOT NULL THEN
+                        INSERT INTO rollup_delta_bem_estar
+                            (id_delta, id_empresa, dia, d_estresse, d_motivacao,
+                             d_sono, d_registros)
+                        VALUES
+                            (rollup_delta_seq.NEXTVAL, v_empresa,
+                             TRUNC(:OLD.data_registro), -:OLD.nivel_estresse,
+                             -:OLD.nivel_motivacao, -:OLD.qualidade_sono, -1);
+                    END IF;
+                END IF;
+                IF INSERTING OR UPDATING THEN
+                    SELECT id_empresa INTO v_empresa
+                    FROM usuarios WHERE id_usuario = :NEW.id_usuario
+                    FOR UPDATE;
+                    IF v_empresa IS NOT NULL THEN
+                        INSERT INTO rollup_delta_bem_estar
+                            (id_delta, id_empresa, dia, d_estresse, d_motivacao,
+                             d_sono, d_registros)
+                        VALUES
+                            (rollup_delta_seq.NEXTVAL, v_empresa,
+                             TRUNC(:NEW.data_registro), :NEW.nivel_estresse,
+                             :NEW.nivel_motivacao, :NEW.qualidade_sono, 1);
+                    END IF;
+                END IF;
+            END;
+            """
+        )
+        cur.execute(
+            """
+            CREATE OR REPLACE TRIGGER rollup_usuario_trilha_trg
+            AFTER INSERT OR DELETE OR UPDATE OF id_usuario, id_trilha
+            ON usuario_trilha
+            FOR EACH ROW
+            DECLARE
+                v_empresa usuarios.id_empresa%TYPE;
+            BEGIN
+                IF DELETING OR UPDATING THEN
+                    SELECT id_empresa INTO v_empresa
+                    FROM usuarios WHERE id_usuario = :OLD.id_usuario
+                    FOR UPDATE;
+                    IF v_empresa IS NOT NULL THEN
+                        INSERT INTO rollup_delta_trilhas (id_delta, id_empresa, id_trilha, d_total)
+                        VALUES (rollup_delta_seq.NEXTVAL, v_empresa, :OLD.id_trilha, -1);
+                    END IF;
+                END IF;
+                IF INSERTING OR UPDATING THEN
+                    SELECT id_empresa INTO v_empresa
+                    FROM usuarios WHERE id_usuario = :NEW.id_usuario
+                    FOR UPDATE;
+                    IF v_empresa IS NOT NULL THEN
+                        INSERT INTO rollup_delta_trilhas (id_delta, id_empresa, id_trilha, d_total)
+                        VALUES (rollup_delta_seq.NEXTVAL, v_empresa, :NEW.id_trilha, 1);
+                    END IF;
+                END IF;
+            END;
+            """
+        )
+        cur.execute(
+            """
+            CREATE OR REPLACE TRIGGER rollup_usuarios_trg
+            AFTER UPDATE OF id_empresa ON usuarios
+            FOR EACH ROW
+            WHEN (DECODE(OLD.id_empresa, NEW.id_empresa, 0, 1) = 1)
+            BEGIN
+                IF :OLD.id_empresa IS NOT NULL THEN
+                    INSERT INTO rollup_delta_bem_estar
+                        (id_delta, id_empresa, dia, d_estresse, d_motivacao,
+                         d_sono, d_registros)
+                    SELECT rollup_delta_seq.NEXTVAL, :OLD.id_empresa, dia,
+                           -estresse, -motivacao, -sono, -registros
+                    FROM (
+                        SELECT TRUNC(data_registro) AS dia,
+                               SUM(nivel_estresse) AS estresse,
+                               SUM(nivel_motivacao) AS motivacao,
+                               SUM(qualidade_sono) AS sono, COUNT(*) AS registros
+                        FROM bem_estar WHERE id_usuario = :OLD.id_usuario
+                        GROUP BY TRUNC(data_registro)
+                    );
+                    INSERT INTO rollup_delta_trilhas (id_delta, id_empresa, id_trilha, d_total)
+                    SELECT rollup_delta_seq.NEXTVAL, :OLD.id_empresa, id_trilha, -1
+                    FROM usuario_trilha WHERE id_usuario = :OLD.id_usuario;
+                END IF;
+                IF :NEW.id_empresa IS NOT NULL THEN
+                    INSERT INTO rollup_delta_bem_estar
+                        (id_delta, id_empresa, dia, d_estresse, d_motivacao,
+                         d_sono, d_registros)
+                    SELECT rollup_delta_seq.NEXTVAL, :NEW.id_empresa, dia,
+                           estresse, motivacao, sono, registros
+                    FROM (
+                        SELECT TRUNC(data_registro) AS dia,
+                               SUM(nivel_estresse) AS estresse,
+                               SUM(nivel_motivacao) AS motivacao,
+                               SUM(qualidade_sono) AS sono, COUNT(*) AS registros
+                        FROM bem_estar WHERE id_usuario = :NEW.id_usuario
+                        GROUP BY TRUNC(data_registro)
+                    );
+                    INSERT INTO rollup_delta_trilhas (id_delta, id_empresa, id_trilha, d_total)
+                    SELECT rollup_delta_seq.NEXTVAL, :NEW.id_empresa, id_trilha, 1
+                    FROM usuario_trilha WHERE id_usuario = :NEW.id_usuario;
+                END IF;
+            END;
+            """
+        )
+        logging.info('Variações e triggers dos rollups verificados/criados.')
+
+        # Metadados das miniaturas (geradas pelo job de miniaturas)
+        for tabela, coluna in (('trilhas', 'imagem_trilha'), ('cursos', 'imagem_curso')):
+            cur.execute(
+                f"""
+                BEGIN
+                    EXECUTE IMMEDIATE 'ALTER TABLE {tabela} ADD (
+                        {coluna}_thumb_mime VARCHAR2(100),
+                        {coluna}_thumb_tamanho NUMBER(10),
+                        {coluna}_thumb_lado NUMBER(5),
+                        {coluna}_thumb_erro VARCHAR2(200)
+                    )';
+                EXCEPTION
+                    WHEN OTHERS THEN
+                        IF SQLCODE != -1430 THEN
+                            RAISE;
+                        END IF;
+                END;
+                """
+            )
+        logging.info('Colunas de miniatura de trilhas/cursos verificadas/criadas.')
+
+        # Versão da imagem (ETag) e miniatura pendente: marcadas por trigger
+        # sempre que a imagem muda. ORA_ROWSCN não serve: sem ROWDEPENDENCIES
+        # ele é por bloco, e muda com qualquer alteração em linhas vizinhas (ou
+        # na própria miniatura). `_thumb_pendente` só é 1 ou NULL, então o
+        # índice guarda apenas as linhas pendentes.
+        for tabela, coluna in (('trilhas', 'imagem_trilha'), ('cursos', 'imagem_curso')):
+            for definicao in (f'{coluna}_versao TIMESTAMP', f'{coluna}_thumb_pendente NUMBER(1)'):
+                cur.execute(
+                    f"""
+                    BEGIN
+                        EXECUTE IMMEDIATE 'ALTER TABLE {tabela} ADD ({definicao})';
+                    EXCEPTION
+                        WHEN OTHERS THEN
+                            IF SQLCODE != -1430 THEN
+                                RAISE;
+                            END IF;
+                    END;
+                    """
+                )
+            cur.execute(
+                f"""
+                BEGIN
+                    EXECUTE IMMEDIATE 'CREATE INDEX {tabela}_thumb_pendente_ix ON {tabela} ({coluna}_thumb_pendente)';
+                EXCEPTION
+                    WHEN OTHERS THEN
+                        IF SQLCODE NOT IN (-955, -1408) THEN
+                            RAISE;
+                        END IF;
+                END;
+                """
+            )
+            cur.execute(
+                f"""
+                CREATE OR REPLACE TRIGGER {tabela}_imagem_trg
+                BEFORE INSERT OR UPDATE OF {coluna}, {coluna}_mime, {coluna}_tamanho
+                ON {tabela}
+                FOR EACH ROW
+                BEGIN
+                    IF :NEW.{coluna} IS NULL THEN
+                        :NEW.{coluna}_versao := NULL;
+                        :NEW.{coluna}_thumb_pendente := NULL;
+                    ELSE
+                        :NEW.{coluna}_versao := SYSTIMESTAMP;
+                        :NEW.{coluna}_thumb_pendente := 1;
+                    END IF;
+                END;
+                """
+            )
+        logging.info('Versão e miniatura pendente das imagens de trilhas/cursos verificadas/criadas.')
+
         # Criar sequence com START baseado em MAX(id_usuario) existente
         try:
             # Verifica MAX(id_usuario) existente
@@ -296,6 +983,69 @@ def init_table(conn_info: Dict = None):
 # manter responsabilidade única por entidade.
 from contextlib import contextmanager
 
+from .row_factory import MODO_TUPLA, consultar
+
+
+@contextmanager
+def sessao(conn_info: Dict = None):
+    """Mantém uma única conexão aberta para todas as chamadas ao DAO no bloco.
+
+    Se a conexão cair (ex: VPN, timeout do banco), a próxima chamada abre
+    outra automaticamente (ver `_conexao_sessao`); a operação que estava em
+    andamento falha normalmente e não é repetida.
+
+    Usage:
+        with sessao():
+            list_usuarios()      # reutiliza a mesma conexão
+            list_empresas()
+    """
+    global _sessao, _sessao_info, _sessao_uso
+    if _sessao is not None:
+        # Sessão já ativa (blocos aninhados): apenas reutiliza
+        yield _sessao
+        return
+
+    _sessao = _abrir(conn_info, usar_pool=False)
+    _sessao_info = conn_info
+    _sessao_uso = time.monotonic()
+    try:
+        yield _sessao
+    finally:
+        conn, _sessao, _sessao_info = _sessao, None, None
+        try:
+            conn.close()
+        except Exception as e:
+            logging.debug(f'Erro ao fechar a conexão da sessão: {e}')
+
+
+def _conexao_sessao():
+    """Conexão da sessão, reaberta se tiver caído.
+
+    `is_healthy()` não vai ao banco; só depois de `UPPATH_SESSAO_PING_S`
+    segundos sem uso (ex: usuário parado no menu) a conexão é testada com um
+    `ping()`, que detecta conexões derrubadas por firewall/VPN.
+    """
+    global _sessao, _sessao_uso
+    from src.config import get_sessao_ping
+
+    conn = _sessao
+    agora = time.monotonic()
+    saudavel = conn.is_healthy()
+    if saudavel and agora - _sessao_uso > get_sessao_ping():
+        try:
+            conn.ping()
+        except Exception:
+            saudavel = False
+    if not saudavel:
+        logging.warning('Conexão da sessão perdida; reconectando.')
+        try:
+            conn.close()
+        except Exception:
+            pass
+        _sessao = conn = _abrir(_sessao_info, usar_pool=False)
+    _sessao_uso = agora
+    return conn
+
 
 @contextmanager
 def get_cursor(conn_info: Dict = None):
@@ -308,14 +1058,17 @@ def get_cursor(conn_info: Dict = None):
         conn.close()
 
 
+@metricas.instrumentar('DAO.list_empresas')
 def list_empresas(conn_info: Dict = None):
     """Retorna lista de empresas (id_empresa, nome_empresa)."""
     conn = _connect(conn_info)
     cur = conn.cursor()
     try:
-        cur.execute("SELECT id_empresa, nome_empresa FROM empresas ORDER BY id_empresa")
-        empresas = cur.fetchall()
-        return empresas
+        return consultar(
+            cur,
+            'SELECT id_empresa, nome_empresa FROM empresas ORDER BY id_empresa',
+            modo=MODO_TUPLA,
+        )
     except Exception as e:
         logging.error(f'Erro ao listar empresas: {e}')
         return []
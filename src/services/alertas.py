@@ -0,0 +1,228 @@
+"""
+alertas.py
+
+Estado mais recente de bem-estar por funcionário e alertas de baixa motivação.
+
+Tabelas (criadas por `DAO.init_table`):
+    - bem_estar_atual:   último registro de bem_estar de cada usuário (por
+      data_registro, depois id_registro), mantido pelo trigger
+      `bem_estar_atual_trg` na mesma transação que altera `bem_estar`
+      (inclusões, alterações e remoções); `alertado` indica que o estado de
+      baixa motivação atual já gerou alerta e volta a NULL quando o
+      funcionário sai do risco;
+    - alertas_motivacao: um alerta por registro que levou um funcionário a
+      baixa motivação (< 5) a partir de um estado sem risco (ou sem estado);
+    - rollup_controle:   linha 'alertas_motivacao', preenchida quando
+      `bem_estar_atual` foi povoada a partir do histórico.
+
+O trigger só acompanha o que muda depois de criado: a primeira varredura
+(`varrer_alertas`, subcomando `scan-alerts`) povoa `bem_estar_atual` a partir
+do histórico e, até lá, `/baixa-motivacao?atual=1` usa a consulta completa.
+Cada varredura emite os alertas dos funcionários em baixa motivação ainda não
+alertados; `varrer_alertas(reconstruir=True)` recalcula o estado a partir do
+histórico sem emitir alertas.
+"""
+
+import logging
+import time
+from typing import Any, Dict
+
+from .DAO import _connect
+from .exceptions import DatabaseError
+from .metricas import instrumentar
+from .row_factory import MODO_TUPLA, consultar, consultar_um
+
+logger = logging.getLogger(__name__)
+
+# Motivação abaixo deste nível é considerada baixa (repetido no trigger
+# `bem_estar_atual_trg` de `DAO.init_table`)
+LIMITE_MOTIVACAO = 5
+
+# ---------------------------------------------------------------------------
+# SQL usado pelas consultas
+# ---------------------------------------------------------------------------
+
+SQL_ESTADO_PRONTO = """
+    SELECT COUNT(*) FROM rollup_controle
+    WHERE nome = 'alertas_motivacao' AND atualizado_em IS NOT NULL
+"""
+
+# Último estado de cada funcionário da empresa (mantido pelo trigger)
+SQL_BAIXA_MOTIVACAO_ATUAL = f"""
+    SELECT a.id_usuario, u.nome_completo, a.nivel_motivacao, a.data_registro
+    FROM bem_estar_atual a
+    JOIN usuarios u ON u.id_usuario = a.id_usuario
+    WHERE u.id_empresa = :id_empresa
+      AND a.nivel_motivacao < {LIMITE_MOTIVACAO}
+    ORDER BY a.data_registro DESC
+"""
+
+# Mesmo resultado direto do histórico (antes da primeira varredura)
+SQL_BAIXA_MOTIVACAO_ATUAL_HISTORICO = f"""
+    SELECT id_usuario, nome_completo, nivel_motivacao, data_registro
+    FROM (
+        SELECT
+            b.id_usuario,
+            u.nome_completo,
+            b.nivel_motivacao,
+            b.data_registro,
+            ROW_NUMBER() OVER (
+                PARTITION BY b.id_usuario
+                ORDER BY b.data_registro DESC, b.id_registro DESC
+            ) AS rn
+        FROM bem_estar b
+        JOIN usuarios u ON u.id_usuario = b.id_usuario
+        WHERE u.id_empresa = :id_empresa
+    )
+    WHERE rn = 1 AND nivel_motivacao < {LIMITE_MOTIVACAO}
+    ORDER BY data_registro DESC
+"""
+
+
+def estado_pronto(cursor) -> bool:
+    """Indica se `bem_estar_atual` já foi povoada a partir do histórico."""
+    try:
+        row = consultar_um(cursor, SQL_ESTADO_PRONTO, modo=MODO_TUPLA)
+    except Exception as e:
+        # Tabelas ainda não criadas (init_table antigo) ou outro erro: histórico
+        logger.debug(f'Estado atual de bem-estar indisponível: {e}')
+        return False
+    return row is not None and row[0] == 1
+
+
+# ---------------------------------------------------------------------------
+# Job de varredura
+# ---------------------------------------------------------------------------
+
+# Estado atual a partir do histórico; `:alertado` 1 não emite alertas para
+# quem já está em baixa motivação
+_POVOAR = f"""
+    INSERT INTO bem_estar_atual
+        (id_usuario, id_registro, data_registro,
+         nivel_estresse, nivel_motivacao, qualidade_sono, alertado)
+    SELECT id_usuario, id_registro, data_registro,
+           nivel_estresse, nivel_motivacao, qualidade_sono,
+           CASE WHEN nivel_motivacao < {LIMITE_MOTIVACAO} THEN :alertado END
+    FROM (
+        SELECT b.id_usuario, b.id_registro, b.data_registro,
+               b.nivel_estresse, b.nivel_motivacao, b.qualidade_sono,
+               ROW_NUMBER() OVER (
+                   PARTITION BY b.id_usuario
+                   ORDER BY b.data_registro DESC, b.id_registro DESC
+               ) AS rn
+        FROM bem_estar b
+    )
+    WHERE rn = 1
+"""
+
+# Funcionários em baixa motivação ainda sem alerta, marcados com 0 (e com a
+# linha travada) até o fim da transação: o trigger de outra sessão que mudar
+# o estado deles espera o commit
+_MARCAR = f"""
+    UPDATE bem_estar_atual SET alertado = 0
+    WHERE nivel_motivacao < {LIMITE_MOTIVACAO} AND alertado IS NULL
+"""
+
+_INSERT_ALERTAS = """
+    INSERT INTO alertas_motivacao
+        (id_registro, id_usuario, id_empresa, nivel_motivacao, data_registro)
+    SELECT a.id_registro, a.id_usuario, u.id_empresa, a.nivel_motivacao, a.data_registro
+    FROM bem_estar_atual a
+    JOIN usuarios u ON u.id_usuario = a.id_usuario
+    WHERE a.alertado = 0
+      AND NOT EXISTS (
+          SELECT 1 FROM alertas_motivacao al WHERE al.id_registro = a.id_registro
+      )
+"""
+
+_ALERTAS_EMITIDOS = """
+    SELECT al.id_registro, al.id_usuario, al.id_empresa, u.nome_completo,
+           al.nivel_motivacao, al.data_registro
+    FROM alertas_motivacao al
+    JOIN bem_estar_atual a ON a.id_registro = al.id_registro
+    JOIN usuarios u ON u.id_usuario = al.id_usuario
+    WHERE a.alertado = 0 AND al.criado_em >= :agora
+    ORDER BY al.id_empresa, al.data_registro
+"""
+
+_CONFIRMAR = 'UPDATE bem_estar_atual SET alertado = 1 WHERE alertado = 0'
+
+
+@instrumentar('alertas.varrer_alertas')
+def varrer_alertas(conn_info: Dict = None, reconstruir: bool = False) -> Dict[str, Any]:
+    """Emite alertas para os funcionários que passaram a ter baixa motivação.
+
+    Roda com a linha de controle travada (uma varredura por vez). Na primeira
+    execução (ou com `reconstruir`) povoa `bem_estar_atual` a partir do
+    histórico, com `bem_estar` travada contra alterações durante a carga.
+    Retorna um resumo com a lista de alertas emitidos.
+    """
+    inicio = time.perf_counter()
+    conn = _connect(conn_info)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT atualizado_em, SYSTIMESTAMP FROM rollup_controle
+            WHERE nome = 'alertas_motivacao'
+            FOR UPDATE
+            """
+        )
+        controle = cur.fetchone()
+        if controle is None:
+            raise DatabaseError('rollup_controle incompleto; execute init_table')
+        atualizado_em, agora = controle
+        povoar = reconstruir or atualizado_em is None
+
+        povoados = 0
+        if povoar:
+            logger.info('Povoando estado atual de bem-estar a partir do histórico.')
+            # Sem alterações em bem_estar durante a carga: o trigger não
+            # acompanha o que a carga já leu
+            cur.execute('LOCK TABLE bem_estar IN SHARE MODE')
+            cur.execute('DELETE FROM bem_estar_atual')
+            cur.execute(_POVOAR, {'alertado': 1 if reconstruir else None})
+            povoados = cur.rowcount
+
+        alertas = []
+        cur.execute(_MARCAR)
+        if cur.rowcount:
+            cur.execute(_INSERT_ALERTAS)
+            if cur.rowcount:
+                alertas = consultar(cur, _ALERTAS_EMITIDOS, {'agora': agora})
+            cur.execute(_CONFIRMAR)
+        cur.execute(
+            """
+            UPDATE rollup_controle SET atualizado_em = SYSTIMESTAMP
+            WHERE nome = 'alertas_motivacao'
+            """
+        )
+        conn.commit()
+
+        for alerta in alertas:
+            logger.warning(
+                f'Baixa motivação: {alerta["nome_completo"]} '
+                f'(usuário {alerta["id_usuario"]}, empresa {alerta["id_empresa"]}) '
+                f'nível {alerta["nivel_motivacao"]} em {alerta["data_registro"]}'
+            )
+        resumo = {
+            'reconstruido': reconstruir,
+            'povoado': povoar,
+            'usuarios_povoados': povoados,
+            'alertas': alertas,
+            'duracao_s': round(time.perf_counter() - inicio, 3),
+        }
+        logger.info(
+            f'Varredura de bem-estar: {len(alertas)} alerta(s) em {resumo["duracao_s"]}s.'
+        )
+        return resumo
+    except DatabaseError:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        logger.error(f'Erro na varredura de alertas: {e}')
+        raise DatabaseError('Erro na varredura de alertas') from e
+    finally:
+        cur.close()
+        conn.close()
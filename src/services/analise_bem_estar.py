@@ -0,0 +1,209 @@
+"""
+analise_bem_estar.py
+
+Estatísticas de bem-estar de uma empresa calculadas com NumPy.
+
+Os registros de `bem_estar` da empresa são lidos em uma única consulta, em
+lotes grandes convertidos direto para arrays por colunas (sem dict por linha),
+e todos os agrupamentos (por nível, por semana, por usuário) são feitos com
+operações vetorizadas (`bincount`, `cumsum`, `lexsort`).
+
+Resultado de `analisar_bem_estar_empresa`:
+    - resumo:  por métrica, média, desvio padrão, percentis e distribuição
+               (lista com a contagem de cada nível, de 0 a 10)
+    - semanal: por semana (início na segunda-feira), registros, média e média
+               móvel de `janela` semanas de cada métrica
+    - risco:   parcela de funcionários cujo registro mais recente está em
+               risco (estresse alto, motivação baixa ou sono ruim)
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from src.utils.validators import ValidationError
+
+from .consultas import janela_periodo
+from .metricas import instrumentar
+from .row_factory import iterar_lotes
+
+PERCENTIS = (10, 25, 50, 75, 90)
+JANELA_PADRAO = 4
+MAX_JANELA = 52
+
+# Critérios de risco (registro mais recente de cada funcionário)
+LIMITE_ESTRESSE = 8  # nivel_estresse >= 8
+LIMITE_MOTIVACAO = 5  # nivel_motivacao < 5 (mesmo corte da baixa motivação)
+LIMITE_SONO = 3  # qualidade_sono <= 3
+
+# Linhas por lote lido do banco (cada lote vira um array de uma vez)
+TAMANHO_LOTE = 50000
+
+_EPOCH = date(1970, 1, 1)
+_METRICAS = (
+    ('estresse', 3),
+    ('motivacao', 4),
+    ('sono', 5),
+)
+
+# Colunas: id_usuario, id_registro, dia (dias desde 1970), estresse, motivacao, sono
+_SQL_REGISTROS = """
+            SELECT
+                b.id_usuario,
+                b.id_registro,
+                TRUNC(b.data_registro) - DATE '1970-01-01' AS dia,
+                b.nivel_estresse,
+                b.nivel_motivacao,
+                b.qualidade_sono
+            FROM bem_estar b
+            JOIN usuarios u ON u.id_usuario = b.id_usuario
+            WHERE u.id_empresa = :id_empresa{condicoes}
+            """
+
+
+def disponivel() -> bool:
+    return np is not None
+
+
+def _carregar(cursor, id_empresa: int, desde, ate):
+    """Lê os registros da empresa em uma matriz int64 (uma linha por registro)."""
+    condicoes, binds = janela_periodo('b.data_registro', desde, ate)
+    binds['id_empresa'] = id_empresa
+    lotes = [
+        np.array(linhas, dtype=np.int64)
+        for linhas in iterar_lotes(
+            cursor,
+            _SQL_REGISTROS.format(condicoes=condicoes),
+            binds,
+            arraysize=TAMANHO_LOTE,
+        )
+    ]
+    if not lotes:
+        return np.empty((0, 6), dtype=np.int64)
+    return np.concatenate(lotes)
+
+
+def _lista(valores) -> list:
+    """Array float -> lista JSON (2 casas, NaN vira None)."""
+    arredondados = np.round(valores, 2)
+    return [None if v != v else v for v in arredondados.tolist()]
+
+
+def _resumo(coluna) -> Dict[str, Any]:
+    percentis = np.percentile(coluna, PERCENTIS)
+    return {
+        'media': round(float(coluna.mean()), 2),
+        'desvio_padrao': round(float(coluna.std()), 2),
+        'percentis': {f'p{p}': float(v) for p, v in zip(PERCENTIS, percentis)},
+        'distribuicao': np.bincount(coluna, minlength=11).tolist(),
+    }
+
+
+def _semanal(dias, dados, janela: int):
+    """Médias por semana (sem lacunas) e média móvel ponderada por registros."""
+    semanas = (dias + 3) // 7  # 1970-01-01 foi quinta; semanas começam na segunda
+    primeira = int(semanas.min())
+    indice = semanas - primeira
+    total = int(indice.max()) + 1
+    contagem = np.bincount(indice, minlength=total)
+    contagem_acumulada = np.concatenate(([0], np.cumsum(contagem)))
+    inicio_janela = np.maximum(np.arange(1, total + 1) - janela, 0)
+    contagem_janela = contagem_acumulada[1:] - contagem_acumulada[inicio_janela]
+
+    colunas = {}
+    for nome, posicao in _METRICAS:
+        soma = np.bincount(indice, weights=dados[:, posicao], minlength=total)
+        soma_acumulada = np.concatenate(([0.0], np.cumsum(soma)))
+        soma_janela = soma_acumulada[1:] - soma_acumulada[inicio_janela]
+        colunas[f'media_{nome}'] = _lista(
+            np.divide(soma, contagem, out=np.full(total, np.nan), where=contagem > 0)
+        )
+        colunas[f'media_movel_{nome}'] = _lista(
+            np.divide(
+                soma_janela,
+                contagem_janela,
+                out=np.full(total, np.nan),
+                where=contagem_janela > 0,
+            )
+        )
+
+    inicio = _EPOCH + timedelta(days=primeira * 7 - 3)
+    registros = contagem.tolist()
+    return [
+        {
+            'semana': (inicio + timedelta(weeks=i)).isoformat(),
+            'registros': registros[i],
+            **{nome: valores[i] for nome, valores in colunas.items()},
+        }
+        for i in range(total)
+    ]
+
+
+def _risco(dados) -> Dict[str, Any]:
+    """Estado mais recente de cada funcionário (por dia, depois id_registro)."""
+    usuarios = dados[:, 0]
+    ordem = np.lexsort((dados[:, 1], dados[:, 2], usuarios))
+    ordenados = usuarios[ordem]
+    ultimo = ordem[np.append(ordenados[1:] != ordenados[:-1], True)]
+    recentes = dados[ultimo]
+
+    estresse = recentes[:, 3] >= LIMITE_ESTRESSE
+    motivacao = recentes[:, 4] < LIMITE_MOTIVACAO
+    sono = recentes[:, 5] <= LIMITE_SONO
+    em_risco = int(np.count_nonzero(estresse | motivacao | sono))
+    funcionarios = len(recentes)
+    return {
+        'funcionarios': funcionarios,
+        'em_risco': em_risco,
+        'percentual_em_risco': round(100.0 * em_risco / funcionarios, 2),
+        'por_criterio': {
+            'estresse_alto': int(np.count_nonzero(estresse)),
+            'motivacao_baixa': int(np.count_nonzero(motivacao)),
+            'sono_ruim': int(np.count_nonzero(sono)),
+        },
+    }
+
+
+@instrumentar('analise_bem_estar_empresa')
+def analisar_bem_estar_empresa(
+    cursor,
+    id_empresa: int,
+    desde: Optional[date] = None,
+    ate: Optional[date] = None,
+    janela: int = JANELA_PADRAO,
+) -> Dict[str, Any]:
+    """
+    Estatísticas de bem-estar da empresa (ver docstring do módulo).
+    `desde`/`ate` limitam o período (inclusivo) e `janela` é o número de
+    semanas da média móvel.
+    """
+    try:
+        if np is None:
+            raise ModuleNotFoundError('numpy não encontrado')
+        if not isinstance(id_empresa, int):
+            raise ValidationError('ID da empresa inválido')
+        if not isinstance(janela, int) or not 0 < janela <= MAX_JANELA:
+            raise ValidationError(f'Janela deve estar entre 1 e {MAX_JANELA} semanas')
+
+        dados = _carregar(cursor, id_empresa, desde, ate)
+        resultado: Dict[str, Any] = {
+            'id_empresa': id_empresa,
+            'registros': len(dados),
+            'janela_semanas': janela,
+        }
+        if not len(dados):
+            resultado.update({'resumo': {}, 'semanal': [], 'risco': None})
+            return resultado
+
+        resultado['resumo'] = {
+            nome: _resumo(dados[:, posicao]) for nome, posicao in _METRICAS
+        }
+        resultado['semanal'] = _semanal(dados[:, 2], dados, janela)
+        resultado['risco'] = _risco(dados)
+        return resultado
+    except Exception as e:
+        return {'error': str(e)}
@@ -0,0 +1,423 @@
+"""
+anomalias.py
+
+Detecção de anomalias de bem-estar por usuário (EWMA), calculada em lote.
+
+Cada usuário tem uma linha de base em `baseline_bem_estar`: média e variância
+exponenciais (EWMA) de estresse, motivação e sono, o número de registros já
+considerados, a soma de verificação deles e a marca d'água (`marca_data`:
+todos os registros com `data_registro` até ela foram considerados). Um
+registro é anômalo quando, para alguma métrica, |z| = |valor - média| / desvio
+(antes de atualizar a linha de base com ele) atinge o limiar; anomalias vão
+para `anomalias_bem_estar`.
+
+O job (`detectar_anomalias`, subcomando `detect-anomalies`) processa as
+empresas em um pool de processos. Para cada empresa, lê as linhas de base e
+os registros acima da marca de cada usuário, faz o cálculo vetorizado com
+NumPy e grava linhas de base e anomalias em uma única transação.
+Interrompido, o job retoma das empresas que não concluíram.
+
+O EWMA depende da ordem dos registros, então a marca avança por
+`data_registro` e só até `UPPATH_ROLLUP_JANELA_S` antes do início do job:
+registros mais recentes (ou confirmados com atraso dentro da janela) ficam
+para a execução seguinte. Se a quantidade ou a soma de verificação dos
+registros de um usuário até a marca mudou (registro retroativo, alterado ou
+removido), a linha de base e as anomalias dele são recalculadas do início.
+
+Parâmetros em `config.get_anomalia_config` (UPPATH_ANOMALIA_*).
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from src.config import get_anomalia_config, get_rollup_config
+
+from .DAO import _connect, list_empresas
+from .exceptions import DatabaseError
+from .metricas import instrumentar
+from .row_factory import iterar_lotes
+
+logger = logging.getLogger(__name__)
+
+# Desvio mínimo: níveis são inteiros de 0 a 10, então séries constantes não
+# devem transformar a primeira variação de 1 ponto em um z infinito
+DESVIO_MINIMO = 0.5
+
+TAMANHO_LOTE = 50000
+
+_METRICAS = ('estresse', 'motivacao', 'sono')
+
+# Soma de verificação de um registro (detecta alterações abaixo da marca)
+_HASH = """ORA_HASH(
+    b.id_registro || '|' || TO_CHAR(b.data_registro, 'YYYYMMDDHH24MISSFF6') || '|' ||
+    b.nivel_estresse || '|' || b.nivel_motivacao || '|' || b.qualidade_sono
+)"""
+
+# Usuários cujos registros até a marca não são mais os considerados
+_SQL_ALTERADOS = f"""
+    SELECT bl.id_usuario
+    FROM baseline_bem_estar bl
+    JOIN usuarios u ON u.id_usuario = bl.id_usuario
+    LEFT JOIN bem_estar b
+      ON b.id_usuario = bl.id_usuario AND b.data_registro <= bl.marca_data
+    WHERE u.id_empresa = :id_empresa
+    GROUP BY bl.id_usuario, bl.registros, bl.checksum, bl.marca_data
+    HAVING bl.marca_data IS NULL
+        OR COUNT(b.id_registro) != bl.registros
+        OR NVL(SUM({_HASH}), 0) != bl.checksum
+"""
+
+_DELETE_USUARIO = """
+    DELETE FROM {tabela} WHERE id_usuario = :id_usuario
+"""
+
+_SQL_BASELINES = """
+    SELECT bl.id_usuario, bl.registros,
+           bl.media_estresse, bl.media_motivacao, bl.media_sono,
+           bl.var_estresse, bl.var_motivacao, bl.var_sono
+    FROM baseline_bem_estar bl
+    JOIN usuarios u ON u.id_usuario = bl.id_usuario
+    WHERE u.id_empresa = :id_empresa
+"""
+
+# Registros entre a marca de cada usuário (todos, se ainda sem linha de base)
+# e o corte do job
+_SQL_NOVOS = f"""
+    SELECT
+        b.id_usuario,
+        b.id_registro,
+        (CAST(b.data_registro AS DATE) - DATE '1970-01-01') * 86400 AS segundos,
+        b.nivel_estresse,
+        b.nivel_motivacao,
+        b.qualidade_sono,
+        {_HASH} AS hash
+    FROM bem_estar b
+    JOIN usuarios u ON u.id_usuario = b.id_usuario
+    LEFT JOIN baseline_bem_estar bl ON bl.id_usuario = b.id_usuario
+    WHERE u.id_empresa = :id_empresa
+      AND b.data_registro <= :corte
+      AND (bl.marca_data IS NULL OR b.data_registro > bl.marca_data)
+"""
+
+_DELETE_EMPRESA = """
+    DELETE FROM {tabela}
+    WHERE id_usuario IN (SELECT id_usuario FROM usuarios WHERE id_empresa = :id_empresa)
+"""
+
+_MERGE_BASELINE = """
+    MERGE INTO baseline_bem_estar bl
+    USING (
+        SELECT :id_usuario AS id_usuario, :marca AS marca, :marca_data AS marca_data,
+               :registros AS registros, :checksum AS checksum,
+               :media_estresse AS media_estresse, :media_motivacao AS media_motivacao,
+               :media_sono AS media_sono, :var_estresse AS var_estresse,
+               :var_motivacao AS var_motivacao, :var_sono AS var_sono
+        FROM dual
+    ) d ON (bl.id_usuario = d.id_usuario)
+    WHEN MATCHED THEN UPDATE SET
+        bl.marca = GREATEST(bl.marca, d.marca),
+        bl.marca_data = d.marca_data,
+        bl.registros = d.registros,
+        bl.checksum = bl.checksum + d.checksum,
+        bl.media_estresse = d.media_estresse,
+        bl.media_motivacao = d.media_motivacao,
+        bl.media_sono = d.media_sono,
+        bl.var_estresse = d.var_estresse,
+        bl.var_motivacao = d.var_motivacao,
+        bl.var_sono = d.var_sono,
+        bl.atualizado_em = SYSTIMESTAMP
+    WHEN NOT MATCHED THEN INSERT
+        (id_usuario, marca, marca_data, registros, checksum, media_estresse,
+         media_motivacao, media_sono, var_estresse, var_motivacao, var_sono,
+         atualizado_em)
+    VALUES
+        (d.id_usuario, d.marca, d.marca_data, d.registros, d.checksum,
+         d.media_estresse, d.media_motivacao, d.media_sono, d.var_estresse,
+         d.var_motivacao, d.var_sono, SYSTIMESTAMP)
+"""
+
+_INSERT_ANOMALIA = """
+    INSERT INTO anomalias_bem_estar
+        (id_registro, id_usuario, id_empresa, data_registro,
+         z_estresse, z_motivacao, z_sono)
+    SELECT b.id_registro, b.id_usuario, :id_empresa, b.data_registro,
+           :z_estresse, :z_motivacao, :z_sono
+    FROM bem_estar b
+    WHERE b.id_registro = :id_registro
+"""
+
+
+def _matriz(cursor, sql: str, params, colunas: int):
+    lotes = [
+        np.array(linhas, dtype=np.float64)
+        for linhas in iterar_lotes(cursor, sql, params, arraysize=TAMANHO_LOTE)
+    ]
+    if not lotes:
+        return np.empty((0, colunas), dtype=np.float64)
+    return np.concatenate(lotes)
+
+
+def atualizar_baselines(novos, baselines, config: Dict[str, float]):
+    """Aplica os registros novos às linhas de base e calcula os z-scores.
+
+    `novos`: matriz (id_usuario, id_registro, segundos, estresse, motivacao,
+    sono, ...), colunas seguintes ignoradas; `baselines`: matriz (id_usuario, registros, 3 médias, 3 variâncias).
+
+    Os registros de cada usuário são processados em ordem cronológica; a
+    recorrência do EWMA é sequencial por usuário, então cada passo processa o
+    k-ésimo registro novo de todos os usuários de uma vez (o número de passos
+    é o maior número de registros novos de um usuário, não o de linhas).
+
+    Retorna (linhas de base atualizadas, anomalias), ambas como matrizes:
+    (id_usuario, marca, registros, 3 médias, 3 variâncias) e
+    (id_registro, id_usuario, z_estresse, z_motivacao, z_sono).
+    """
+    ordem = np.lexsort((novos[:, 1], novos[:, 2], novos[:, 0]))
+    novos = novos[ordem]
+    usuarios = novos[:, 0]
+    valores = novos[:, 3:6]
+    total = len(novos)
+
+    inicio = np.flatnonzero(np.r_[True, usuarios[1:] != usuarios[:-1]])
+    tamanhos = np.diff(np.r_[inicio, total])
+    ids = usuarios[inicio]
+
+    media = np.zeros((len(ids), 3))
+    variancia = np.zeros((len(ids), 3))
+    registros = np.zeros(len(ids))
+    if len(baselines):
+        baselines = baselines[np.argsort(baselines[:, 0])]
+        posicao = np.minimum(np.searchsorted(baselines[:, 0], ids), len(baselines) - 1)
+        existe = baselines[posicao, 0] == ids
+        registros[existe] = baselines[posicao[existe], 1]
+        media[existe] = baselines[posicao[existe], 2:5]
+        variancia[existe] = baselines[posicao[existe], 5:8]
+
+    # Usuários em ordem decrescente de registros novos: no passo k, os que
+    # ainda têm registro são um prefixo
+    por_tamanho = np.argsort(-tamanhos, kind='stable')
+    negativos = -tamanhos[por_tamanho]  # crescente, para o searchsorted
+    alpha = config['alpha']
+    z = np.zeros((total, 3))
+    for passo in range(int(tamanhos.max()) if total else 0):
+        g = por_tamanho[: np.searchsorted(negativos, -passo, side='left')]
+        linhas = inicio[g] + passo
+        x = valores[linhas]
+        m = media[g]
+        v = variancia[g]
+        n = registros[g][:, None]
+
+        desvio = np.maximum(np.sqrt(v), DESVIO_MINIMO)
+        z[linhas] = np.where(n >= config['minimo'], (x - m) / desvio, 0.0)
+
+        diferenca = x - m
+        incremento = alpha * diferenca
+        media[g] = np.where(n == 0, x, m + incremento)
+        variancia[g] = np.where(n == 0, 0.0, (1 - alpha) * (v + diferenca * incremento))
+        registros[g] += 1
+
+    marcas = np.maximum.reduceat(novos[:, 1], inicio) if total else np.empty(0)
+    atualizadas = np.column_stack((ids, marcas, registros, media, variancia))
+    anomalos = np.flatnonzero(np.any(np.abs(z) >= config['limiar'], axis=1))
+    anomalias = np.column_stack(
+        (novos[anomalos, 1], usuarios[anomalos], np.round(z[anomalos], 2))
+    )
+    return atualizadas, anomalias
+
+
+def _checksums(novos, ids):
+    """Soma dos hashes (última coluna de `novos`) por usuário, na ordem de `ids`."""
+    ordem = np.argsort(novos[:, 0], kind='stable')
+    usuarios = novos[ordem, 0]
+    inicio = np.flatnonzero(np.r_[True, usuarios[1:] != usuarios[:-1]])
+    somas = np.add.reduceat(novos[ordem, -1], inicio)
+    return somas[np.searchsorted(usuarios[inicio], ids)]
+
+
+def _gravar(cur, id_empresa: int, corte, baselines, checksums, anomalias) -> None:
+    for inicio in range(0, len(baselines), TAMANHO_LOTE):
+        cur.executemany(
+            _MERGE_BASELINE,
+            [
+                {
+                    'id_usuario': int(linha[0]),
+                    'marca': int(linha[1]),
+                    'marca_data': corte,
+                    'registros': int(linha[2]),
+                    'checksum': int(checksum),
+                    **{f'media_{nome}': linha[3 + i] for i, nome in enumerate(_METRICAS)},
+                    **{f'var_{nome}': linha[6 + i] for i, nome in enumerate(_METRICAS)},
+                }
+                for linha, checksum in zip(
+                    baselines[inicio : inicio + TAMANHO_LOTE].tolist(),
+                    checksums[inicio : inicio + TAMANHO_LOTE].tolist(),
+                )
+            ],
+        )
+    for inicio in range(0, len(anomalias), TAMANHO_LOTE):
+        cur.executemany(
+            _INSERT_ANOMALIA,
+            [
+                {
+                    'id_registro': int(linha[0]),
+                    'id_empresa': id_empresa,
+                    **{f'z_{nome}': linha[2 + i] for i, nome in enumerate(_METRICAS)},
+                }
+                for linha in anomalias[inicio : inicio + TAMANHO_LOTE].tolist()
+            ],
+        )
+
+
+def _processar_empresa(
+    id_empresa: int, conn_info: Optional[Dict], config: Dict, reconstruir: bool, corte
+) -> Dict[str, Any]:
+    """Processa uma empresa em uma transação (executado nos processos do pool)."""
+    inicio = time.perf_counter()
+    try:
+        conn = _connect(conn_info)
+    except Exception as e:
+        return {'id_empresa': id_empresa, 'erro': str(e)}
+    cur = conn.cursor()
+    try:
+        params = {'id_empresa': id_empresa}
+        if reconstruir:
+            for tabela in ('anomalias_bem_estar', 'baseline_bem_estar'):
+                cur.execute(_DELETE_EMPRESA.format(tabela=tabela), params)
+            alterados = []
+        else:
+            alterados = [linha[0] for linha in _matriz(cur, _SQL_ALTERADOS, params, 1)]
+        if alterados:
+            logger.warning(
+                f'Empresa {id_empresa}: registros abaixo da marca mudaram para '
+                f'{len(alterados)} usuário(s); recalculando do início.'
+            )
+            for tabela in ('anomalias_bem_estar', 'baseline_bem_estar'):
+                cur.executemany(
+                    _DELETE_USUARIO.format(tabela=tabela),
+                    [{'id_usuario': int(id_usuario)} for id_usuario in alterados],
+                )
+        novos = _matriz(cur, _SQL_NOVOS, {**params, 'corte': corte}, 7)
+        registros = anomalias = 0
+        if len(novos):
+            baselines = _matriz(cur, _SQL_BASELINES, params, 8)
+            atualizadas, encontradas = atualizar_baselines(novos, baselines, config)
+            checksums = _checksums(novos, atualizadas[:, 0])
+            _gravar(cur, id_empresa, corte, atualizadas, checksums, encontradas)
+            registros, anomalias = len(novos), len(encontradas)
+        conn.commit()
+        return {
+            'id_empresa': id_empresa,
+            'registros': registros,
+            'recalculados': len(alterados),
+            'anomalias': anomalias,
+            'duracao_s': round(time.perf_counter() - inicio, 3),
+        }
+    except Exception as e:
+        conn.rollback()
+        return {'id_empresa': id_empresa, 'erro': str(e)}
+    finally:
+        cur.close()
+        conn.close()
+
+
+@instrumentar('anomalias.detectar_anomalias')
+def detectar_anomalias(
+    ids: Optional[Sequence[int]] = None,
+    processos: int = None,
+    conn_info: Dict = None,
+    reconstruir: bool = False,
+) -> Dict[str, Any]:
+    """Atualiza as linhas de base e registra as anomalias das empresas.
+
+    Args:
+        ids: Empresas a processar (padrão: todas)
+        processos: Tamanho do pool (padrão: nº de CPUs, até o nº de empresas)
+        reconstruir: Descarta linhas de base e anomalias e recalcula do zero
+
+    A linha 'anomalias' de `rollup_controle` fica travada durante a execução
+    (um job por vez). Falhas de uma empresa não interrompem as demais e ficam
+    no resumo; a empresa é retomada na próxima execução.
+    """
+    if np is None:
+        raise ModuleNotFoundError('numpy não encontrado')
+    inicio = time.perf_counter()
+    config = get_anomalia_config()
+    conn = _connect(conn_info)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT nome FROM rollup_controle WHERE nome = 'anomalias' FOR UPDATE"
+        )
+        if cur.fetchone() is None:
+            raise DatabaseError('rollup_controle incompleto; execute init_table')
+        # Mesmo corte para todas as empresas, no relógio do banco
+        cur.execute(
+            "SELECT SYSTIMESTAMP - NUMTODSINTERVAL(:janela, 'SECOND') FROM dual",
+            {'janela': get_rollup_config()['janela']},
+        )
+        corte = cur.fetchone()[0]
+
+        if ids is None:
+            ids = [id_empresa for id_empresa, _ in list_empresas()]
+        ids = list(ids)
+        processos = max(1, min(processos or os.cpu_count() or 1, len(ids) or 1))
+
+        # Sempre em processos separados (spawn): cada empresa usa a sua própria
+        # conexão, sem herdar a conexão/pool deste processo, que mantém a trava
+        with ProcessPoolExecutor(
+            max_workers=processos, mp_context=multiprocessing.get_context('spawn')
+        ) as pool:
+            resultados: List[Dict] = list(
+                pool.map(
+                    _processar_empresa,
+                    ids,
+                    repeat(conn_info),
+                    repeat(config),
+                    repeat(reconstruir),
+                    repeat(corte),
+                )
+            )
+
+        cur.execute(
+            "UPDATE rollup_controle SET atualizado_em = SYSTIMESTAMP WHERE nome = 'anomalias'"
+        )
+        conn.commit()
+    except DatabaseError:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        logger.error(f'Erro na detecção de anomalias: {e}')
+        raise DatabaseError('Erro na detecção de anomalias') from e
+    finally:
+        cur.close()
+        conn.close()
+
+    falhas = [r for r in resultados if 'erro' in r]
+    for falha in falhas:
+        logger.error(f'Anomalias da empresa {falha["id_empresa"]}: {falha["erro"]}')
+    resumo = {
+        'reconstruido': reconstruir,
+        'empresas': len(ids),
+        'falhas': len(falhas),
+        'registros': sum(r.get('registros', 0) for r in resultados),
+        'recalculados': sum(r.get('recalculados', 0) for r in resultados),
+        'anomalias': sum(r.get('anomalias', 0) for r in resultados),
+        'por_empresa': resultados,
+        'duracao_s': round(time.perf_counter() - inicio, 3),
+    }
+    logger.info(
+        f'Anomalias: {resumo["registros"]} registro(s) de {len(ids)} empresa(s), '
+        f'{resumo["anomalias"]} anomalia(s) em {resumo["duracao_s"]}s.'
+    )
+    return resumo
@@ -5,23 +5,21 @@ Funções para consultas personalizadas (dashboard individual e corporativo).
 Retornam listas de dicionários prontos para exportação em JSON.
 """
 
-from typing import Any, Dict, List
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
+from src.models.registros import SerieBemEstar
 from src.utils.validators import ValidationError
 
-# Todas as funções recebem um cursor Oracle e parâmetros validados
+from . import alertas, referencia, rollups
+from .metricas import instrumentar
+from .row_factory import MODO_TUPLA, consultar, consultar_um, iterar
 
+# Todas as funções recebem um cursor Oracle e parâmetros validados.
+# A conversão das linhas (datas em ISO, números) é feita por `row_factory`.
 
-def consulta_bem_estar_user(cursor, id_user: int) -> List[Dict[str, Any]]:
-    """
-    Consulta evolução do bem-estar do usuário.
-    Retorna lista de dicts: [{data, estresse, motivacao, sono}, ...]
-    """
-    try:
-        if not isinstance(id_user, int):
-            raise ValidationError('ID do usuário inválido')
-        cursor.execute(
-            """
+
+_SQL_BEM_ESTAR_USER = """
             SELECT 
                 data_registro,
                 nivel_estresse,
@@ -30,68 +28,175 @@ def consulta_bem_estar_user(cursor, id_user: int) -> List[Dict[str, Any]]:
             FROM bem_estar
             WHERE id_usuario = :id_user
             ORDER BY data_registro
-            """,
-            {'id_user': id_user},
-        )
-        colunas = [col[0].lower() for col in cursor.description]
-        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+            """
+
+
+def janela_periodo(
+    coluna: str, desde: Optional[date] = None, ate: Optional[date] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """Condições de período sobre `coluna` (`ate` inclusivo) e seus binds."""
+    condicoes, binds = '', {}
+    if desde is not None:
+        condicoes += f' AND {coluna} >= :desde'
+        binds['desde'] = datetime.combine(desde, time.min)
+    if ate is not None:
+        condicoes += f' AND {coluna} < :ate'
+        binds['ate'] = datetime.combine(ate + timedelta(days=1), time.min)
+    return condicoes, binds
+
+
+def _validar_opcoes(limite: Optional[int]) -> None:
+    if limite is not None and (not isinstance(limite, int) or limite <= 0):
+        raise ValidationError('Limite inválido')
+
+
+@instrumentar('consulta_bem_estar_user')
+def consulta_bem_estar_user(
+    cursor,
+    id_user: int,
+    compacto: bool = False,
+    desde: Optional[date] = None,
+    ate: Optional[date] = None,
+    limite: Optional[int] = None,
+) -> Union[List[Dict[str, Any]], SerieBemEstar]:
+    """
+    Consulta evolução do bem-estar do usuário.
+    Retorna lista de dicts: [{data, estresse, motivacao, sono}, ...]
+    Com `compacto=True`, retorna uma `SerieBemEstar` (colunas em arrays).
+
+    `desde`/`ate` limitam o período (datas inclusivas) e `limite` mantém só os
+    registros mais recentes (sempre em ordem cronológica).
+    """
+    try:
+        if not isinstance(id_user, int):
+            raise ValidationError('ID do usuário inválido')
+        _validar_opcoes(limite)
+        condicoes, binds = janela_periodo('data_registro', desde, ate)
+        binds['id_user'] = id_user
+        if limite is not None:
+            binds['limite'] = limite
+            sql = f"""
+            SELECT data_registro, nivel_estresse, nivel_motivacao, qualidade_sono
+            FROM (
+                SELECT data_registro, nivel_estresse, nivel_motivacao, qualidade_sono
+                FROM bem_estar
+                WHERE id_usuario = :id_user{condicoes}
+                ORDER BY data_registro DESC
+                FETCH FIRST :limite ROWS ONLY
+            )
+            ORDER BY data_registro
+            """
+        elif condicoes:
+            sql = _SQL_BEM_ESTAR_USER.replace(
+                'WHERE id_usuario = :id_user', f'WHERE id_usuario = :id_user{condicoes}'
+            )
+        else:
+            sql = _SQL_BEM_ESTAR_USER
+        if compacto:
+            return SerieBemEstar.from_rows(iterar(cursor, sql, binds))
+        return consultar(cursor, sql, binds)
     except Exception as e:
         return [{'error': str(e)}]
 
 
-def consulta_progresso_trilhas_user(cursor, id_user: int) -> List[Dict[str, Any]]:
+@instrumentar('consulta_progresso_trilhas_user')
+def consulta_progresso_trilhas_user(
+    cursor,
+    id_user: int,
+    desde: Optional[date] = None,
+    ate: Optional[date] = None,
+    limite: Optional[int] = None,
+) -> List[Dict[str, Any]]:
     """
     Consulta progresso nas trilhas do usuário.
     Retorna lista de dicts: [{nome_trilha, progresso_percentual, status}, ...]
+
+    `desde`/`ate` filtram pela data de início na trilha e `limite` mantém as
+    trilhas iniciadas mais recentemente.
     """
     try:
         if not isinstance(id_user, int):
             raise ValidationError('ID do usuário inválido')
-        cursor.execute(
-            """
+        _validar_opcoes(limite)
+        condicoes, binds = janela_periodo('ut.data_inicio', desde, ate)
+        binds['id_user'] = id_user
+        ordem = ''
+        if limite is not None:
+            binds['limite'] = limite
+            ordem = 'ORDER BY ut.data_inicio DESC FETCH FIRST :limite ROWS ONLY'
+        linhas = consultar(
+            cursor,
+            f"""
             SELECT 
-                t.nome_trilha,
+                ut.id_trilha,
                 ut.progresso_percentual,
                 ut.status
             FROM usuario_trilha ut
-            JOIN trilhas t ON ut.id_trilha = t.id_trilha
-            WHERE ut.id_usuario = :id_user
+            WHERE ut.id_usuario = :id_user{condicoes}
+            {ordem}
             """,
-            {'id_user': id_user},
+            binds,
+            modo=MODO_TUPLA,
         )
-        colunas = [col[0].lower() for col in cursor.description]
-        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+        # Nome da trilha vem do cache de referência (sem JOIN com trilhas),
+        # lido uma vez para todas as linhas
+        nomes = referencia.trilhas.nomes_de((linha[0] for linha in linhas), cursor)
+        return [
+            {
+                'nome_trilha': nomes.get(id_trilha),
+                'progresso_percentual': progresso,
+                'status': status,
+            }
+            for id_trilha, progresso, status in linhas
+        ]
     except Exception as e:
         return [{'error': str(e)}]
 
 
-def consulta_recomendacoes_user(cursor, id_user: int) -> List[Dict[str, Any]]:
+@instrumentar('consulta_recomendacoes_user')
+def consulta_recomendacoes_user(
+    cursor,
+    id_user: int,
+    desde: Optional[date] = None,
+    ate: Optional[date] = None,
+    limite: Optional[int] = None,
+) -> List[Dict[str, Any]]:
     """
     Consulta recomendações recebidas pelo usuário.
     Retorna lista de dicts: [{tipo, id_referencia, motivo, data_recomendacao}, ...]
+
+    `desde`/`ate` limitam o período e `limite` mantém as mais recentes.
     """
     try:
         if not isinstance(id_user, int):
             raise ValidationError('ID do usuário inválido')
-        cursor.execute(
-            """
+        _validar_opcoes(limite)
+        condicoes, binds = janela_periodo('data_recomendacao', desde, ate)
+        binds['id_user'] = id_user
+        limite_sql = ''
+        if limite is not None:
+            binds['limite'] = limite
+            limite_sql = 'FETCH FIRST :limite ROWS ONLY'
+        return consultar(
+            cursor,
+            f"""
             SELECT 
                 tipo,
                 id_referencia,
                 motivo,
                 data_recomendacao
             FROM recomendacoes
-            WHERE id_usuario = :id_user
+            WHERE id_usuario = :id_user{condicoes}
             ORDER BY data_recomendacao DESC
+            {limite_sql}
             """,
-            {'id_user': id_user},
+            binds,
         )
-        colunas = [col[0].lower() for col in cursor.description]
-        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
     except Exception as e:
         return [{'error': str(e)}]
 
 
+@instrumentar('consulta_distribuicao_nivel_carreira')
 def consulta_distribuicao_nivel_carreira(
     cursor, id_empresa: int
 ) -> List[Dict[str, Any]]:
@@ -102,7 +207,8 @@ def consulta_distribuicao_nivel_carreira(
     try:
         if not isinstance(id_empresa, int):
             raise ValidationError('ID da empresa inválido')
-        cursor.execute(
+        return consultar(
+            cursor,
             """
             SELECT nivel_carreira, COUNT(*) AS total
             FROM usuarios
@@ -112,80 +218,72 @@ def consulta_distribuicao_nivel_carreira(
             """,
             {'id_empresa': id_empresa},
         )
-        colunas = [col[0].lower() for col in cursor.description]
-        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
     except Exception as e:
         return [{'error': str(e)}]
 
 
+@instrumentar('consulta_media_bem_estar_empresa')
 def consulta_media_bem_estar_empresa(cursor, id_empresa: int) -> Dict[str, Any]:
     """
     Consulta média de bem-estar da empresa.
     Retorna dict: {media_estresse, media_motivacao, media_sono}
+
+    Lida dos rollups (ver `rollups.py`), com o mesmo resultado da média sobre
+    a tabela `bem_estar`.
     """
     try:
         if not isinstance(id_empresa, int):
             raise ValidationError('ID da empresa inválido')
-        cursor.execute(
-            """
-            SELECT 
-                ROUND(AVG(b.nivel_estresse), 2) AS media_estresse,
-                ROUND(AVG(b.nivel_motivacao), 2) AS media_motivacao,
-                ROUND(AVG(b.qualidade_sono), 2) AS media_sono
-            FROM bem_estar b
-            JOIN usuarios u ON u.id_usuario = b.id_usuario
-            WHERE u.id_empresa = :id_empresa
-            """,
-            {'id_empresa': id_empresa},
-        )
-        colunas = [col[0].lower() for col in cursor.description]
-        row = cursor.fetchone()
-        return dict(zip(colunas, row)) if row else {}
+        row = consultar_um(cursor, rollups.SQL_MEDIA_BEM_ESTAR, {'id_empresa': id_empresa})
+        return row or {}
     except Exception as e:
         return {'error': str(e)}
 
 
+@instrumentar('consulta_trilhas_mais_utilizadas_empresa')
 def consulta_trilhas_mais_utilizadas_empresa(
     cursor, id_empresa: int
 ) -> List[Dict[str, Any]]:
     """
     Consulta trilhas mais utilizadas na empresa.
     Retorna lista de dicts: [{nome_trilha, total_usuarios}, ...]
+
+    Lida dos rollups (ver `rollups.py`), com o mesmo resultado da contagem
+    sobre `usuario_trilha`.
     """
     try:
         if not isinstance(id_empresa, int):
             raise ValidationError('ID da empresa inválido')
-        cursor.execute(
-            """
-            SELECT 
-                t.nome_trilha,
-                COUNT(*) AS total_usuarios
-            FROM usuario_trilha ut
-            JOIN usuarios u ON ut.id_usuario = u.id_usuario
-            JOIN trilhas t ON t.id_trilha = ut.id_trilha
-            WHERE u.id_empresa = :id_empresa
-            GROUP BY t.nome_trilha
-            ORDER BY total_usuarios DESC
-            """,
-            {'id_empresa': id_empresa},
-        )
-        colunas = [col[0].lower() for col in cursor.description]
-        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+        return consultar(cursor, rollups.SQL_TRILHAS_EMPRESA, {'id_empresa': id_empresa})
     except Exception as e:
         return [{'error': str(e)}]
 
 
+@instrumentar('consulta_funcionarios_baixa_motivacao')
 def consulta_funcionarios_baixa_motivacao(
-    cursor, id_empresa: int
+    cursor, id_empresa: int, atual: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Consulta funcionários com baixa motivação (<5).
     Retorna lista de dicts: [{nome_completo, nivel_motivacao, data_registro}, ...]
+
+    Por padrão lista todos os registros históricos com baixa motivação. Com
+    `atual=True`, considera apenas o registro mais recente de cada
+    funcionário (um item por funcionário em risco, com `id_usuario`), lido de
+    `bem_estar_atual` (mantida por trigger) depois que a varredura de alertas
+    a povoou.
     """
     try:
         if not isinstance(id_empresa, int):
             raise ValidationError('ID da empresa inválido')
-        cursor.execute(
+        if atual:
+            if alertas.estado_pronto(cursor):
+                sql = alertas.SQL_BAIXA_MOTIVACAO_ATUAL
+            else:
+                sql = alertas.SQL_BAIXA_MOTIVACAO_ATUAL_HISTORICO
+            return consultar(cursor, sql, {'id_empresa': id_empresa})
+        return consultar(
+            cursor,
             """
             SELECT 
                 u.nome_completo,
@@ -199,19 +297,65 @@ def consulta_funcionarios_baixa_motivacao(
             """,
             {'id_empresa': id_empresa},
         )
-        colunas = [col[0].lower() for col in cursor.description]
-        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
     except Exception as e:
         return [{'error': str(e)}]
 
 
+@instrumentar('consulta_anomalias_empresa')
+def consulta_anomalias_empresa(
+    cursor,
+    id_empresa: int,
+    desde: Optional[date] = None,
+    ate: Optional[date] = None,
+    limite: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Consulta anomalias de bem-estar detectadas nos funcionários da empresa
+    (ver `anomalias.detectar_anomalias`), mais recentes primeiro.
+    Retorna lista de dicts:
+    [{id_usuario, nome_completo, data_registro, z_estresse, z_motivacao, z_sono}, ...]
+    """
+    try:
+        if not isinstance(id_empresa, int):
+            raise ValidationError('ID da empresa inválido')
+        _validar_opcoes(limite)
+        condicoes, binds = janela_periodo('a.data_registro', desde, ate)
+        binds['id_empresa'] = id_empresa
+        limite_sql = ''
+        if limite is not None:
+            binds['limite'] = limite
+            limite_sql = 'FETCH FIRST :limite ROWS ONLY'
+        return consultar(
+            cursor,
+            f"""
+            SELECT
+                a.id_usuario,
+                u.nome_completo,
+                a.data_registro,
+                a.z_estresse,
+                a.z_motivacao,
+                a.z_sono
+            FROM anomalias_bem_estar a
+            JOIN usuarios u ON u.id_usuario = a.id_usuario
+            WHERE a.id_empresa = :id_empresa{condicoes}
+            ORDER BY a.data_registro DESC
+            {limite_sql}
+            """,
+            binds,
+        )
+    except Exception as e:
+        return [{'error': str(e)}]
+
+
+@instrumentar('consulta_empresas_com_contagem')
 def consulta_empresas_com_contagem(cursor) -> List[Dict[str, Any]]:
     """
     Lista todas as empresas com a quantidade de usuários vinculados.
     Retorna lista de dicts: [{id_empresa, nome_empresa, total_usuarios}, ...]
     """
     try:
-        cursor.execute(
+        return consultar(
+            cursor,
             """
             SELECT e.id_empresa, e.nome_empresa, NVL(COUNT(u.id_usuario), 0) AS total_usuarios
             FROM empresas e
@@ -220,7 +364,284 @@ def consulta_empresas_com_contagem(cursor) -> List[Dict[str, Any]]:
             ORDER BY total_usuarios DESC, e.nome_empresa
             """
         )
-        colunas = [col[0].lower() for col in cursor.description]
-        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
     except Exception as e:
         return [{'error': str(e)}]
+
+
+# ============================================================================
+# CONSULTAS EM LOTE (VÁRIAS EMPRESAS)
+# ============================================================================
+
+# Limite de IDs por consulta em lote (SYS.ODCINUMBERLIST aceita até 32767)
+MAX_IDS_LOTE = 1000
+
+
+def bind_ids(cursor, ids: Sequence[int]):
+    """Monta o bind de uma lista de IDs (`TABLE(:ids)`) como SYS.ODCINUMBERLIST."""
+    tipo = cursor.connection.gettype('SYS.ODCINUMBERLIST')
+    return tipo.newobject(list(ids))
+
+
+def _filtro_ids(cursor, ids: Optional[Sequence[int]]):
+    """Retorna (condição sobre a coluna, binds). `ids=None` significa todas."""
+    if ids is None:
+        return 'IS NOT NULL', {}
+    if len(ids) > MAX_IDS_LOTE:
+        raise ValidationError(f'Máximo de {MAX_IDS_LOTE} IDs por consulta')
+    if not all(isinstance(i, int) for i in ids):
+        raise ValidationError('IDs inválidos')
+    return 'IN (SELECT COLUMN_VALUE FROM TABLE(:ids))', {'ids': bind_ids(cursor, ids)}
+
+
+@instrumentar('consulta_distribuicao_nivel_carreira_empresas')
+def consulta_distribuicao_nivel_carreira_empresas(
+    cursor, ids: Optional[Sequence[int]] = None
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Distribuição de níveis de carreira de várias empresas em uma única consulta.
+    Retorna {id_empresa: [{nivel_carreira, total}, ...]} (`ids=None`: todas).
+    """
+    try:
+        filtro, binds = _filtro_ids(cursor, ids)
+        resultado: Dict[int, List[Dict[str, Any]]] = {}
+        for id_empresa, nivel, total in consultar(
+            cursor,
+            f"""
+            SELECT id_empresa, nivel_carreira, COUNT(*) AS total
+            FROM usuarios
+            WHERE id_empresa {filtro}
+            GROUP BY id_empresa, nivel_carreira
+            ORDER BY id_empresa, total DESC
+            """,
+            binds,
+            modo=MODO_TUPLA,
+        ):
+            resultado.setdefault(id_empresa, []).append(
+                {'nivel_carreira': nivel, 'total': total}
+            )
+        return resultado
+    except Exception as e:
+        return {'error': str(e)}
+
+
+@instrumentar('consulta_media_bem_estar_empresas')
+def consulta_media_bem_estar_empresas(
+    cursor, ids: Optional[Sequence[int]] = None
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Média de bem-estar de várias empresas em uma única consulta.
+    Retorna {id_empresa: {media_estresse, media_motivacao, media_sono}}
+    (`ids=None`: todas). Lida dos rollups (ver `rollups.py`).
+    """
+    try:
+        filtro, binds = _filtro_ids(cursor, ids)
+        sql = rollups.SQL_MEDIA_BEM_ESTAR_EMPRESAS.format(filtro=filtro)
+        return {
+            id_empresa: {
+                'media_estresse': estresse,
+                'media_motivacao': motivacao,
+                'media_sono': sono,
+            }
+            for id_empresa, estresse, motivacao, sono in consultar(
+                cursor, sql, binds, modo=MODO_TUPLA
+            )
+        }
+    except Exception as e:
+        return {'error': str(e)}
+
+
+@instrumentar('consulta_trilhas_mais_utilizadas_empresas')
+def consulta_trilhas_mais_utilizadas_empresas(
+    cursor, ids: Optional[Sequence[int]] = None
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Trilhas mais utilizadas de várias empresas em uma única consulta.
+    Retorna {id_empresa: [{nome_trilha, total_usuarios}, ...]} (`ids=None`: todas).
+    """
+    try:
+        filtro, binds = _filtro_ids(cursor, ids)
+        resultado: Dict[int, List[Dict[str, Any]]] = {}
+        for id_empresa, nome_trilha, total in consultar(
+            cursor,
+            f"""
+            SELECT u.id_empresa, t.nome_trilha, COUNT(*) AS total_usuarios
+            FROM usuario_trilha ut
+            JOIN usuarios u ON ut.id_usuario = u.id_usuario
+            JOIN trilhas t ON t.id_trilha = ut.id_trilha
+            WHERE u.id_empresa {filtro}
+            GROUP BY u.id_empresa, t.nome_trilha
+            ORDER BY u.id_empresa, total_usuarios DESC, t.nome_trilha
+            """,
+            binds,
+            modo=MODO_TUPLA,
+        ):
+            resultado.setdefault(id_empresa, []).append(
+                {'nome_trilha': nome_trilha, 'total_usuarios': total}
+            )
+        return resultado
+    except Exception as e:
+        return {'error': str(e)}
+
+
+# ============================================================================
+# CONSULTAS EM LOTE (VÁRIOS USUÁRIOS)
+# ============================================================================
+
+
+def _lote_usuarios(
+    cursor,
+    ids: Sequence[int],
+    colunas: str,
+    origem: str,
+    coluna_data: str,
+    ordem: str,
+    desde: Optional[date],
+    ate: Optional[date],
+    limite: Optional[int],
+):
+    """Monta (sql, binds) de uma consulta por tabela para vários usuários.
+
+    Com `limite`, mantém as `limite` linhas mais recentes de cada usuário
+    (ROW_NUMBER por usuário); o resultado vem ordenado por usuário e `ordem`.
+    """
+    if not ids:
+        raise ValidationError('Nenhum ID informado')
+    _validar_opcoes(limite)
+    filtro, binds = _filtro_ids(cursor, ids)
+    condicoes, binds_janela = janela_periodo(coluna_data, desde, ate)
+    binds.update(binds_janela)
+    where = f'{origem} WHERE id_usuario {filtro}{condicoes}'
+    if limite is None:
+        return f'SELECT id_usuario, {colunas} {where} ORDER BY id_usuario, {ordem}', binds
+    binds['limite'] = limite
+    sql = f"""
+            SELECT id_usuario, {colunas}
+            FROM (
+                SELECT id_usuario, {colunas},
+                       ROW_NUMBER() OVER (
+                           PARTITION BY id_usuario ORDER BY {coluna_data} DESC
+                       ) AS rn
+                {where}
+            )
+            WHERE rn <= :limite
+            ORDER BY id_usuario, {ordem}
+            """
+    return sql, binds
+
+
+def _agrupar_por_usuario(
+    linhas, nomes: Tuple[str, ...]
+) -> Dict[int, List[Dict[str, Any]]]:
+    resultado: Dict[int, List[Dict[str, Any]]] = {}
+    for linha in linhas:
+        resultado.setdefault(linha[0], []).append(dict(zip(nomes, linha[1:])))
+    return resultado
+
+
+@instrumentar('consulta_bem_estar_users')
+def consulta_bem_estar_users(
+    cursor,
+    ids: Sequence[int],
+    desde: Optional[date] = None,
+    ate: Optional[date] = None,
+    limite: Optional[int] = None,
+) -> Dict[int, SerieBemEstar]:
+    """
+    Evolução do bem-estar de vários usuários em uma única consulta.
+    Retorna {id_usuario: SerieBemEstar}, com as mesmas opções de
+    período/limite de `consulta_bem_estar_user`. As linhas vão do cursor
+    direto para as séries (colunas em arrays), sem um dict por registro; a
+    serialização JSON é a mesma da lista de dicts.
+    """
+    try:
+        sql, binds = _lote_usuarios(
+            cursor,
+            ids,
+            'data_registro, nivel_estresse, nivel_motivacao, qualidade_sono',
+            'FROM bem_estar',
+            'data_registro',
+            'data_registro',
+            desde,
+            ate,
+            limite,
+        )
+        series: Dict[int, SerieBemEstar] = {}
+        for id_usuario, *valores in iterar(cursor, sql, binds):
+            serie = series.get(id_usuario)
+            if serie is None:
+                serie = series[id_usuario] = SerieBemEstar()
+            serie.append(*valores)
+        return series
+    except Exception as e:
+        return {'error': str(e)}
+
+
+@instrumentar('consulta_progresso_trilhas_users')
+def consulta_progresso_trilhas_users(
+    cursor,
+    ids: Sequence[int],
+    desde: Optional[date] = None,
+    ate: Optional[date] = None,
+    limite: Optional[int] = None,
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Progresso nas trilhas de vários usuários em uma única consulta.
+    Retorna {id_usuario: [{nome_trilha, progresso_percentual, status}, ...]}.
+    """
+    try:
+        sql, binds = _lote_usuarios(
+            cursor,
+            ids,
+            'id_trilha, progresso_percentual, status',
+            'FROM usuario_trilha',
+            'data_inicio',
+            'data_inicio DESC',
+            desde,
+            ate,
+            limite,
+        )
+        linhas = consultar(cursor, sql, binds, modo=MODO_TUPLA)
+        # Nome da trilha vem do cache de referência (sem JOIN com trilhas),
+        # lido uma vez para todas as linhas
+        nomes = referencia.trilhas.nomes_de((linha[1] for linha in linhas), cursor)
+        return _agrupar_por_usuario(
+            (
+                (id_usuario, nomes.get(id_trilha), progresso, status)
+                for id_usuario, id_trilha, progresso, status in linhas
+            ),
+            ('nome_trilha', 'progresso_percentual', 'status'),
+        )
+    except Exception as e:
+        return {'error': str(e)}
+
+
+@instrumentar('consulta_recomendacoes_users')
+def consulta_recomendacoes_users(
+    cursor,
+    ids: Sequence[int],
+    desde: Optional[date] = None,
+    ate: Optional[date] = None,
+    limite: Optional[int] = None,
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Recomendações de vários usuários em uma única consulta.
+    Retorna {id_usuario: [{tipo, id_referencia, motivo, data_recomendacao}, ...]}.
+    """
+    try:
+        sql, binds = _lote_usuarios(
+            cursor,
+            ids,
+            'tipo, id_referencia, motivo, data_recomendacao',
+            'FROM recomendacoes',
+            'data_recomendacao',
+            'data_recomendacao DESC',
+            desde,
+            ate,
+            limite,
+        )
+        return _agrupar_por_usuario(
+            consultar(cursor, sql, binds, modo=MODO_TUPLA),
+            ('tipo', 'id_referencia', 'motivo', 'data_recomendacao'),
+        )
+    except Exception as e:
+        return {'error': str(e)}
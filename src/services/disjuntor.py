@@ -0,0 +1,137 @@
+"""
+disjuntor.py
+
+Disjuntor (circuit breaker) do acesso ao Oracle.
+
+    fechado     -> acessos normais; falhas consecutivas são contadas
+    aberto      -> após `UPPATH_DISJUNTOR_FALHAS` falhas seguidas, todo acesso
+                   falha na hora com `CircuitoAberto`, sem esperar timeout de rede
+    meio-aberto -> passados `UPPATH_DISJUNTOR_ABERTO_S` segundos, um único
+                   acesso de teste é liberado; sucesso fecha o disjuntor,
+                   falha o abre de novo. A conexão do acesso de teste é
+                   confirmada com um `ping()` ao ser obtida (`DAO._abrir`),
+                   então o resultado não depende de como ela será usada
+
+Contam como falha os erros ao obter conexão e os erros de comunicação na
+execução de comandos (`OperationalError`/`InterfaceError`); erros de SQL não.
+"""
+
+import logging
+import math
+import threading
+import time
+
+try:
+    import oracledb
+except ImportError:
+    oracledb = None
+
+from src.config import get_disjuntor_config
+
+from . import metricas
+from .exceptions import CircuitoAberto
+
+FECHADO = 'fechado'
+MEIO_ABERTO = 'meio_aberto'
+ABERTO = 'aberto'
+
+_CODIGO_ESTADO = {FECHADO: 0, MEIO_ABERTO: 1, ABERTO: 2}
+
+
+def erro_de_comunicacao(erro: Exception) -> bool:
+    """Indica se o erro de execução indica banco indisponível (não erro de SQL)."""
+    if oracledb is None:
+        return False
+    return isinstance(erro, (oracledb.OperationalError, oracledb.InterfaceError))
+
+
+class Disjuntor:
+    def __init__(self, falhas: int, aberto: float):
+        self.limite_falhas = falhas
+        self.tempo_aberto = aberto
+        self._lock = threading.Lock()
+        self._estado = FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._teste_em = None  # instante em que o acesso de teste foi liberado
+        metricas.disjuntor_estado.set(valor=0)
+
+    def _mudar(self, estado: str) -> None:
+        if estado == self._estado:
+            return
+        self._estado = estado
+        metricas.disjuntor_estado.set(valor=_CODIGO_ESTADO[estado])
+        metricas.disjuntor_transicoes.inc(estado)
+        nivel = logging.WARNING if estado == ABERTO else logging.INFO
+        logging.log(nivel, f'Disjuntor do banco: {estado}.')
+
+    def permitir(self) -> bool:
+        """Levanta `CircuitoAberto` se o acesso ao banco não deve ser tentado.
+
+        Retorna True quando o acesso liberado é o de teste do meio-aberto:
+        quem o obteve deve reportar `sucesso()` ou `falha()`.
+        """
+        if not self.limite_falhas:
+            return False
+        with self._lock:
+            if self._estado == FECHADO:
+                return False
+            agora = time.monotonic()
+            if self._estado == ABERTO and agora - self._aberto_em >= self.tempo_aberto:
+                self._mudar(MEIO_ABERTO)
+                self._teste_em = None
+            if self._estado == MEIO_ABERTO:
+                # Um acesso de teste por vez; se ele nunca reportar, libera outro
+                if self._teste_em is None or agora - self._teste_em >= self.tempo_aberto:
+                    self._teste_em = agora
+                    return True
+            restante = self._restante(agora)
+        metricas.disjuntor_rejeitadas.inc()
+        raise CircuitoAberto(
+            f'Banco de dados indisponível (disjuntor {self._estado}, '
+            f'nova tentativa em {math.ceil(restante)}s)'
+        )
+
+    def sucesso(self) -> None:
+        if self._estado == FECHADO and not self._falhas:
+            return
+        with self._lock:
+            self._falhas = 0
+            self._teste_em = None
+            self._mudar(FECHADO)
+
+    def falha(self) -> None:
+        if not self.limite_falhas:
+            return
+        with self._lock:
+            self._falhas += 1
+            if self._estado == MEIO_ABERTO or self._falhas >= self.limite_falhas:
+                self._aberto_em = time.monotonic()
+                self._teste_em = None
+                self._mudar(ABERTO)
+
+    def _restante(self, agora: float) -> float:
+        # Aberto: até virar meio-aberto; meio-aberto: até liberar outro teste
+        if self._estado == ABERTO:
+            return max(self.tempo_aberto - (agora - self._aberto_em), 0.0)
+        if self._estado == MEIO_ABERTO and self._teste_em is not None:
+            return max(self.tempo_aberto - (agora - self._teste_em), 0.0)
+        return 0.0
+
+    @property
+    def estado(self) -> str:
+        return self._estado
+
+    def segundos_para_teste(self) -> float:
+        with self._lock:
+            return self._restante(time.monotonic())
+
+
+_cfg = get_disjuntor_config()
+disjuntor = Disjuntor(_cfg['falhas'], _cfg['aberto'])
+
+
+def registrar_erro_execucao(erro: Exception) -> None:
+    """Conta o erro de execução no disjuntor se for erro de comunicação."""
+    if erro_de_comunicacao(erro):
+        disjuntor.falha()
@@ -11,3 +11,7 @@ class NotFoundError(Exception):
 
 class ValidationError(Exception):
     """Erro de validação de dados de entrada."""
+
+
+class CircuitoAberto(DatabaseError):
+    """Acesso ao banco bloqueado pelo disjuntor após falhas consecutivas."""
@@ -0,0 +1,244 @@
+"""
+importador.py
+
+Importação em lote de usuários a partir de arquivos CSV ou NDJSON.
+
+O arquivo é lido em streaming e processado em lotes: cada lote é validado,
+tem as senhas convertidas em hash num pool de processos, é conferido contra
+os emails já cadastrados com uma única consulta e inserido com `executemany`.
+Registros rejeitados são gravados num relatório CSV (registro, email, erro),
+numerados a partir de 1 na ordem do arquivo. Linhas de NDJSON que não são um
+objeto JSON válido também são rejeitadas (com o número da linha no erro), sem
+interromper a importação.
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Union
+
+from src.utils.validators import validate_usuarios_batch
+
+from .DAO import _connect
+from .exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Oracle limita listas IN a 1000 elementos
+TAMANHO_LOTE = 1000
+
+_INSERT_USUARIO = (
+    'INSERT INTO usuarios (id_usuario, id_empresa, nome_completo, email, senha_hash, '
+    'nivel_carreira, ocupacao, genero, data_nascimento, is_admin) '
+    'VALUES (usuarios_seq.NEXTVAL, :1, :2, :3, :4, :5, :6, :7, :8, :9)'
+)
+
+
+class LinhaInvalida(NamedTuple):
+    """Linha de NDJSON que não pôde ser lida como objeto JSON."""
+
+    linha: int
+    erro: str
+
+
+def ler_registros(caminho: str) -> Iterator[Union[Dict, LinhaInvalida]]:
+    """Lê registros de um arquivo CSV ou NDJSON sem carregá-lo inteiro.
+
+    O formato é definido pela extensão: `.csv` ou `.ndjson`/`.jsonl`. Linhas
+    de NDJSON com JSON inválido ou que não são um objeto viram `LinhaInvalida`.
+    """
+    if _formato(caminho) == 'csv':
+        with open(caminho, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            for numero, linha in enumerate(f, 1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError as e:
+                    yield LinhaInvalida(numero, f'JSON inválido ({e.msg}, coluna {e.colno})')
+                    continue
+                if not isinstance(registro, dict):
+                    yield LinhaInvalida(numero, 'A linha não é um objeto JSON')
+                    continue
+                yield registro
+
+
+def _formato(caminho: str) -> str:
+    ext = os.path.splitext(caminho)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    raise ValueError(f'Formato de arquivo não suportado: {ext or caminho}')
+
+
+def _lotes(registros: Iterable, tamanho: int) -> Iterator[List]:
+    it = iter(registros)
+    while True:
+        lote = list(islice(it, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def _hash_senha(senha: str) -> str:
+    return hashlib.sha256(senha.encode('utf-8')).hexdigest()
+
+
+def _texto(valor) -> str:
+    return '' if valor is None else str(valor)
+
+
+def _emails_existentes(cur, emails: List[str]) -> set:
+    """Retorna quais dos emails já estão cadastrados (uma única consulta)."""
+    if not emails:
+        return set()
+    binds = ','.join(f':{i}' for i in range(1, len(emails) + 1))
+    cur.execute(f'SELECT email FROM usuarios WHERE email IN ({binds})', emails)
+    return {r[0] for r in cur.fetchall()}
+
+
+def importar_usuarios(
+    caminho: str,
+    relatorio: str = None,
+    tamanho_lote: int = TAMANHO_LOTE,
+    processos: int = None,
+    conn_info: Dict = None,
+) -> Dict[str, int]:
+    """Importa usuários de um arquivo CSV/NDJSON.
+
+    Cada linha deve ter `nome_completo`, `email`, `senha` (ou `senha_hash`) e
+    `data_nascimento`; `id_empresa`, `nivel_carreira`, `ocupacao`, `genero` e
+    `is_admin` são opcionais.
+
+    Args:
+        caminho: Arquivo de entrada
+        relatorio: Arquivo CSV para as linhas rejeitadas (opcional)
+        tamanho_lote: Linhas por lote (máximo 1000)
+        processos: Tamanho do pool de hashing (padrão: nº de CPUs)
+
+    Returns:
+        Dict com contagens: {lidas, inseridas, rejeitadas}
+    """
+    _formato(caminho)
+    tamanho_lote = max(1, min(tamanho_lote, TAMANHO_LOTE))
+    processos = processos or os.cpu_count() or 1
+    contagem = {'lidas': 0, 'inseridas': 0, 'rejeitadas': 0}
+    emails_vistos = set()
+
+    arq_relatorio = None
+    escritor = None
+    if relatorio:
+        arq_relatorio = open(relatorio, 'w', encoding='utf-8', newline='')
+        escritor = csv.writer(arq_relatorio)
+        escritor.writerow(['registro', 'email', 'erro'])
+
+    def rejeitar(registro, email, erro):
+        contagem['rejeitadas'] += 1
+        if escritor:
+            escritor.writerow([registro, email or '', erro])
+
+    conn = _connect(conn_info)
+    cur = conn.cursor()
+    try:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            for lote in _lotes(ler_registros(caminho), tamanho_lote):
+                numeros = range(
+                    contagem['lidas'] + 1, contagem['lidas'] + 1 + len(lote)
+                )
+                contagem['lidas'] += len(lote)
+
+                # 1) Validação (linhas ilegíveis vão direto para o relatório)
+                registros = []
+                for n, row in zip(numeros, lote):
+                    if isinstance(row, LinhaInvalida):
+                        rejeitar(n, None, f'Linha {row.linha}: {row.erro}')
+                    else:
+                        registros.append((n, row))
+                validos = []
+                for (n, row), (usuario, erros) in zip(
+                    registros, validate_usuarios_batch([row for _, row in registros])
+                ):
+                    senha = _texto(row.get('senha')).strip()
+                    senha_hash = _texto(row.get('senha_hash')).strip()
+                    if not (senha or senha_hash):
+                        erros.append('Senha não pode ser vazia')
+                    if erros:
+                        rejeitar(n, row.get('email'), '; '.join(erros))
+                        continue
+                    if usuario['email'] in emails_vistos:
+                        rejeitar(n, usuario['email'], 'Email duplicado no arquivo')
+                        continue
+                    emails_vistos.add(usuario['email'])
+                    usuario['senha_hash'] = senha_hash
+                    validos.append((n, usuario, senha))
+
+                # 2) Emails já cadastrados (consulta única por lote)
+                existentes = _emails_existentes(cur, [u['email'] for _, u, _ in validos])
+                if existentes:
+                    for n, usuario, _ in validos:
+                        if usuario['email'] in existentes:
+                            rejeitar(n, usuario['email'], 'Email já cadastrado')
+                    validos = [v for v in validos if v[1]['email'] not in existentes]
+
+                # 3) Hash das senhas no pool de processos
+                pendentes = [v for v in validos if not v[1]['senha_hash']]
+                hashes = pool.map(
+                    _hash_senha,
+                    [senha for _, _, senha in pendentes],
+                    chunksize=max(1, len(pendentes) // (processos * 4)),
+                )
+                for (_, usuario, _), senha_hash in zip(pendentes, hashes):
+                    usuario['senha_hash'] = senha_hash
+
+                if not validos:
+                    continue
+
+                # 4) Inserção em lote
+                cur.executemany(
+                    _INSERT_USUARIO,
+                    [
+                        (
+                            u['id_empresa'],
+                            u['nome_completo'],
+                            u['email'],
+                            u['senha_hash'],
+                            u['nivel_carreira'],
+                            u['ocupacao'],
+                            u['genero'],
+                            u['data_nascimento'],
+                            u['is_admin'],
+                        )
+                        for _, u, _ in validos
+                    ],
+                    batcherrors=True,
+                )
+                falhas = {err.offset: err.message for err in cur.getbatcherrors()}
+                for i, (n, usuario, _) in enumerate(validos):
+                    if i in falhas:
+                        rejeitar(n, usuario['email'], falhas[i])
+                contagem['inseridas'] += len(validos) - len(falhas)
+                conn.commit()
+                logger.info(
+                    f'Importação: {contagem["lidas"]} lida(s), '
+                    f'{contagem["inseridas"]} inserida(s), '
+                    f'{contagem["rejeitadas"]} rejeitada(s).'
+                )
+    except Exception as e:
+        conn.rollback()
+        logger.error(f'Erro na importação de usuários: {e}')
+        raise DatabaseError('Erro na importação de usuários') from e
+    finally:
+        cur.close()
+        conn.close()
+        if arq_relatorio:
+            arq_relatorio.close()
+
+    return contagem
@@ -0,0 +1,343 @@
+"""
+metricas.py
+
+Instrumentação de acesso ao banco e da API, exportada no formato texto do
+Prometheus (`/api/v1/metrics`).
+
+Métricas são mantidas em memória por processo; com vários workers do
+gunicorn, cada worker expõe as suas (o Prometheus agrega por instância).
+"""
+
+import functools
+import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from src.config import get_slow_query_ms
+
+slow_logger = logging.getLogger('uppath.slow_query')
+
+# Buckets (segundos) usados por todos os histogramas
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Nome da consulta em execução no contexto atual (thread/requisição)
+_consulta_atual = ContextVar('consulta_atual', default='sql')
+
+# Temporizadores da requisição atual (Server-Timing) e ID de correlação
+_tempos_requisicao = ContextVar('tempos_requisicao', default=None)
+_request_id = ContextVar('request_id', default=None)
+
+_lock = threading.Lock()
+_registro: List['_Metrica'] = []
+_caches: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_labels(nomes: Tuple[str, ...], valores: Tuple) -> str:
+    if not nomes:
+        return ''
+    pares = ','.join(f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores))
+    return '{' + pares + '}'
+
+
+class _Metrica(ABC):
+    tipo = ''
+
+    def __init__(self, nome: str, ajuda: str, labels: Iterable[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.labels = tuple(labels)
+        self._valores: Dict[Tuple, object] = {}
+        with _lock:
+            _registro.append(self)
+
+    @abstractmethod
+    def _linhas(self) -> List[str]:
+        """Linhas de amostra no formato texto (chamado com o lock)."""
+
+    def render(self) -> List[str]:
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}']
+        with _lock:
+            linhas.extend(self._linhas())
+        return linhas
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def inc(self, *labels, valor: float = 1.0) -> None:
+        with _lock:
+            self._valores[labels] = self._valores.get(labels, 0.0) + valor
+
+    def _linhas(self):
+        return [
+            f'{self.nome}{_formatar_labels(self.labels, k)} {v}'
+            for k, v in self._valores.items()
+        ]
+
+
+class Gauge(_Metrica):
+    tipo = 'gauge'
+
+    def set(self, *labels, valor: float) -> None:
+        with _lock:
+            self._valores[labels] = valor
+
+    def _linhas(self):
+        return [
+            f'{self.nome}{_formatar_labels(self.labels, k)} {v}'
+            for k, v in self._valores.items()
+        ]
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def observar(self, *labels, valor: float) -> None:
+        with _lock:
+            estado = self._valores.get(labels)
+            if estado is None:
+                estado = self._valores[labels] = [[0] * len(BUCKETS), 0.0, 0]
+            contagens = estado[0]
+            for i, limite in enumerate(BUCKETS):
+                if valor <= limite:
+                    contagens[i] += 1
+            estado[1] += valor
+            estado[2] += 1
+
+    def _linhas(self):
+        linhas = []
+        nomes_le = self.labels + ('le',)
+        for k, (contagens, soma, total) in self._valores.items():
+            for limite, c in zip(BUCKETS, contagens):
+                linhas.append(
+                    f'{self.nome}_bucket{_formatar_labels(nomes_le, k + (limite,))} {c}'
+                )
+            linhas.append(
+                f'{self.nome}_bucket{_formatar_labels(nomes_le, k + ("+Inf",))} {total}'
+            )
+            rotulos = _formatar_labels(self.labels, k)
+            linhas.append(f'{self.nome}_sum{rotulos} {soma}')
+            linhas.append(f'{self.nome}_count{rotulos} {total}')
+        return linhas
+
+
+# ============================================================================
+# MÉTRICAS DA APLICAÇÃO
+# ============================================================================
+
+consulta_duracao = Histograma(
+    'uppath_query_duration_seconds',
+    'Duração das consultas/operações do DAO',
+    ('query',),
+)
+consulta_erros = Contador(
+    'uppath_query_errors_total', 'Consultas/operações do DAO com erro', ('query',)
+)
+sql_duracao = Histograma(
+    'uppath_sql_duration_seconds',
+    'Duração de cada execução SQL (execute + fetch)',
+    ('query',),
+)
+sql_linhas = Contador(
+    'uppath_sql_rows_fetched_total', 'Linhas lidas do banco', ('query',)
+)
+conexao_duracao = Histograma(
+    'uppath_db_connect_duration_seconds', 'Tempo para obter uma conexão Oracle'
+)
+conexao_erros = Contador(
+    'uppath_db_connect_errors_total', 'Falhas ao obter conexão Oracle'
+)
+http_duracao = Histograma(
+    'uppath_http_request_duration_seconds',
+    'Latência das requisições HTTP por rota',
+    ('route', 'method', 'status'),
+)
+disjuntor_estado = Gauge(
+    'uppath_db_circuit_state',
+    'Estado do disjuntor do banco (0 fechado, 1 meio-aberto, 2 aberto)',
+)
+disjuntor_transicoes = Contador(
+    'uppath_db_circuit_transitions_total', 'Mudanças de estado do disjuntor', ('state',)
+)
+disjuntor_rejeitadas = Contador(
+    'uppath_db_circuit_rejected_total', 'Acessos ao banco bloqueados pelo disjuntor'
+)
+admissao_em_execucao = Gauge(
+    'uppath_admission_in_flight', 'Requisições em execução por portão', ('gate',)
+)
+admissao_na_fila = Gauge(
+    'uppath_admission_queued', 'Requisições aguardando vaga por portão', ('gate',)
+)
+admissao_empresa_em_execucao = Gauge(
+    'uppath_admission_tenant_in_flight',
+    'Requisições em execução por empresa',
+    ('gate', 'tenant'),
+)
+admissao_espera = Histograma(
+    'uppath_admission_wait_seconds', 'Espera por vaga no portão', ('gate',)
+)
+admissao_rejeitadas = Contador(
+    'uppath_admission_rejected_total',
+    'Requisições rejeitadas com 503 por saturação',
+    ('gate', 'reason'),
+)
+coalescidas = Contador(
+    'uppath_coalesced_requests_total',
+    'Requisições atendidas pelo resultado de outra idêntica em andamento',
+    ('mode',),
+)
+amostrador_amostras = Contador(
+    'uppath_sampler_samples_total', 'Amostras de pilha coletadas pelo amostrador'
+)
+amostrador_segundos = Contador(
+    'uppath_sampler_seconds_total', 'Tempo gasto pelo amostrador coletando pilhas'
+)
+
+
+def consulta_atual() -> str:
+    return _consulta_atual.get()
+
+
+def _resultado_com_erro(resultado) -> bool:
+    # As consultas capturam exceções e devolvem {'error': ...} / [{'error': ...}]
+    if isinstance(resultado, dict):
+        return 'error' in resultado
+    if isinstance(resultado, list) and resultado:
+        primeiro = resultado[0]
+        return isinstance(primeiro, dict) and 'error' in primeiro
+    return False
+
+
+def instrumentar(nome: str):
+    """Decorator que mede duração e erros de uma consulta/operação do DAO.
+
+    Também nomeia as execuções SQL feitas dentro da função (ver `registrar_sql`).
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _consulta_atual.set(nome)
+            inicio = time.perf_counter()
+            try:
+                resultado = func(*args, **kwargs)
+            except Exception:
+                consulta_erros.inc(nome)
+                raise
+            finally:
+                consulta_duracao.observar(nome, valor=time.perf_counter() - inicio)
+                _consulta_atual.reset(token)
+            if _resultado_com_erro(resultado):
+                consulta_erros.inc(nome)
+            return resultado
+
+        return wrapper
+
+    return decorator
+
+
+def _formato_binds(params) -> str:
+    """Descreve os binds sem expor valores (ex: {id_user:int})."""
+    if params is None:
+        return '-'
+    if isinstance(params, dict):
+        itens = ', '.join(f'{k}:{type(v).__name__}' for k, v in params.items())
+        return '{' + itens + '}'
+    return '[' + ', '.join(type(v).__name__ for v in params) + ']'
+
+
+def registrar_sql(
+    sql: str, params, duracao: float, linhas: int, duracao_linhas: float = 0.0
+) -> None:
+    """Registra uma execução SQL (duração, linhas) e o log de consultas lentas.
+
+    `duracao_linhas` é a parte de `duracao` gasta no fetch/conversão das linhas.
+    """
+    nome = _consulta_atual.get()
+    sql_duracao.observar(nome, valor=duracao)
+    sql_linhas.inc(nome, valor=linhas)
+    registrar_tempo('sql', duracao - duracao_linhas, nome)
+    registrar_tempo('rows', duracao_linhas, nome)
+    limite_ms = get_slow_query_ms()
+    if limite_ms and duracao * 1000 >= limite_ms:
+        rid = _request_id.get()
+        slow_logger.warning(
+            f'Consulta lenta: {nome} {duracao * 1000:.1f}ms '
+            f'linhas={linhas} binds={_formato_binds(params)} '
+            f'sql="{" ".join(sql.split())[:200]}"'
+            + (f' request_id={rid}' if rid else '')
+        )
+
+
+# ============================================================================
+# TEMPORIZADORES POR REQUISIÇÃO (Server-Timing)
+# ============================================================================
+
+
+def iniciar_requisicao(request_id: str = None) -> None:
+    """Ativa a coleta de tempos (e o ID de correlação) no contexto atual."""
+    _tempos_requisicao.set([])
+    _request_id.set(request_id)
+
+
+def encerrar_requisicao() -> List[Tuple[str, float, str]]:
+    """Desativa a coleta e retorna os tempos coletados [(nome, segundos, desc)]."""
+    tempos = _tempos_requisicao.get() or []
+    _tempos_requisicao.set(None)
+    _request_id.set(None)
+    return tempos
+
+
+def registrar_tempo(nome: str, duracao: float, descricao: str = None) -> None:
+    """Adiciona um tempo à requisição atual (ignorado fora de requisições)."""
+    tempos = _tempos_requisicao.get()
+    if tempos is not None:
+        tempos.append((nome, duracao, descricao))
+
+
+def request_id_atual():
+    return _request_id.get()
+
+
+def registrar_cache(nome: str, estatisticas: Callable[[], Dict[str, float]]) -> None:
+    """Registra um cache para exportação (função retorna hits, misses, size...)."""
+    _caches[nome] = estatisticas
+
+
+def _render_caches() -> List[str]:
+    if not _caches:
+        return []
+    por_campo: Dict[str, List[str]] = {}
+    for nome, estatisticas in list(_caches.items()):
+        try:
+            valores = estatisticas()
+        except Exception:
+            continue
+        for campo, valor in valores.items():
+            por_campo.setdefault(campo, []).append(
+                f'uppath_cache_{campo}{{cache="{_escapar(nome)}"}} {valor}'
+            )
+    linhas = []
+    for campo, amostras in por_campo.items():
+        linhas.append(f'# HELP uppath_cache_{campo} Estatística de cache: {campo}')
+        linhas.append(f'# TYPE uppath_cache_{campo} gauge')
+        linhas.extend(amostras)
+    return linhas
+
+
+def render() -> str:
+    """Retorna todas as métricas no formato texto do Prometheus."""
+    linhas: List[str] = []
+    with _lock:
+        metricas = list(_registro)
+    for metrica in metricas:
+        linhas.extend(metrica.render())
+    linhas.extend(_render_caches())
+    return '\n'.join(linhas) + '\n'
@@ -0,0 +1,323 @@
+"""
+miniaturas.py
+
+Geração das miniaturas (`imagem_*_thumb`) das imagens de trilhas e cursos.
+
+O job (`gerar_miniaturas`, subcomando `generate-thumbs`) percorre os registros
+com `imagem_*_thumb_pendente = 1`, em ordem de id e em lotes, pelo índice
+dessa coluna (só as linhas pendentes ficam no índice). Um trigger marca a
+miniatura como pendente (e atualiza `imagem_*_versao`) sempre que a imagem é
+gravada ou trocada, então imagens novas e substituídas entram na próxima
+execução sem varrer a tabela.
+
+A imagem original é lida do LOB em blocos, a miniatura é gerada com Pillow em
+um pool de processos e gravada no LOB em blocos (`EMPTY_BLOB() ... RETURNING`),
+junto com mime, tamanho e lado, limpando a marca de pendente. A gravação só
+acontece se `imagem_*_versao` ainda for a lida: se a imagem foi trocada
+durante o job, ela continua pendente para a próxima execução. Cada lote é
+confirmado com um commit, então um job interrompido retoma de onde parou.
+
+Imagens que o Pillow não consegue abrir ficam com `imagem_*_thumb_erro`
+preenchido (e deixam de ser pendentes), para não serem tentadas de novo a
+cada execução; erros do pool de processos interrompem o job sem gravar o
+lote.
+
+O schema tem uma única coluna de miniatura por imagem; o tamanho
+(`UPPATH_THUMB_LADO`) e o formato são configuráveis. O lado usado fica em
+`rollup_controle` ('miniaturas_trilhas'/'miniaturas_cursos'): na primeira
+execução, ou se o lado mudar, o job marca como pendentes as imagens sem
+miniatura ou com outro lado; `forcar=True` marca todas.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+except ImportError:
+    Image = None
+
+try:
+    import oracledb
+except ImportError:
+    oracledb = None
+
+from src.config import get_miniatura_config
+
+from .DAO import _connect
+from .exceptions import DatabaseError
+from .metricas import instrumentar
+
+logger = logging.getLogger(__name__)
+
+# entidade -> (tabela, chave, prefixo das colunas de imagem)
+ENTIDADES = {
+    'trilhas': ('trilhas', 'id_trilha', 'imagem_trilha'),
+    'cursos': ('cursos', 'id_curso', 'imagem_curso'),
+}
+
+_MIMES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+
+def gerar(dados: bytes, lado: int, formato: str, qualidade: int) -> Tuple[bytes, str]:
+    """Gera a miniatura (maior lado = `lado`) e retorna (conteúdo, mime).
+
+    Executado nos processos do pool. Imagens com transparência são gravadas em
+    PNG quando o formato configurado é JPEG.
+    """
+    imagem = Image.open(io.BytesIO(dados))
+    # JPEG: decodifica já reduzido (bem mais rápido em fotos grandes)
+    imagem.draft('RGB', (lado, lado))
+    imagem = ImageOps.exif_transpose(imagem)
+    imagem.thumbnail((lado, lado), Image.LANCZOS)
+
+    transparente = imagem.mode in ('RGBA', 'LA') or (
+        imagem.mode == 'P' and 'transparency' in imagem.info
+    )
+    if formato == 'JPEG' and transparente:
+        formato = 'PNG'
+    if formato == 'JPEG':
+        imagem = imagem.convert('RGB')
+    elif imagem.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        imagem = imagem.convert('RGBA' if transparente else 'RGB')
+
+    saida = io.BytesIO()
+    opcoes = {'quality': qualidade, 'optimize': True} if formato != 'PNG' else {
+        'optimize': True
+    }
+    imagem.save(saida, formato, **opcoes)
+    return saida.getvalue(), _MIMES[formato]
+
+
+def _erros_de_imagem() -> Tuple[type, ...]:
+    """Erros de uma imagem inválida (registrados em `*_thumb_erro`).
+
+    Qualquer outro erro do pool (ex: `BrokenProcessPool`) interrompe o job sem
+    gravar o lote.
+    """
+    return (UnidentifiedImageError, OSError, Image.DecompressionBombError)
+
+
+def _ler(lob, bloco: int) -> bytes:
+    """Lê o LOB em blocos alinhados ao chunk (sem uma única leitura gigante)."""
+    chunk = lob.getchunksize() or bloco
+    tamanho_bloco = max(chunk, bloco // chunk * chunk)
+    partes = []
+    posicao = 1
+    while True:
+        dados = lob.read(posicao, tamanho_bloco)
+        if not dados:
+            break
+        partes.append(dados)
+        posicao += len(dados)
+    return b''.join(partes)
+
+
+def _escrever(cur, sql: str, binds: Dict, conteudo: bytes, bloco: int) -> bool:
+    """Executa o UPDATE ... RETURNING do LOB e grava `conteudo` em blocos.
+
+    Retorna False se o UPDATE não alterou nenhuma linha.
+    """
+    saida = cur.var(oracledb.DB_TYPE_BLOB)
+    cur.execute(sql, {**binds, 'lob': saida})
+    if not cur.rowcount:
+        return False
+    lob = saida.getvalue()
+    if isinstance(lob, list):
+        lob = lob[0]
+    for inicio in range(0, len(conteudo), bloco):
+        lob.write(conteudo[inicio : inicio + bloco], inicio + 1)
+    return True
+
+
+def _sqls(entidade: str) -> Dict[str, str]:
+    tabela, chave, coluna = ENTIDADES[entidade]
+    # Só grava se a imagem ainda for a versão lida (DECODE compara NULLs)
+    mesma_versao = f'{chave} = :id AND DECODE({coluna}_versao, :versao, 1, 0) = 1'
+    return {
+        'marcar': f"""
+            UPDATE {tabela}
+            SET {coluna}_thumb_pendente = 1
+            WHERE {coluna} IS NOT NULL
+              AND {coluna}_thumb_pendente IS NULL
+              AND (:forcar = 1 OR NVL({coluna}_thumb_lado, 0) != :lado
+                   OR ({coluna}_thumb IS NULL AND {coluna}_thumb_erro IS NULL))
+            """,
+        'candidatos': f"""
+            SELECT {chave}, {coluna}_versao, {coluna}
+            FROM {tabela}
+            WHERE {coluna}_thumb_pendente = 1
+              AND {coluna} IS NOT NULL
+              AND {chave} > :ultimo
+            ORDER BY {chave}
+            FETCH FIRST :lote ROWS ONLY
+            """,
+        'gravar': f"""
+            UPDATE {tabela}
+            SET {coluna}_thumb = EMPTY_BLOB(),
+                {coluna}_thumb_mime = :mime,
+                {coluna}_thumb_tamanho = :tamanho,
+                {coluna}_thumb_lado = :lado,
+                {coluna}_thumb_erro = NULL,
+                {coluna}_thumb_pendente = NULL
+            WHERE {mesma_versao}
+            RETURNING {coluna}_thumb INTO :lob
+            """,
+        'erro': f"""
+            UPDATE {tabela}
+            SET {coluna}_thumb = NULL,
+                {coluna}_thumb_mime = NULL,
+                {coluna}_thumb_tamanho = NULL,
+                {coluna}_thumb_lado = :lado,
+                {coluna}_thumb_erro = :erro,
+                {coluna}_thumb_pendente = NULL
+            WHERE {mesma_versao}
+            """,
+    }
+
+
+def _marcar_pendentes(cur, conn, entidade: str, lado: int, forcar: bool) -> int:
+    """Marca as miniaturas a (re)gerar na primeira execução, quando o lado
+    mudar ou com `forcar`; retorna quantas foram marcadas."""
+    nome = f'miniaturas_{entidade}'
+    cur.execute(
+        'SELECT marca FROM rollup_controle WHERE nome = :nome FOR UPDATE', {'nome': nome}
+    )
+    controle = cur.fetchone()
+    if controle is None:
+        raise DatabaseError('rollup_controle incompleto; execute init_table')
+    if controle[0] == lado and not forcar:
+        conn.rollback()
+        return 0
+    cur.execute(_sqls(entidade)['marcar'], {'forcar': 1 if forcar else 0, 'lado': lado})
+    marcadas = cur.rowcount
+    cur.execute(
+        """
+        UPDATE rollup_controle
+        SET marca = :lado, atualizado_em = SYSTIMESTAMP
+        WHERE nome = :nome
+        """,
+        {'lado': lado, 'nome': nome},
+    )
+    conn.commit()
+    logger.info(f'Miniaturas de {entidade}: {marcadas} marcada(s) como pendente(s).')
+    return marcadas
+
+
+def _processar(
+    cur, conn, pool, entidade: str, config: Dict[str, Any], forcar: bool
+) -> Dict[str, int]:
+    sqls = _sqls(entidade)
+    contagem = {
+        'marcadas': _marcar_pendentes(cur, conn, entidade, config['lado'], forcar),
+        'geradas': 0,
+        'erros': 0,
+        'alteradas': 0,
+        'bytes_lidos': 0,
+        'bytes_gravados': 0,
+    }
+    erros_de_imagem = _erros_de_imagem()
+    ultimo = -1
+    while True:
+        cur.execute(sqls['candidatos'], {'ultimo': ultimo, 'lote': config['lote']})
+        # Lê o lote inteiro antes de gravar (o cursor é reutilizado nos UPDATEs);
+        # só um lote de imagens originais fica em memória por vez
+        lote: List[Tuple[int, Any, bytes]] = [
+            (id_, versao, _ler(lob, config['bloco'])) for id_, versao, lob in cur.fetchall()
+        ]
+        if not lote:
+            return contagem
+        ultimo = lote[-1][0]
+
+        tarefas = [
+            (
+                id_,
+                versao,
+                pool.submit(
+                    gerar, dados, config['lado'], config['formato'], config['qualidade']
+                ),
+            )
+            for id_, versao, dados in lote
+        ]
+        contagem['bytes_lidos'] += sum(len(dados) for _, _, dados in lote)
+        del lote
+        for id_, versao, tarefa in tarefas:
+            try:
+                conteudo, mime = tarefa.result()
+            except erros_de_imagem as e:
+                logger.warning(f'Miniatura de {entidade} {id_} não gerada: {e}')
+                cur.execute(
+                    sqls['erro'],
+                    {'id': id_, 'versao': versao, 'lado': config['lado'], 'erro': str(e)[:200]},
+                )
+                contagem['erros' if cur.rowcount else 'alteradas'] += 1
+                continue
+            gravada = _escrever(
+                cur,
+                sqls['gravar'],
+                {
+                    'id': id_,
+                    'versao': versao,
+                    'mime': mime,
+                    'tamanho': len(conteudo),
+                    'lado': config['lado'],
+                },
+                conteudo,
+                config['bloco'],
+            )
+            if not gravada:
+                # Imagem trocada durante o job: continua pendente
+                contagem['alteradas'] += 1
+                continue
+            contagem['geradas'] += 1
+            contagem['bytes_gravados'] += len(conteudo)
+        conn.commit()
+        logger.info(
+            f'Miniaturas de {entidade}: {contagem["geradas"]} gerada(s) até o id {ultimo}.'
+        )
+
+
+@instrumentar('miniaturas.gerar_miniaturas')
+def gerar_miniaturas(
+    entidades: Optional[List[str]] = None,
+    processos: int = None,
+    forcar: bool = False,
+    conn_info: Dict = None,
+) -> Dict[str, Any]:
+    """Gera as miniaturas pendentes (ver docstring do módulo).
+
+    Args:
+        entidades: 'trilhas' e/ou 'cursos' (padrão: ambas)
+        processos: Tamanho do pool (padrão: nº de CPUs)
+        forcar: Marca todas as miniaturas como pendentes, inclusive as já geradas
+    """
+    if Image is None:
+        raise ModuleNotFoundError('Pillow não encontrado')
+    inicio = time.perf_counter()
+    config = get_miniatura_config()
+    entidades = entidades or list(ENTIDADES)
+    processos = processos or os.cpu_count() or 1
+    resumo: Dict[str, Any] = {'lado': config['lado'], 'formato': config['formato']}
+    conn = _connect(conn_info)
+    cur = conn.cursor()
+    try:
+        # spawn: os processos só usam Pillow, sem herdar a conexão deste processo
+        with ProcessPoolExecutor(
+            max_workers=processos, mp_context=multiprocessing.get_context('spawn')
+        ) as pool:
+            for entidade in entidades:
+                resumo[entidade] = _processar(cur, conn, pool, entidade, config, forcar)
+    except Exception as e:
+        conn.rollback()
+        logger.error(f'Erro ao gerar miniaturas: {e}')
+        raise DatabaseError('Erro ao gerar miniaturas') from e
+    finally:
+        cur.close()
+        conn.close()
+    resumo['duracao_s'] = round(time.perf_counter() - inicio, 3)
+    return resumo
@@ -0,0 +1,308 @@
+"""
+referencia.py
+
+Cache em memória (por processo) das tabelas de referência `empresas`,
+`trilhas` e `cursos`: poucas linhas, lidas o tempo todo e quase nunca
+alteradas. Usado pela CLI e pela API.
+
+- Cada tabela é carregada inteira em uma consulta (só colunas de metadados,
+  nunca os BLOBs de imagem) e vira um mapa id -> registro, mais um índice por
+  nome (sem diferenciar maiúsculas).
+- A carga expira após `UPPATH_REFERENCIA_TTL` segundos e é refeita no próximo
+  acesso; um id desconhecido também provoca uma recarga (no máximo uma a cada
+  `RECARGA_MINIMA` segundos), então registros novos aparecem sem esperar o TTL.
+- `invalidar()` descarta as cargas deste processo (ex: após alterar essas
+  tabelas). `publicar_invalidacao()` também incrementa a versão da tabela em
+  `rollup_controle` (`referencia_<tabela>`): os demais processos comparam essa
+  versão no acesso (no máximo a cada `RECARGA_MINIMA` segundos) e recarregam
+  se ela mudou. Se uma recarga falhar, a versão anterior continua em uso.
+- Com `UPPATH_REFERENCIA_TTL=0` o cache fica desligado: cada acesso lê a
+  tabela e nada é guardado. Quem precisa de vários nomes deve pegar o mapa
+  uma vez (`nomes()`/`nomes_de()`), não chamar `nome()` por linha.
+
+Usage:
+    referencia.empresas.nomes()          # {id_empresa: nome_empresa}
+    referencia.trilhas.obter(3)          # registro da trilha 3 (ou None)
+    referencia.cursos.por_nome('Python') # cursos com esse título
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.config import get_referencia_ttl
+
+from . import metricas
+from .row_factory import consultar
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo (s) entre recargas provocadas por ids desconhecidos (e
+# entre leituras das versões publicadas em rollup_controle)
+RECARGA_MINIMA = 5.0
+
+_SQL_VERSOES = """
+    SELECT SUBSTR(nome, 12) AS tabela, NVL(marca, 0) AS versao
+    FROM rollup_controle
+    WHERE nome IN ('referencia_empresas', 'referencia_trilhas', 'referencia_cursos')
+"""
+
+_SQL_PUBLICAR = """
+    UPDATE rollup_controle
+    SET marca = NVL(marca, 0) + 1, atualizado_em = SYSTIMESTAMP
+    WHERE nome = :nome
+"""
+
+
+class _Versoes:
+    """Versões publicadas das tabelas, relidas no máximo a cada RECARGA_MINIMA s."""
+
+    def __init__(self):
+        self._versoes: Dict[str, int] = {}
+        self._lidas_em = float('-inf')
+        self._lock = threading.Lock()
+
+    def obter(self, tabela: str, cursor=None) -> Optional[int]:
+        """Versão publicada da tabela (None se não foi possível ler)."""
+        with self._lock:
+            if time.monotonic() - self._lidas_em > RECARGA_MINIMA:
+                # Mesmo com falha, só tenta de novo após RECARGA_MINIMA
+                self._lidas_em = time.monotonic()
+                try:
+                    self._versoes = self._ler(cursor)
+                except Exception as e:
+                    logger.debug(f'Falha ao ler as versões das referências: {e}')
+                    self._versoes = {}
+            return self._versoes.get(tabela)
+
+    @staticmethod
+    def _ler(cursor=None) -> Dict[str, int]:
+        if cursor is None:
+            from .DAO import get_cursor
+
+            with get_cursor() as cur:
+                linhas = consultar(cur, _SQL_VERSOES)
+        else:
+            linhas = consultar(cursor, _SQL_VERSOES)
+        return {linha['tabela']: int(linha['versao']) for linha in linhas}
+
+    def expirar(self) -> None:
+        with self._lock:
+            self._lidas_em = float('-inf')
+
+
+_versoes = _Versoes()
+
+
+class TabelaReferencia:
+    """Uma tabela de referência mantida em memória."""
+
+    def __init__(self, tabela: str, sql: str, chave: str, coluna_nome: str):
+        self.tabela = tabela
+        self.sql = sql
+        self.chave = chave
+        self.coluna_nome = coluna_nome
+        self._registros: Optional[Dict[int, Dict[str, Any]]] = None
+        self._por_nome: Dict[str, List[Dict[str, Any]]] = {}
+        self._carregado_em = float('-inf')
+        self._versao: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.cargas = 0
+        self.cargas_erro = 0
+        metricas.registrar_cache(f'referencia_{tabela}', self.estatisticas)
+
+    def _ler(self, cursor=None) -> Tuple[Dict[int, Dict[str, Any]], Dict[str, List]]:
+        """Lê a tabela e retorna (id -> registro, nome -> registros)."""
+        if cursor is None:
+            from .DAO import get_cursor
+
+            with get_cursor() as cur:
+                linhas = consultar(cur, self.sql)
+        else:
+            linhas = consultar(cursor, self.sql)
+        registros = {linha[self.chave]: linha for linha in linhas}
+        por_nome: Dict[str, List[Dict[str, Any]]] = {}
+        for linha in linhas:
+            por_nome.setdefault(str(linha[self.coluna_nome]).casefold(), []).append(linha)
+        return registros, por_nome
+
+    def _carregar(self, cursor=None, versao: Optional[int] = None) -> None:
+        # Chamado com o lock: uma única carga por vez, as demais aguardam.
+        # `versao` é lida antes da carga: uma publicação durante ela provoca
+        # outra recarga em vez de se perder
+        try:
+            self._registros, self._por_nome = self._ler(cursor)
+        except Exception as e:
+            self.cargas_erro += 1
+            if self._registros is None:
+                raise
+            logger.warning(f'Falha ao recarregar {self.tabela}; mantendo a versão anterior: {e}')
+            # Nova tentativa após RECARGA_MINIMA, não só depois de mais um TTL
+            self._carregado_em = time.monotonic() - get_referencia_ttl() + RECARGA_MINIMA
+            return
+        self._carregado_em = time.monotonic()
+        if versao is not None:
+            self._versao = versao
+        self.cargas += 1
+        logger.debug(
+            f'Referência {self.tabela} carregada ({len(self._registros)} registro(s)).'
+        )
+
+    def _atuais(self, cursor=None) -> Tuple[Dict[int, Dict[str, Any]], Dict[str, List]]:
+        if not get_referencia_ttl():
+            # Cache desligado: lê a tabela agora e não guarda nada
+            with self._lock:
+                self.misses += 1
+            try:
+                return self._ler(cursor)
+            except Exception:
+                with self._lock:
+                    self.cargas_erro += 1
+                raise
+        versao = _versoes.obter(self.tabela, cursor)
+        with self._lock:
+            idade = time.monotonic() - self._carregado_em
+            if (
+                self._registros is None
+                or idade > get_referencia_ttl()
+                or (versao is not None and versao != self._versao)
+            ):
+                self.misses += 1
+                self._carregar(cursor, versao)
+            else:
+                self.hits += 1
+            return self._registros, self._por_nome
+
+    def _com_ids(self, ids: Iterable[int], cursor=None) -> Dict[int, Dict[str, Any]]:
+        """Registros atuais; se faltar algum dos `ids`, recarrega (no máximo
+        uma vez a cada RECARGA_MINIMA segundos) para pegar registros novos."""
+        registros = self._atuais(cursor)[0]
+        if all(id_ in registros for id_ in ids) or not get_referencia_ttl():
+            return registros
+        versao = _versoes.obter(self.tabela, cursor)
+        with self._lock:
+            if time.monotonic() - self._carregado_em > RECARGA_MINIMA:
+                self._carregar(cursor, versao)
+            return self._registros
+
+    def registros(self, cursor=None) -> Dict[int, Dict[str, Any]]:
+        """Mapa id -> registro, em ordem de id (não alterar)."""
+        return self._atuais(cursor)[0]
+
+    def nomes(self, cursor=None) -> Dict[int, str]:
+        """Mapa id -> nome, em ordem de id."""
+        return {
+            id_: registro[self.coluna_nome]
+            for id_, registro in self._atuais(cursor)[0].items()
+        }
+
+    def nomes_de(self, ids: Iterable[int], cursor=None) -> Dict[int, str]:
+        """Mapa id -> nome só dos `ids` (ids inexistentes ficam de fora).
+
+        Uma única leitura do cache para todos os ids (ex: antes de montar o
+        resultado de uma consulta), com recarga se algum id for desconhecido.
+        """
+        ids = set(ids)
+        registros = self._com_ids(ids, cursor)
+        return {
+            id_: registros[id_][self.coluna_nome] for id_ in ids if id_ in registros
+        }
+
+    def obter(self, id_: int, cursor=None) -> Optional[Dict[str, Any]]:
+        """Registro pelo id; None se não existir (mesmo após recarregar)."""
+        return self._com_ids((id_,), cursor).get(id_)
+
+    def nome(self, id_: int, cursor=None) -> Optional[str]:
+        registro = self.obter(id_, cursor)
+        return None if registro is None else registro[self.coluna_nome]
+
+    def por_nome(self, nome: str, cursor=None) -> List[Dict[str, Any]]:
+        """Registros com o nome informado (sem diferenciar maiúsculas)."""
+        return list(self._atuais(cursor)[1].get(nome.strip().casefold(), ()))
+
+    def invalidar(self) -> None:
+        # Mantém os registros: servem de reserva se a recarga falhar
+        with self._lock:
+            self._carregado_em = float('-inf')
+
+    def estatisticas(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._registros or ()),
+                'loads': self.cargas,
+                'load_errors': self.cargas_erro,
+            }
+
+
+empresas = TabelaReferencia(
+    'empresas',
+    """
+    SELECT id_empresa, nome_empresa, cnpj, email_contato, data_cadastro
+    FROM empresas
+    ORDER BY id_empresa
+    """,
+    'id_empresa',
+    'nome_empresa',
+)
+
+trilhas = TabelaReferencia(
+    'trilhas',
+    """
+    SELECT id_trilha, nome_trilha, descricao_trilha, categoria, nivel_dificuldade,
+           data_criacao, imagem_trilha_nome, imagem_trilha_mime,
+           imagem_trilha_tamanho, imagem_trilha_alt
+    FROM trilhas
+    ORDER BY id_trilha
+    """,
+    'id_trilha',
+    'nome_trilha',
+)
+
+cursos = TabelaReferencia(
+    'cursos',
+    """
+    SELECT id_curso, id_trilha, titulo, descricao_curso, plataforma, link_curso,
+           duracao_horas, imagem_curso_nome, imagem_curso_mime,
+           imagem_curso_tamanho, imagem_curso_alt
+    FROM cursos
+    ORDER BY id_curso
+    """,
+    'id_curso',
+    'titulo',
+)
+
+TABELAS = {tabela.tabela: tabela for tabela in (empresas, trilhas, cursos)}
+
+
+def carregar(cursor=None) -> Dict[str, int]:
+    """Carrega (ou recarrega) todas as tabelas; retorna o nº de registros de cada."""
+    invalidar()
+    return {nome: len(tabela.registros(cursor)) for nome, tabela in TABELAS.items()}
+
+
+def invalidar(nome: Optional[str] = None) -> None:
+    """Descarta a carga de uma tabela (ou de todas) neste processo: o próximo
+    acesso recarrega."""
+    for tabela in TABELAS.values() if nome is None else (TABELAS[nome],):
+        tabela.invalidar()
+
+
+def publicar_invalidacao(nome: Optional[str] = None, cursor=None) -> None:
+    """Invalida uma tabela (ou todas) em todos os processos: incrementa a
+    versão publicada em `rollup_controle` e descarta a carga local."""
+    nomes = list(TABELAS) if nome is None else [nome]
+    if cursor is None:
+        from .DAO import get_cursor
+
+        with get_cursor() as cur:
+            publicar_invalidacao(nome, cur)
+        return
+    cursor.executemany(_SQL_PUBLICAR, [{'nome': f'referencia_{n}'} for n in nomes])
+    cursor.connection.commit()
+    _versoes.expirar()
+    invalidar(nome)
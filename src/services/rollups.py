@@ -0,0 +1,267 @@
+"""
+rollups.py
+
+Agregados (rollups) dos dashboards corporativos e o job que os consolida.
+
+Tabelas (criadas por `DAO.init_table`):
+    - rollup_bem_estar_dia:   somas e contagem de estresse/motivação/sono por
+      empresa e dia;
+    - rollup_trilha_empresa:  usuários por empresa e trilha;
+    - rollup_delta_bem_estar / rollup_delta_trilhas: variações ainda não
+      consolidadas, gravadas por triggers em `bem_estar`, `usuario_trilha` e
+      `usuarios` na mesma transação que altera a tabela original (inclusões,
+      alterações, remoções e usuários que mudam de empresa);
+    - rollup_controle:        linhas 'bem_estar' e 'usuario_trilha', com
+      `atualizado_em` preenchido depois da primeira agregação completa.
+
+As consultas somam, em um único comando, o rollup e as variações pendentes da
+empresa. Como toda alteração confirmada na tabela original é confirmada junto
+com a sua variação, e o job consolida e remove as variações na mesma
+transação, o resultado é sempre igual ao da consulta completa. Antes da
+primeira agregação (ou após `init_table` migrar um esquema antigo) o mesmo
+comando lê a tabela original.
+
+O job (`atualizar_rollups`, subcomando `refresh-rollups`) só consolida as
+variações pendentes nos rollups, mantendo pequena a parte lida a cada
+consulta; com `reconstruir` (ou na primeira execução) recalcula os rollups a
+partir das tabelas originais. Ele roda em uma transação SERIALIZABLE:
+variações confirmadas depois do seu início não são vistas nem removidas e
+ficam para a próxima execução.
+"""
+
+import logging
+import time
+from typing import Dict
+
+from .DAO import _connect
+from .exceptions import DatabaseError
+from .metricas import instrumentar
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# SQL usado pelas consultas
+# ---------------------------------------------------------------------------
+
+_PRONTO = """
+    (SELECT 1 FROM rollup_controle
+      WHERE nome = '{nome}' AND atualizado_em IS NOT NULL)"""
+
+_BEM_ESTAR_PRONTO = _PRONTO.format(nome='bem_estar')
+_TRILHAS_PRONTO = _PRONTO.format(nome='usuario_trilha')
+
+SQL_MEDIA_BEM_ESTAR = f"""
+    SELECT
+        ROUND(SUM(x.estresse) / NULLIF(SUM(x.registros), 0), 2) AS media_estresse,
+        ROUND(SUM(x.motivacao) / NULLIF(SUM(x.registros), 0), 2) AS media_motivacao,
+        ROUND(SUM(x.sono) / NULLIF(SUM(x.registros), 0), 2) AS media_sono
+    FROM (
+        SELECT r.soma_estresse AS estresse, r.soma_motivacao AS motivacao,
+               r.soma_sono AS sono, r.registros
+        FROM rollup_bem_estar_dia r
+        WHERE r.id_empresa = :id_empresa AND EXISTS {_BEM_ESTAR_PRONTO}
+        UNION ALL
+        SELECT d.d_estresse, d.d_motivacao, d.d_sono, d.d_registros
+        FROM rollup_delta_bem_estar d
+        WHERE d.id_empresa = :id_empresa AND EXISTS {_BEM_ESTAR_PRONTO}
+        UNION ALL
+        SELECT b.nivel_estresse, b.nivel_motivacao, b.qualidade_sono, 1
+        FROM bem_estar b
+        JOIN usuarios u ON u.id_usuario = b.id_usuario
+        WHERE u.id_empresa = :id_empresa AND NOT EXISTS {_BEM_ESTAR_PRONTO}
+    ) x
+"""
+
+SQL_TRILHAS_EMPRESA = f"""
+    SELECT t.nome_trilha, SUM(x.total) AS total_usuarios
+    FROM (
+        SELECT r.id_trilha, r.total_usuarios AS total
+        FROM rollup_trilha_empresa r
+        WHERE r.id_empresa = :id_empresa AND EXISTS {_TRILHAS_PRONTO}
+        UNION ALL
+        SELECT d.id_trilha, d.d_total
+        FROM rollup_delta_trilhas d
+        WHERE d.id_empresa = :id_empresa AND EXISTS {_TRILHAS_PRONTO}
+        UNION ALL
+        SELECT ut.id_trilha, 1
+        FROM usuario_trilha ut
+        JOIN usuarios u ON u.id_usuario = ut.id_usuario
+        WHERE u.id_empresa = :id_empresa AND NOT EXISTS {_TRILHAS_PRONTO}
+    ) x
+    JOIN trilhas t ON t.id_trilha = x.id_trilha
+    GROUP BY t.nome_trilha
+    HAVING SUM(x.total) > 0
+    ORDER BY total_usuarios DESC, t.nome_trilha
+"""
+
+# Versão por várias empresas: `{filtro}` é aplicado a `id_empresa`
+SQL_MEDIA_BEM_ESTAR_EMPRESAS = f"""
+    SELECT
+        x.id_empresa,
+        ROUND(SUM(x.estresse) / NULLIF(SUM(x.registros), 0), 2) AS media_estresse,
+        ROUND(SUM(x.motivacao) / NULLIF(SUM(x.registros), 0), 2) AS media_motivacao,
+        ROUND(SUM(x.sono) / NULLIF(SUM(x.registros), 0), 2) AS media_sono
+    FROM (
+        SELECT r.id_empresa, r.soma_estresse AS estresse,
+               r.soma_motivacao AS motivacao, r.soma_sono AS sono, r.registros
+        FROM rollup_bem_estar_dia r
+        WHERE r.id_empresa {{filtro}} AND EXISTS {_BEM_ESTAR_PRONTO}
+        UNION ALL
+        SELECT d.id_empresa, d.d_estresse, d.d_motivacao, d.d_sono, d.d_registros
+        FROM rollup_delta_bem_estar d
+        WHERE d.id_empresa {{filtro}} AND EXISTS {_BEM_ESTAR_PRONTO}
+        UNION ALL
+        SELECT u.id_empresa, b.nivel_estresse, b.nivel_motivacao, b.qualidade_sono, 1
+        FROM bem_estar b
+        JOIN usuarios u ON u.id_usuario = b.id_usuario
+        WHERE u.id_empresa {{filtro}} AND NOT EXISTS {_BEM_ESTAR_PRONTO}
+    ) x
+    GROUP BY x.id_empresa
+    HAVING SUM(x.registros) > 0
+"""
+
+
+# ---------------------------------------------------------------------------
+# Job de consolidação
+# ---------------------------------------------------------------------------
+
+_RECALCULAR_BEM_ESTAR = """
+    INSERT INTO rollup_bem_estar_dia
+        (id_empresa, dia, soma_estresse, soma_motivacao, soma_sono, registros)
+    SELECT u.id_empresa, TRUNC(b.data_registro),
+           SUM(b.nivel_estresse), SUM(b.nivel_motivacao), SUM(b.qualidade_sono),
+           COUNT(*)
+    FROM bem_estar b
+    JOIN usuarios u ON u.id_usuario = b.id_usuario
+    WHERE u.id_empresa IS NOT NULL
+    GROUP BY u.id_empresa, TRUNC(b.data_registro)
+"""
+
+_RECALCULAR_TRILHAS = """
+    INSERT INTO rollup_trilha_empresa (id_empresa, id_trilha, total_usuarios)
+    SELECT u.id_empresa, ut.id_trilha, COUNT(*)
+    FROM usuario_trilha ut
+    JOIN usuarios u ON u.id_usuario = ut.id_usuario
+    WHERE u.id_empresa IS NOT NULL
+    GROUP BY u.id_empresa, ut.id_trilha
+"""
+
+_CONSOLIDAR_BEM_ESTAR = """
+    MERGE INTO rollup_bem_estar_dia r
+    USING (
+        SELECT id_empresa, dia,
+               SUM(d_estresse) AS d_estresse, SUM(d_motivacao) AS d_motivacao,
+               SUM(d_sono) AS d_sono, SUM(d_registros) AS d_registros
+        FROM rollup_delta_bem_estar
+        WHERE id_delta <= :ate
+        GROUP BY id_empresa, dia
+    ) d ON (r.id_empresa = d.id_empresa AND r.dia = d.dia)
+    WHEN MATCHED THEN UPDATE SET
+        r.soma_estresse = r.soma_estresse + d.d_estresse,
+        r.soma_motivacao = r.soma_motivacao + d.d_motivacao,
+        r.soma_sono = r.soma_sono + d.d_sono,
+        r.registros = r.registros + d.d_registros
+    WHEN NOT MATCHED THEN INSERT
+        (id_empresa, dia, soma_estresse, soma_motivacao, soma_sono, registros)
+    VALUES
+        (d.id_empresa, d.dia, d.d_estresse, d.d_motivacao, d.d_sono, d.d_registros)
+"""
+
+_CONSOLIDAR_TRILHAS = """
+    MERGE INTO rollup_trilha_empresa r
+    USING (
+        SELECT id_empresa, id_trilha, SUM(d_total) AS d_total
+        FROM rollup_delta_trilhas
+        WHERE id_delta <= :ate
+        GROUP BY id_empresa, id_trilha
+    ) d ON (r.id_empresa = d.id_empresa AND r.id_trilha = d.id_trilha)
+    WHEN MATCHED THEN UPDATE SET r.total_usuarios = r.total_usuarios + d.d_total
+    WHEN NOT MATCHED THEN INSERT (id_empresa, id_trilha, total_usuarios)
+    VALUES (d.id_empresa, d.id_trilha, d.d_total)
+"""
+
+# (tabela do rollup, coluna de contagem, tabela de variações, recalcular, consolidar)
+_ROLLUPS = {
+    'bem_estar': (
+        'rollup_bem_estar_dia',
+        'registros',
+        'rollup_delta_bem_estar',
+        _RECALCULAR_BEM_ESTAR,
+        _CONSOLIDAR_BEM_ESTAR,
+    ),
+    'usuario_trilha': (
+        'rollup_trilha_empresa',
+        'total_usuarios',
+        'rollup_delta_trilhas',
+        _RECALCULAR_TRILHAS,
+        _CONSOLIDAR_TRILHAS,
+    ),
+}
+
+
+@instrumentar('rollups.atualizar_rollups')
+def atualizar_rollups(conn_info: Dict = None, reconstruir: bool = False) -> Dict:
+    """Consolida as variações pendentes nos rollups (ou recalcula tudo).
+
+    Roda em uma transação SERIALIZABLE com as linhas de controle travadas (um
+    job por vez). Retorna um resumo da execução.
+    """
+    inicio = time.perf_counter()
+    conn = _connect(conn_info)
+    cur = conn.cursor()
+    try:
+        cur.execute('SET TRANSACTION ISOLATION LEVEL SERIALIZABLE')
+        cur.execute(
+            """
+            SELECT nome, atualizado_em FROM rollup_controle
+            WHERE nome IN ('bem_estar', 'usuario_trilha')
+            FOR UPDATE
+            """
+        )
+        controle = dict(cur.fetchall())
+        if set(controle) != set(_ROLLUPS):
+            raise DatabaseError('rollup_controle incompleto; execute init_table')
+
+        resumo = {}
+        for nome, (tabela, contagem, variacoes, recalcular, consolidar) in _ROLLUPS.items():
+            cur.execute(f'SELECT MAX(id_delta), COUNT(*) FROM {variacoes}')
+            ate, pendentes = cur.fetchone()
+            recalculado = reconstruir or controle[nome] is None
+            if recalculado:
+                # O instantâneo da transação inclui as variações visíveis: elas
+                # já estão nas tabelas originais lidas aqui
+                logger.info(f'Recalculando {tabela} a partir das tabelas originais.')
+                cur.execute(f'DELETE FROM {tabela}')
+                cur.execute(recalcular)
+                cur.execute(f'DELETE FROM {variacoes}')
+            elif pendentes:
+                cur.execute(consolidar, {'ate': ate})
+                cur.execute(f'DELETE FROM {variacoes} WHERE id_delta <= :ate', {'ate': ate})
+                cur.execute(f'DELETE FROM {tabela} WHERE {contagem} = 0')
+            cur.execute(
+                """
+                UPDATE rollup_controle SET atualizado_em = SYSTIMESTAMP
+                WHERE nome = :nome
+                """,
+                {'nome': nome},
+            )
+            resumo[nome] = {'recalculado': recalculado, 'variacoes': pendentes}
+
+        conn.commit()
+        resumo['duracao_s'] = round(time.perf_counter() - inicio, 3)
+        logger.info(
+            f'Rollups atualizados: {resumo["bem_estar"]["variacoes"]} variação(ões) '
+            f'de bem_estar, {resumo["usuario_trilha"]["variacoes"]} de '
+            f'usuario_trilha em {resumo["duracao_s"]}s.'
+        )
+        return resumo
+    except DatabaseError:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        logger.error(f'Erro ao atualizar rollups: {e}')
+        raise DatabaseError('Erro ao atualizar rollups') from e
+    finally:
+        cur.close()
+        conn.close()
@@ -0,0 +1,228 @@
+"""
+row_factory.py
+
+Camada única de conversão de linhas do banco para objetos Python.
+
+A conversão de tipos acontece no driver (`outputtypehandler`): datas e
+timestamps já chegam como strings ISO 8601 e NUMBER com escala definida chega
+como int/float. A montagem de cada linha usa `cursor.rowfactory`, com a lista
+de colunas calculada uma única vez por comando SQL.
+
+Modos de saída:
+    - 'dict':   {coluna: valor}            (padrão, pronto para JSON)
+    - 'tuple':  tuplas na ordem do SELECT
+    - 'record': namedtuple por comando SQL (compacto, acesso por atributo)
+    - uma classe/callable: chamada com os valores da linha, na ordem do
+      SELECT (ex: `src.models.registros.Usuario`)
+"""
+
+import time
+from collections import namedtuple
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import oracledb
+except ImportError:
+    oracledb = None
+
+from . import metricas
+from .disjuntor import disjuntor, registrar_erro_execucao
+
+MODO_DICT = 'dict'
+MODO_TUPLA = 'tuple'
+MODO_REGISTRO = 'record'
+
+_MAX_COMANDOS = 256
+
+# SQL -> (colunas, classe de registro)
+_colunas_por_comando: Dict[str, Tuple[Tuple[str, ...], Any]] = {}
+
+if oracledb is not None:
+    _TIPOS_DATA = (
+        oracledb.DB_TYPE_DATE,
+        oracledb.DB_TYPE_TIMESTAMP,
+        oracledb.DB_TYPE_TIMESTAMP_TZ,
+        oracledb.DB_TYPE_TIMESTAMP_LTZ,
+    )
+else:
+    _TIPOS_DATA = ()
+
+
+def _iso(valor) -> str:
+    return valor.isoformat()
+
+
+def output_type_handler(cursor, metadata):
+    """Converte tipos na camada do driver (datas -> ISO, NUMBER -> int/float)."""
+    tipo = metadata.type_code
+    if tipo in _TIPOS_DATA:
+        return cursor.var(tipo, arraysize=cursor.arraysize, outconverter=_iso)
+    if tipo == oracledb.DB_TYPE_NUMBER:
+        # NUMBER sem precisão/escala (COUNT, AVG...) mantém a conversão padrão
+        # do driver, que já devolve int para inteiros e float para os demais.
+        if metadata.scale == 0 and metadata.precision:
+            return cursor.var(int, arraysize=cursor.arraysize)
+        if metadata.scale and metadata.scale > 0:
+            return cursor.var(float, arraysize=cursor.arraysize)
+    return None
+
+
+def _colunas(cursor) -> Tuple[Tuple[str, ...], Any]:
+    """Retorna (colunas em minúsculas, classe de registro) do comando executado."""
+    chave = cursor.statement
+    cached = _colunas_por_comando.get(chave)
+    if cached is None:
+        colunas = tuple(c[0].lower() for c in cursor.description)
+        cached = (colunas, None)
+        if len(_colunas_por_comando) >= _MAX_COMANDOS:
+            _colunas_por_comando.clear()
+        _colunas_por_comando[chave] = cached
+    return cached
+
+
+def _classe_registro(cursor):
+    colunas, classe = _colunas(cursor)
+    if classe is None:
+        classe = namedtuple('Registro', colunas, rename=True)
+        _colunas_por_comando[cursor.statement] = (colunas, classe)
+    return classe
+
+
+def aplicar(cursor, modo=MODO_DICT) -> None:
+    """Define `cursor.rowfactory` para o comando já executado no cursor."""
+    if callable(modo):
+        cursor.rowfactory = modo
+    elif modo == MODO_TUPLA:
+        cursor.rowfactory = None
+    elif modo == MODO_REGISTRO:
+        cursor.rowfactory = _classe_registro(cursor)
+    else:
+        colunas = _colunas(cursor)[0]
+        cursor.rowfactory = lambda *linha: dict(zip(colunas, linha))
+
+
+def _executar(cursor, sql: str, params, modo, converter: bool = True) -> None:
+    cursor.outputtypehandler = output_type_handler if converter else None
+    try:
+        if params is None:
+            cursor.execute(sql)
+        else:
+            cursor.execute(sql, params)
+    except Exception as e:
+        registrar_erro_execucao(e)
+        raise
+    disjuntor.sucesso()
+    aplicar(cursor, modo)
+
+
+def _restaurar(cursor) -> None:
+    cursor.outputtypehandler = None
+    cursor.rowfactory = None
+
+
+def consultar(cursor, sql: str, params=None, modo=MODO_DICT) -> List[Any]:
+    """Executa o SELECT e retorna todas as linhas no modo pedido."""
+    inicio = time.perf_counter()
+    executado = inicio
+    linhas = []
+    try:
+        _executar(cursor, sql, params, modo)
+        executado = time.perf_counter()
+        if cursor.description is not None:
+            linhas = cursor.fetchall()
+        return linhas
+    finally:
+        _restaurar(cursor)
+        fim = time.perf_counter()
+        metricas.registrar_sql(sql, params, fim - inicio, len(linhas), fim - executado)
+
+
+def iterar_lotes(
+    cursor,
+    sql: str,
+    params=None,
+    modo=MODO_TUPLA,
+    converter: bool = False,
+    arraysize: Optional[int] = None,
+) -> Iterator[List[Any]]:
+    """Executa o SELECT e produz as linhas em listas de até `arraysize` linhas.
+
+    Para quem converte cada lote de uma vez (ex: arrays NumPy por colunas), sem
+    tocar nas linhas uma a uma em Python.
+    """
+    inicio = time.perf_counter()
+    executado = inicio
+    total = 0
+    arraysize_anterior = cursor.arraysize
+    if arraysize:
+        cursor.arraysize = arraysize
+    try:
+        _executar(cursor, sql, params, modo, converter)
+        executado = time.perf_counter()
+        if cursor.description is None:
+            return
+        while True:
+            linhas = cursor.fetchmany()
+            if not linhas:
+                return
+            total += len(linhas)
+            yield linhas
+    finally:
+        _restaurar(cursor)
+        cursor.arraysize = arraysize_anterior
+        fim = time.perf_counter()
+        metricas.registrar_sql(sql, params, fim - inicio, total, fim - executado)
+
+
+def iterar(
+    cursor, sql: str, params=None, modo=MODO_TUPLA, converter: bool = False
+) -> Iterator[Any]:
+    """Executa o SELECT e produz as linhas em lotes de `cursor.arraysize`.
+
+    Por padrão mantém os tipos nativos do driver (datetime etc.), para quem
+    monta estruturas compactas sem passar por dicts.
+    """
+    for linhas in iterar_lotes(cursor, sql, params, modo, converter):
+        yield from linhas
+
+
+def consultar_um(cursor, sql: str, params=None, modo=MODO_DICT) -> Optional[Any]:
+    """Executa o SELECT e retorna a primeira linha (ou None)."""
+    inicio = time.perf_counter()
+    executado = inicio
+    linha = None
+    try:
+        _executar(cursor, sql, params, modo)
+        executado = time.perf_counter()
+        if cursor.description is not None:
+            linha = cursor.fetchone()
+        return linha
+    finally:
+        _restaurar(cursor)
+        fim = time.perf_counter()
+        metricas.registrar_sql(
+            sql, params, fim - inicio, 0 if linha is None else 1, fim - executado
+        )
+
+
+def _valor_iso(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def fetch_dicts(cursor) -> List[Dict[str, Any]]:
+    """Converte o resultado de um cursor já executado em lista de dicts.
+
+    Para cursores executados sem `consultar` (sem o type handler), as datas
+    são convertidas para ISO na própria row factory.
+    """
+    if not cursor.description:
+        return []
+    colunas = _colunas(cursor)[0]
+    cursor.rowfactory = lambda *linha: dict(zip(colunas, map(_valor_iso, linha)))
+    try:
+        return cursor.fetchall()
+    finally:
+        cursor.rowfactory = None
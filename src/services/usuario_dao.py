@@ -4,32 +4,19 @@ Operações de persistência para a entidade `usuarios`.
 
 import logging
 from datetime import date, datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Union
+
+from src.models.registros import Usuario
 
 from .DAO import _connect
 from .exceptions import DatabaseError
+from .metricas import instrumentar
+from .row_factory import MODO_DICT, consultar, consultar_um, iterar
 
 logger = logging.getLogger(__name__)
 
 
-def _rows_to_dicts(cursor) -> List[Dict]:
-    cols = [c[0].lower() for c in cursor.description]
-    rows = cursor.fetchall()
-    results: List[Dict] = []
-    for r in rows:
-        d: Dict = {}
-        for k, v in zip(cols, r):
-            if isinstance(v, (date, datetime)):
-                try:
-                    d[k] = v.isoformat()
-                except Exception:
-                    d[k] = str(v)
-            else:
-                d[k] = v
-        results.append(d)
-    return results
-
-
+@instrumentar('usuario_dao.insert_usuario')
 def insert_usuario(usuario: Dict, conn_info: Dict = None) -> int:
     if not usuario.get('nome_completo'):
         raise ValueError('nome_completo é obrigatório')
@@ -137,11 +124,13 @@ def insert_usuario(usuario: Dict, conn_info: Dict = None) -> int:
         conn.close()
 
 
+@instrumentar('usuario_dao.get_usuario_por_id')
 def get_usuario_por_id(id_usuario: int, conn_info: Dict = None) -> Optional[Dict]:
     conn = _connect(conn_info)
     cur = conn.cursor()
     try:
-        cur.execute(
+        return consultar_um(
+            cur,
             """
             SELECT id_usuario, id_empresa, nome_completo, email, senha_hash,
                    nivel_carreira, ocupacao, genero, data_nascimento,
@@ -152,8 +141,6 @@ def get_usuario_por_id(id_usuario: int, conn_info: Dict = None) -> Optional[Dict
             """,
             (id_usuario,),
         )
-        rows = _rows_to_dicts(cur)
-        return rows[0] if rows else None
     except Exception as e:
         logger.error(f'Erro ao consultar usuário {id_usuario}: {e}')
         raise DatabaseError('Erro ao consultar usuário') from e
@@ -162,21 +149,42 @@ def get_usuario_por_id(id_usuario: int, conn_info: Dict = None) -> Optional[Dict
         conn.close()
 
 
-def list_usuarios(conn_info: Dict = None) -> List[Dict]:
+_SQL_LISTAR = """
+    SELECT id_usuario, id_empresa, nome_completo, email, senha_hash,
+           nivel_carreira, ocupacao, genero, data_nascimento,
+           TO_CHAR(data_cadastro, 'YYYY-MM-DD"T"HH24:MI:SS') AS data_cadastro,
+           is_admin
+    FROM usuarios
+    ORDER BY id_usuario
+"""
+
+
+@instrumentar('usuario_dao.list_usuarios')
+def list_usuarios(
+    conn_info: Dict = None, compacto: bool = False
+) -> Union[List[Dict], List[Usuario]]:
+    """Lista usuários; com `compacto=True` retorna registros `Usuario` (__slots__)."""
     conn = _connect(conn_info)
     cur = conn.cursor()
     try:
-        cur.execute(
-            """
-            SELECT id_usuario, id_empresa, nome_completo, email, senha_hash,
-                   nivel_carreira, ocupacao, genero, data_nascimento,
-                       TO_CHAR(data_cadastro, 'YYYY-MM-DD"T"HH24:MI:SS') AS data_cadastro,
-                   is_admin
-            FROM usuarios
-            ORDER BY id_usuario
-            """
-        )
-        return _rows_to_dicts(cur)
+        return consultar(cur, _SQL_LISTAR, modo=Usuario if compacto else MODO_DICT)
+    except Exception as e:
+        logger.error(f'Erro ao listar usuários: {e}')
+        raise DatabaseError('Erro ao listar usuários') from e
+    finally:
+        cur.close()
+        conn.close()
+
+
+def iterar_usuarios(conn_info: Dict = None) -> Iterator[Usuario]:
+    """Produz os usuários como registros `Usuario`, lidos em lotes do cursor.
+
+    Para listagens e exportações grandes: só um lote fica em memória.
+    """
+    conn = _connect(conn_info)
+    cur = conn.cursor()
+    try:
+        yield from iterar(cur, _SQL_LISTAR, modo=Usuario, converter=True)
     except Exception as e:
         logger.error(f'Erro ao listar usuários: {e}')
         raise DatabaseError('Erro ao listar usuários') from e
@@ -185,6 +193,7 @@ def list_usuarios(conn_info: Dict = None) -> List[Dict]:
         conn.close()
 
 
+@instrumentar('usuario_dao.update_usuario')
 def update_usuario(id_usuario: int, usuario: Dict, conn_info: Dict = None) -> None:
     if not usuario.get('nivel_carreira'):
         usuario['nivel_carreira'] = 'Não especificado'
@@ -256,6 +265,7 @@ def update_usuario(id_usuario: int, usuario: Dict, conn_info: Dict = None) -> No
         conn.close()
 
 
+@instrumentar('usuario_dao.delete_usuario')
 def delete_usuario(id_usuario: int, conn_info: Dict = None) -> None:
     conn = _connect(conn_info)
     cur = conn.cursor()
@@ -275,6 +285,7 @@ def delete_usuario(id_usuario: int, conn_info: Dict = None) -> None:
         conn.close()
 
 
+@instrumentar('usuario_dao.email_existe')
 def email_existe(email: str, exclude_id: int = None, conn_info: Dict = None) -> bool:
     conn = _connect(conn_info)
     cur = conn.cursor()
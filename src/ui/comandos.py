@@ -0,0 +1,329 @@
+"""
+comandos.py
+
+Subcomandos não interativos da CLI (uso em scripts e cron).
+
+Exemplos:
+    python src/main.py list-users --format ndjson
+    python src/main.py export usuarios --output usuarios.json
+    python src/main.py import funcionarios.csv --report rejeitados.csv
+    python src/main.py report company --id 3
+    python src/main.py warm-cache
+    python src/main.py refresh-rollups
+    python src/main.py scan-alerts
+    python src/main.py detect-anomalies --workers 4
+    python src/main.py generate-thumbs --entidade cursos
+
+Os comandos não exibem menus nem executam `init_table`, e todas as chamadas
+ao banco de um mesmo comando reutilizam uma única conexão.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import sys
+import textwrap
+import time
+
+from src.services import DAO as db
+from src.services import (
+    alertas,
+    anomalias,
+    consultas,
+    importador,
+    miniaturas,
+    referencia,
+    rollups,
+    usuario_dao,
+)
+from src.utils.db_utils import format_usuario_display
+
+# Códigos de saída
+EXIT_OK = 0
+EXIT_ERRO = 1
+EXIT_USO = 2
+
+
+def _json_serializer(obj):
+    """Serializador JSON para registros compactos e objetos datetime."""
+    if hasattr(obj, 'to_json'):
+        return obj.to_json()
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _abrir_saida(caminho):
+    if not caminho or caminho == '-':
+        return sys.stdout
+    return open(caminho, 'w', encoding='utf-8')
+
+
+def _escrever(dados, formato, caminho) -> int:
+    """Escreve os itens em JSON (array) ou NDJSON (um objeto por linha).
+
+    Os itens são escritos à medida que `dados` é percorrido (aceita geradores).
+    Retorna quantos foram escritos.
+    """
+    saida = _abrir_saida(caminho)
+    total = 0
+    try:
+        for item in dados:
+            texto = json.dumps(
+                item,
+                ensure_ascii=False,
+                indent=None if formato == 'ndjson' else 2,
+                default=_json_serializer,
+            )
+            if formato == 'ndjson':
+                saida.write(texto)
+                saida.write('\n')
+            else:
+                # Mesma saída de json.dump(lista, indent=2), item a item
+                saida.write('[\n' if total == 0 else ',\n')
+                saida.write(textwrap.indent(texto, '  '))
+            total += 1
+        if formato != 'ndjson':
+            saida.write('\n]\n' if total else '[]\n')
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+    return total
+
+
+def _dashboard_empresa(cursor, id_empresa: int):
+    return {
+        'id_empresa': id_empresa,
+        'nivel_carreira': consultas.consulta_distribuicao_nivel_carreira(
+            cursor, id_empresa
+        ),
+        'bem_estar': consultas.consulta_media_bem_estar_empresa(cursor, id_empresa),
+        'trilhas': consultas.consulta_trilhas_mais_utilizadas_empresa(
+            cursor, id_empresa
+        ),
+        'baixa_motivacao': consultas.consulta_funcionarios_baixa_motivacao(
+            cursor, id_empresa
+        ),
+    }
+
+
+def _dashboard_usuario(cursor, id_user: int):
+    return {
+        'id_usuario': id_user,
+        'bem_estar': consultas.consulta_bem_estar_user(cursor, id_user),
+        'trilhas': consultas.consulta_progresso_trilhas_user(cursor, id_user),
+        'recomendacoes': consultas.consulta_recomendacoes_user(cursor, id_user),
+    }
+
+
+# ============================================================================
+# COMANDOS
+# ============================================================================
+
+
+def cmd_list_users(args) -> int:
+    usuarios = usuario_dao.iterar_usuarios()
+    if args.format == 'table':
+        for usuario in usuarios:
+            print(format_usuario_display(usuario))
+        return EXIT_OK
+    _escrever(usuarios, args.format, args.output)
+    return EXIT_OK
+
+
+def cmd_export(args) -> int:
+    if args.entidade == 'usuarios':
+        total = _escrever(usuario_dao.iterar_usuarios(), args.format, args.output)
+    else:
+        with db.get_cursor() as cursor:
+            dados = consultas.consulta_empresas_com_contagem(cursor)
+        total = _escrever(dados, args.format, args.output)
+    logging.info(f'{total} registro(s) exportado(s) ({args.entidade}).')
+    return EXIT_OK
+
+
+def cmd_import(args) -> int:
+    contagem = importador.importar_usuarios(
+        args.arquivo,
+        relatorio=args.report,
+        tamanho_lote=args.batch_size,
+        processos=args.workers,
+    )
+    logging.info(
+        f'Importação concluída: {contagem["inseridas"]} inserido(s), '
+        f'{contagem["rejeitadas"]} rejeitado(s) de {contagem["lidas"]}.'
+    )
+    return EXIT_OK if contagem['rejeitadas'] == 0 else EXIT_ERRO
+
+
+def cmd_report(args) -> int:
+    with db.get_cursor() as cursor:
+        if args.alvo == 'company':
+            dados = _dashboard_empresa(cursor, args.id)
+        else:
+            dados = _dashboard_usuario(cursor, args.id)
+    _escrever(dados, 'json', args.output)
+    return EXIT_OK
+
+
+def cmd_warm_cache(args) -> int:
+    """Executa as consultas dos dashboards corporativos para aquecer o banco."""
+    inicio = time.perf_counter()
+    with db.get_cursor() as cursor:
+        ids = args.ids or list(referencia.empresas.nomes(cursor))
+        for id_empresa in ids:
+            _dashboard_empresa(cursor, id_empresa)
+    logging.info(
+        f'Dashboards de {len(ids)} empresa(s) aquecidos em '
+        f'{time.perf_counter() - inicio:.2f}s.'
+    )
+    return EXIT_OK
+
+
+def cmd_refresh_rollups(args) -> int:
+    """Atualiza (ou reconstrói) os rollups dos dashboards corporativos."""
+    resumo = rollups.atualizar_rollups(reconstruir=args.rebuild)
+    _escrever(resumo, 'json', None)
+    return EXIT_OK
+
+
+def cmd_scan_alerts(args) -> int:
+    """Emite os alertas de baixa motivação ainda não emitidos."""
+    resumo = alertas.varrer_alertas(reconstruir=args.rebuild)
+    if args.format == 'ndjson':
+        _escrever(resumo['alertas'], 'ndjson', args.output)
+    else:
+        _escrever(resumo, 'json', args.output)
+    return EXIT_OK
+
+
+def cmd_detect_anomalies(args) -> int:
+    """Atualiza as linhas de base de bem-estar e registra as anomalias."""
+    resumo = anomalias.detectar_anomalias(
+        ids=args.ids or None, processos=args.workers, reconstruir=args.rebuild
+    )
+    _escrever(resumo, 'json', None)
+    return EXIT_OK if resumo['falhas'] == 0 else EXIT_ERRO
+
+
+def cmd_generate_thumbs(args) -> int:
+    """Gera as miniaturas pendentes das imagens de trilhas e cursos."""
+    resumo = miniaturas.gerar_miniaturas(
+        entidades=args.entidade or None, processos=args.workers, forcar=args.force
+    )
+    _escrever(resumo, 'json', None)
+    return EXIT_OK
+
+
+# ============================================================================
+# PARSER
+# ============================================================================
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='main.py', description='Comandos em lote do sistema UpPath.'
+    )
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p = sub.add_parser('list-users', help='Lista usuários')
+    p.add_argument(
+        '--format', choices=('table', 'json', 'ndjson'), default='table'
+    )
+    p.add_argument('--output', '-o', help='Arquivo de saída (padrão: stdout)')
+    p.set_defaults(func=cmd_list_users)
+
+    p = sub.add_parser('export', help='Exporta usuários ou empresas')
+    p.add_argument('entidade', choices=('usuarios', 'empresas'))
+    p.add_argument('--format', choices=('json', 'ndjson'), default='json')
+    p.add_argument('--output', '-o', help='Arquivo de saída (padrão: stdout)')
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('import', help='Importa usuários de um arquivo CSV/NDJSON')
+    p.add_argument('arquivo')
+    p.add_argument('--report', help='Arquivo CSV com os registros rejeitados')
+    p.add_argument('--batch-size', type=int, default=importador.TAMANHO_LOTE)
+    p.add_argument('--workers', type=int, help='Processos para hash de senhas')
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('report', help='Gera o dashboard de uma empresa ou usuário')
+    p.add_argument('alvo', choices=('company', 'user'))
+    p.add_argument('--id', type=int, required=True)
+    p.add_argument('--output', '-o', help='Arquivo de saída (padrão: stdout)')
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser(
+        'warm-cache', help='Executa as consultas dos dashboards corporativos'
+    )
+    p.add_argument('--ids', type=int, nargs='*', help='IDs de empresa (padrão: todas)')
+    p.set_defaults(func=cmd_warm_cache)
+
+    p = sub.add_parser(
+        'refresh-rollups', help='Atualiza os agregados dos dashboards corporativos'
+    )
+    p.add_argument(
+        '--rebuild', action='store_true', help='Reconstrói os agregados do zero'
+    )
+    p.set_defaults(func=cmd_refresh_rollups)
+
+    p = sub.add_parser(
+        'scan-alerts', help='Emite alertas de baixa motivação ainda não emitidos'
+    )
+    p.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Recalcula o estado atual a partir do histórico (sem alertas)',
+    )
+    p.add_argument(
+        '--format',
+        choices=('json', 'ndjson'),
+        default='json',
+        help='json: resumo completo; ndjson: um alerta por linha',
+    )
+    p.add_argument('--output', '-o', help='Arquivo de saída (padrão: stdout)')
+    p.set_defaults(func=cmd_scan_alerts)
+
+    p = sub.add_parser(
+        'detect-anomalies', help='Detecta anomalias de bem-estar por usuário'
+    )
+    p.add_argument('--ids', type=int, nargs='*', help='IDs de empresa (padrão: todas)')
+    p.add_argument('--workers', type=int, help='Processos (padrão: nº de CPUs)')
+    p.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Descarta linhas de base e anomalias e recalcula do zero',
+    )
+    p.set_defaults(func=cmd_detect_anomalies)
+
+    p = sub.add_parser(
+        'generate-thumbs', help='Gera as miniaturas das imagens de trilhas/cursos'
+    )
+    p.add_argument(
+        '--entidade',
+        choices=tuple(miniaturas.ENTIDADES),
+        nargs='*',
+        help='trilhas e/ou cursos (padrão: ambas)',
+    )
+    p.add_argument('--workers', type=int, help='Processos (padrão: nº de CPUs)')
+    p.add_argument(
+        '--force',
+        action='store_true',
+        help='Refaz todas as miniaturas, inclusive as já geradas',
+    )
+    p.set_defaults(func=cmd_generate_thumbs)
+
+    return parser
+
+
+def executar(argv) -> int:
+    """Executa um subcomando e retorna o código de saída."""
+    args = build_parser().parse_args(argv)
+    try:
+        with db.sessao():
+            return args.func(args)
+    except KeyboardInterrupt:
+        return EXIT_ERRO
+    except Exception as e:
+        logging.error(f'Erro ao executar "{args.comando}": {e}')
+        return EXIT_ERRO
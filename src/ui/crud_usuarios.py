@@ -1,5 +1,6 @@
 import hashlib
 
+from src.services import referencia
 from src.services import usuario_dao as db
 from src.services.exceptions import DatabaseError
 from src.utils.color_msg import ColorMsg
@@ -49,24 +50,17 @@ def criar_usuario():
         ColorMsg.print_title('CADASTRO DE NOVO USUÁRIO')
         ColorMsg.print_title('=' * 60)
 
-        # Listar empresas diretamente do banco
+        # Listar empresas cadastradas (cache de referência)
         try:
-            from src.services.DAO import _connect
-            conn = _connect()
-            cur = conn.cursor()
-            cur.execute("SELECT id_empresa, nome_empresa FROM empresas ORDER BY id_empresa")
-            empresas = cur.fetchall()
-            cur.close()
-            conn.close()
+            empresas = referencia.empresas.nomes()
         except Exception as e:
-            empresas = []
-            ColorMsg.print_error(f'Erro ao buscar empresas: {e}')
+            ColorMsg.print_error(f'✗ Erro ao listar empresas: {e}')
+            empresas = {}
 
         if empresas:
             ColorMsg.print_info('\nEmpresas disponíveis:')
-            for eid, nome in empresas:
+            for eid, nome in empresas.items():
                 ColorMsg.print_info(f'  {eid} - {nome}')
-            empresa_ids = [e[0] for e in empresas]
             while True:
                 id_empresa_str = ColorMsg.input_prompt('ID da empresa (opcional, Enter para pular): ').strip()
                 if not id_empresa_str:
@@ -76,7 +70,7 @@ def criar_usuario():
                 if id_empresa_error or id_empresa is None:
                     ColorMsg.print_error(f'✗ {id_empresa_error or "ID inválido"}')
                     continue
-                if id_empresa not in empresa_ids:
+                if id_empresa not in empresas:
                     ColorMsg.print_error('✗ ID de empresa inválido. Tente novamente ou pressione Enter para pular.')
                     continue
                 break
@@ -196,7 +190,7 @@ def listar_usuarios():
             ColorMsg.print_error('✗ Adaptador Oracle não disponível.')
             return
 
-        usuarios = db.list_usuarios()
+        usuarios = db.list_usuarios(compacto=True)
 
         if not usuarios:
             ColorMsg.print_warning('\n⚠ Nenhum usuário cadastrado.')
@@ -3,7 +3,7 @@ import json
 import os
 
 from src.services import DAO as db
-from src.services import consultas
+from src.services import consultas, referencia
 from src.utils.color_msg import ColorMsg
 from src.utils.validators import validate_id
 
@@ -162,11 +162,15 @@ def painel_corporativo():
         ColorMsg.print_menu('4 - Funcionários com baixa motivação (<5)')
         ColorMsg.print_menu('0 - Voltar')
         ColorMsg.print_menu('=' * 60)
-        # Mostrar empresas disponíveis antes de pedir o ID
-        empresas = db.list_empresas() if hasattr(db, 'list_empresas') else []
+        # Mostrar empresas disponíveis antes de pedir o ID (cache de referência)
+        try:
+            empresas = referencia.empresas.nomes()
+        except Exception as e:
+            ColorMsg.print_error(f'✗ Erro ao listar empresas: {e}')
+            empresas = {}
         if empresas:
             ColorMsg.print_info('\nEmpresas disponíveis:')
-            for eid, nome in empresas:
+            for eid, nome in empresas.items():
                 ColorMsg.print_info(f'  {eid} - {nome}')
         else:
             ColorMsg.print_warning('Nenhuma empresa cadastrada.')
@@ -8,6 +8,7 @@ from datetime import date, datetime
 from typing import Any, Dict, List, Optional
 
 from src.services import DAO as db
+from src.services.row_factory import fetch_dicts
 
 
 @contextmanager
@@ -71,26 +72,7 @@ def rows_to_dicts(cursor) -> List[Dict]:
     Returns:
         Lista de dicionários com chaves em lowercase
     """
-    if not cursor.description:
-        return []
-
-    cols = [c[0].lower() for c in cursor.description]
-    rows = cursor.fetchall()
-    results = []
-
-    for row in rows:
-        d = {}
-        for col, val in zip(cols, row):
-            if isinstance(val, (date, datetime)):
-                try:
-                    d[col] = val.isoformat()
-                except Exception:
-                    d[col] = str(val)
-            else:
-                d[col] = val
-        results.append(d)
-
-    return results
+    return fetch_dicts(cursor)
 
 
 def format_usuario_display(usuario: Dict) -> str:
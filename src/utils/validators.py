@@ -6,7 +6,7 @@ Módulo centralizado para validações reutilizáveis.
 
 import re
 from datetime import date, datetime
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 # Constantes de validação
 MAX_NOME_COMPLETO = 60
@@ -20,6 +20,9 @@ EMAIL_PATTERN = r'^[\w\.-]+@[\w\.-]+\.\w+$'
 DATE_FORMAT = '%d/%m/%Y'
 DATE_FORMAT_ISO = '%Y-%m-%d'
 
+# Padrões pré-compilados
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+
 
 class ValidationError(Exception):
     """Exceção personalizada para erros de validação."""
@@ -40,7 +43,7 @@ def validate_email(email: str) -> Tuple[Optional[str], Optional[str]]:
 
     if len(email) > MAX_EMAIL:
         return None, f'Email muito longo (máximo {MAX_EMAIL} caracteres)'
-    if not re.match(EMAIL_PATTERN, email):
+    if not EMAIL_RE.match(email):
         return None, 'Formato de email inválido'
     return email, None
 
@@ -84,24 +87,43 @@ def validate_date(
             return None, 'Data de nascimento é obrigatória'
         return None, None
 
-    s = date_str.strip()
-    dt = None
-    # Tenta formato BR primeiro
+    return _check_date(parse_date_fast(date_str.strip()), date.today())
+
+
+def parse_date_fast(s: str) -> Optional[date]:
+    """Converte `DD/MM/YYYY` ou `YYYY-MM-DD` em date; None se inválida.
+
+    Tenta primeiro um caminho rápido por fatiamento da string e só recorre a
+    `strptime` para variações aceitas por ele (ex: dia/mês sem zero à esquerda).
+    """
     try:
-        dt = datetime.strptime(s, DATE_FORMAT).date()
+        if len(s) == 10:
+            if s[2] == '/' and s[5] == '/':
+                d, m, y = s[0:2], s[3:5], s[6:10]
+            elif s[4] == '-' and s[7] == '-':
+                y, m, d = s[0:4], s[5:7], s[8:10]
+            else:
+                d = None
+            if d is not None and (d + m + y).isdigit():
+                return date(int(y), int(m), int(d))
     except ValueError:
-        pass
+        return None
 
-    if dt is None:
+    for fmt in (DATE_FORMAT, DATE_FORMAT_ISO):
         try:
-            dt = datetime.strptime(s, DATE_FORMAT_ISO).date()
+            return datetime.strptime(s, fmt).date()
         except ValueError:
-            return None, f'Data inválida. Use o formato {DATE_FORMAT} (ex: 31/12/1990)'
+            continue
+    return None
 
+
+def _check_date(dt: Optional[date], today: date) -> Tuple[Optional[date], Optional[str]]:
+    if dt is None:
+        return None, f'Data inválida. Use o formato {DATE_FORMAT} (ex: 31/12/1990)'
     # Validação de faixa
     if dt.year < 1900:
         return None, 'Ano de nascimento não pode ser anterior a 1900.'
-    if dt > date.today():
+    if dt > today:
         return None, 'Data de nascimento não pode ser no futuro.'
     return dt, None
 
@@ -123,6 +145,97 @@ def validate_id(
     return int(id_str), None
 
 
+# Campos de texto de usuários: (campo, rótulo, tamanho máximo, obrigatório)
+_CAMPOS_TEXTO_USUARIO = (
+    ('nome_completo', 'Nome completo', MAX_NOME_COMPLETO, True),
+    ('nivel_carreira', 'Nível de carreira', MAX_NIVEL_CARREIRA, False),
+    ('ocupacao', 'Ocupação', MAX_OCUPACAO, False),
+    ('genero', 'Gênero', MAX_GENERO, False),
+)
+_TRUE_VALUES = frozenset(('s', 'sim', 'yes', 'y', '1', 'true'))
+
+
+def validate_usuarios_batch(
+    rows: List[Dict[str, Any]],
+) -> List[Tuple[Dict[str, Any], List[str]]]:
+    """Valida um lote de usuários com as mesmas regras dos validadores escalares.
+
+    O lote é processado coluna a coluna (menos chamadas de função por linha),
+    com padrões pré-compilados e o caminho rápido de `parse_date_fast`.
+
+    Returns:
+        Para cada linha, (valores_normalizados, erros). Campos inválidos ficam
+        como None em valores_normalizados.
+    """
+    n = len(rows)
+    valores: List[Dict[str, Any]] = [{} for _ in range(n)]
+    erros: List[List[str]] = [[] for _ in range(n)]
+
+    def coluna(campo):
+        return [
+            '' if (v := row.get(campo)) is None else str(v).strip() for row in rows
+        ]
+
+    # Campos de texto
+    for campo, rotulo, maximo, obrigatorio in _CAMPOS_TEXTO_USUARIO:
+        msg_vazio = f'{rotulo} não pode ser vazio'
+        msg_longo = f'{rotulo} muito longo (máximo {maximo} caracteres)'
+        for i, v in enumerate(coluna(campo)):
+            if not v:
+                if obrigatorio:
+                    erros[i].append(msg_vazio)
+                    v = None
+                else:
+                    v = 'Não especificado'
+            elif len(v) > maximo:
+                erros[i].append(msg_longo)
+                v = None
+            valores[i][campo] = v
+
+    # Email
+    match = EMAIL_RE.match
+    msg_longo = f'Email muito longo (máximo {MAX_EMAIL} caracteres)'
+    for i, v in enumerate(coluna('email')):
+        if not v:
+            erros[i].append('Email não pode ser vazio')
+            v = None
+        elif len(v) > MAX_EMAIL:
+            erros[i].append(msg_longo)
+            v = None
+        elif not match(v):
+            erros[i].append('Formato de email inválido')
+            v = None
+        valores[i]['email'] = v
+
+    # Data de nascimento (obrigatória)
+    hoje = date.today()
+    for i, v in enumerate(coluna('data_nascimento')):
+        if not v:
+            dt, err = None, 'Data de nascimento é obrigatória'
+        else:
+            dt, err = _check_date(parse_date_fast(v), hoje)
+        if err:
+            erros[i].append(err)
+        valores[i]['data_nascimento'] = dt
+
+    # ID da empresa (opcional)
+    for i, v in enumerate(coluna('id_empresa')):
+        if not v:
+            v = None
+        elif v.isdigit():
+            v = int(v)
+        else:
+            erros[i].append('ID da empresa inválido (deve ser numérico)')
+            v = None
+        valores[i]['id_empresa'] = v
+
+    # Flag admin
+    for i, v in enumerate(coluna('is_admin')):
+        valores[i]['is_admin'] = 1 if v.lower() in _TRUE_VALUES else 0
+
+    return list(zip(valores, erros))
+
+
 def validate_boolean_input(input_str: str, default: bool = False) -> bool:
     """Valida entrada sim/não.
 
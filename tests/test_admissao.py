@@ -0,0 +1,172 @@
+"""Testes do portão de admissão (quotas por empresa e fila justa ponderada)."""
+
+import threading
+import time
+
+import pytest
+
+from src.api.admissao import Portao, Saturado
+
+
+def _portao(**kwargs):
+    opcoes = {'limite': 1, 'fila': 10, 'espera': 5.0, 'retry_after': 1}
+    opcoes.update(kwargs)
+    return Portao('teste', **opcoes)
+
+
+class _Fila:
+    """Enfileira requisições em threads e registra a ordem em que entram."""
+
+    def __init__(self, portao):
+        self.portao = portao
+        self.ordem = []
+        self.erros = []
+        self.threads = []
+
+    def _entrar(self, chave, rotulo):
+        try:
+            self.portao.entrar(chave)
+        except Saturado as e:
+            self.erros.append((rotulo, e.motivo))
+        else:
+            self.ordem.append(rotulo)
+
+    def enfileirar(self, chave, rotulo=None):
+        esperadas = self.portao.estado()['na_fila'] + 1
+        thread = threading.Thread(target=self._entrar, args=(chave, rotulo or chave))
+        thread.start()
+        self.threads.append(thread)
+        self._aguardar(lambda: self.portao.estado()['na_fila'] == esperadas)
+
+    def _aguardar(self, condicao):
+        limite = time.monotonic() + 2
+        while not condicao():
+            assert time.monotonic() < limite, 'tempo esgotado'
+            time.sleep(0.001)
+
+    def liberar(self, chave):
+        """Libera uma vaga de `chave` e espera a próxima requisição entrar."""
+        entradas = len(self.ordem)
+        self.portao.sair(chave)
+        self._aguardar(lambda: len(self.ordem) > entradas)
+
+    def encerrar(self):
+        for thread in self.threads:
+            thread.join(2)
+
+
+def test_entra_direto_com_vaga_livre():
+    portao = _portao(limite=2)
+    portao.entrar('a')
+    portao.entrar(None)
+    assert portao.estado() == {
+        'em_execucao': 2,
+        'na_fila': 0,
+        'aguardando': 0,
+        'por_chave': {'a': 1, None: 1},
+    }
+    portao.sair('a')
+    portao.sair(None)
+    assert portao.estado()['em_execucao'] == 0
+
+
+def test_fila_justa_intercala_empresas():
+    portao = _portao(quota=5)
+    portao.entrar('a')
+    fila = _Fila(portao)
+    fila.enfileirar('a', 'a1')
+    fila.enfileirar('a', 'a2')
+    fila.enfileirar('b', 'b1')
+
+    fila.liberar('a')
+    fila.liberar('a')
+    fila.liberar('b')
+    fila.encerrar()
+    # a2 termina (virtualmente) depois de b1, embora tenha chegado antes
+    assert fila.ordem == ['a1', 'b1', 'a2']
+
+
+def test_peso_maior_passa_na_frente():
+    portao = _portao(quota=5, pesos={'b': 4.0})
+    portao.entrar('a')
+    fila = _Fila(portao)
+    fila.enfileirar('a', 'a1')
+    fila.enfileirar('b', 'b1')
+    fila.enfileirar('b', 'b2')
+
+    fila.liberar('a')
+    fila.liberar('b')
+    fila.liberar('b')
+    fila.encerrar()
+    assert fila.ordem == ['b1', 'b2', 'a1']
+
+
+def test_quota_da_empresa_libera_vaga_para_outra():
+    portao = _portao(limite=2, quota=1)
+    portao.entrar('a')
+    fila = _Fila(portao)
+    # Há vaga global, mas 'a' já está na quota
+    fila.enfileirar('a', 'a2')
+    portao.entrar('b')
+    assert portao.estado()['por_chave'] == {'a': 1, 'b': 1}
+
+    fila.liberar('a')
+    fila.encerrar()
+    assert fila.ordem == ['a2']
+    assert portao.estado()['por_chave'] == {'a': 1, 'b': 1}
+
+
+def test_rejeita_empresa_com_muitas_requisicoes_na_fila():
+    portao = _portao(quota=1)
+    portao.entrar('a')
+    fila = _Fila(portao)
+    fila.enfileirar('a')
+    fila.enfileirar('a')
+    with pytest.raises(Saturado) as erro:
+        portao.entrar('a')
+    assert erro.value.motivo == 'cota_empresa'
+    fila.liberar('a')
+    fila.liberar('a')
+    fila.encerrar()
+
+
+def test_rejeita_com_fila_cheia():
+    portao = _portao(fila=1)
+    portao.entrar()
+    fila = _Fila(portao)
+    fila.enfileirar(None)
+    with pytest.raises(Saturado) as erro:
+        portao.entrar()
+    assert (erro.value.motivo, erro.value.retry_after) == ('fila_cheia', 1)
+    fila.liberar(None)
+    fila.encerrar()
+
+
+def test_esperas_fora_do_portao_ocupam_a_fila():
+    portao = _portao(fila=1)
+    portao.entrar()
+    portao.reservar_espera()
+    assert portao.estado()['aguardando'] == 1
+    with pytest.raises(Saturado) as erro:
+        portao.entrar()
+    assert erro.value.motivo == 'fila_cheia'
+    with pytest.raises(Saturado):
+        portao.reservar_espera()
+
+    portao.liberar_espera()
+    fila = _Fila(portao)
+    fila.enfileirar(None)
+    fila.liberar(None)
+    fila.encerrar()
+    assert fila.ordem == [None]
+
+
+def test_espera_esgotada_sai_da_fila():
+    portao = _portao(espera=0.01)
+    portao.entrar()
+    with pytest.raises(Saturado) as erro:
+        portao.entrar()
+    assert erro.value.motivo == 'espera'
+    assert portao.estado()['na_fila'] == 0
+    portao.sair()
+    portao.entrar()
@@ -0,0 +1,87 @@
+"""Testes das estatísticas de bem-estar calculadas com NumPy."""
+
+import statistics
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.services import analise_bem_estar
+
+SEGUNDA = date(2024, 1, 1)
+
+
+def _dia(d: date) -> int:
+    return (d - date(1970, 1, 1)).days
+
+
+# id_usuario, id_registro, dia, estresse, motivacao, sono
+REGISTROS = [
+    (1, 1, _dia(date(2024, 1, 1)), 2, 8, 7),
+    (1, 2, _dia(date(2024, 1, 7)), 9, 6, 6),  # domingo: ainda a 1ª semana
+    (2, 3, _dia(date(2024, 1, 8)), 4, 4, 5),
+    (2, 4, _dia(date(2024, 1, 8)), 5, 7, 2),  # mesmo dia, id maior: o mais recente
+    (3, 5, _dia(date(2024, 1, 22)), 3, 9, 9),  # 3ª semana sem registros antes
+    (1, 6, _dia(date(2024, 1, 3)), 6, 6, 6),  # fora de ordem, não é o mais recente
+]
+
+
+@pytest.fixture
+def resultado(monkeypatch):
+    dados = np.array(REGISTROS, dtype=np.int64)
+    monkeypatch.setattr(analise_bem_estar, '_carregar', lambda *args: dados)
+    return analise_bem_estar.analisar_bem_estar_empresa(None, 7, janela=2)
+
+
+def test_resumo_por_metrica(resultado):
+    assert resultado['registros'] == len(REGISTROS)
+    estresse = [r[3] for r in REGISTROS]
+    resumo = resultado['resumo']['estresse']
+    assert resumo['media'] == round(statistics.fmean(estresse), 2)
+    assert resumo['desvio_padrao'] == round(statistics.pstdev(estresse), 2)
+    assert resumo['percentis']['p50'] == statistics.median(estresse)
+    assert resumo['distribuicao'] == [estresse.count(n) for n in range(11)]
+
+
+def test_semanas_sem_lacunas_com_media_movel(resultado):
+    semanal = resultado['semanal']
+    assert [s['semana'] for s in semanal] == [
+        '2024-01-01',
+        '2024-01-08',
+        '2024-01-15',
+        '2024-01-22',
+    ]
+    assert [s['registros'] for s in semanal] == [3, 2, 0, 1]
+    assert semanal[0]['media_estresse'] == round((2 + 9 + 6) / 3, 2)
+    assert semanal[2]['media_estresse'] is None
+    # Média móvel de 2 semanas, ponderada pelos registros
+    assert semanal[1]['media_movel_estresse'] == round((2 + 9 + 6 + 4 + 5) / 5, 2)
+    assert semanal[2]['media_movel_estresse'] == round((4 + 5) / 2, 2)
+    assert semanal[3]['media_movel_sono'] == 9
+
+
+def test_risco_usa_o_registro_mais_recente_de_cada_funcionario(resultado):
+    # Mais recentes: usuário 1 -> registro 2 (estresse 9), usuário 2 ->
+    # registro 4 (sono 2), usuário 3 -> registro 5 (sem risco)
+    assert resultado['risco'] == {
+        'funcionarios': 3,
+        'em_risco': 2,
+        'percentual_em_risco': 66.67,
+        'por_criterio': {'estresse_alto': 1, 'motivacao_baixa': 0, 'sono_ruim': 1},
+    }
+
+
+def test_empresa_sem_registros(monkeypatch):
+    monkeypatch.setattr(
+        analise_bem_estar, '_carregar', lambda *args: np.empty((0, 6), dtype=np.int64)
+    )
+    resultado = analise_bem_estar.analisar_bem_estar_empresa(None, 7)
+    assert resultado['registros'] == 0
+    assert resultado['semanal'] == [] and resultado['risco'] is None
+
+
+def test_janela_invalida():
+    resultado = analise_bem_estar.analisar_bem_estar_empresa(
+        None, 7, janela=analise_bem_estar.MAX_JANELA + 1
+    )
+    assert 'error' in resultado
@@ -0,0 +1,241 @@
+"""Testes da detecção de anomalias (EWMA por usuário)."""
+
+import datetime
+
+import numpy as np
+import pytest
+
+from src.services import anomalias
+
+CONFIG = {'alpha': 0.5, 'limiar': 3.0, 'minimo': 2}
+INICIO = datetime.datetime(2024, 1, 1)
+
+
+def _dia(n):
+    return INICIO + datetime.timedelta(days=n)
+
+
+class _BancoFalso:
+    """Emula, em memória, os comandos usados por `_processar_empresa`."""
+
+    def __init__(self):
+        self.registros = []  # (id_registro, id_usuario, data, estresse, motivacao, sono)
+        self.baselines = {}
+        self.anomalias = {}
+
+    def inserir(self, id_registro, id_usuario, data, estresse, motivacao, sono):
+        self.registros.append((id_registro, id_usuario, data, estresse, motivacao, sono))
+
+    @staticmethod
+    def _hash(registro):
+        return hash(registro) % 2**32
+
+    def _alterados(self, _params):
+        alterados = []
+        for id_usuario, bl in self.baselines.items():
+            ate = [
+                r for r in self.registros
+                if r[1] == id_usuario and bl['marca_data'] is not None
+                and r[2] <= bl['marca_data']
+            ]
+            if (
+                bl['marca_data'] is None
+                or len(ate) != bl['registros']
+                or sum(self._hash(r) for r in ate) != bl['checksum']
+            ):
+                alterados.append((id_usuario,))
+        return alterados
+
+    def _novos(self, params):
+        linhas = []
+        for r in self.registros:
+            bl = self.baselines.get(r[1])
+            if r[2] > params['corte']:
+                continue
+            if bl is not None and r[2] <= bl['marca_data']:
+                continue
+            segundos = (r[2] - datetime.datetime(1970, 1, 1)).total_seconds()
+            linhas.append((r[1], r[0], segundos, *r[3:], self._hash(r)))
+        return linhas
+
+    def _linhas_de_base(self, _params):
+        return [
+            (id_usuario, bl['registros'], *bl['media'], *bl['var'])
+            for id_usuario, bl in self.baselines.items()
+        ]
+
+    def executar(self, sql, params):
+        consultas = {
+            anomalias._SQL_ALTERADOS: self._alterados,
+            anomalias._SQL_NOVOS: self._novos,
+            anomalias._SQL_BASELINES: self._linhas_de_base,
+        }
+        return consultas[sql](params)
+
+    def executar_varios(self, sql, linhas):
+        for p in linhas:
+            if sql == anomalias._DELETE_USUARIO.format(tabela='baseline_bem_estar'):
+                self.baselines.pop(p['id_usuario'], None)
+            elif sql == anomalias._DELETE_USUARIO.format(tabela='anomalias_bem_estar'):
+                for id_registro in [
+                    k for k, v in self.anomalias.items() if v == p['id_usuario']
+                ]:
+                    del self.anomalias[id_registro]
+            elif sql == anomalias._MERGE_BASELINE:
+                anterior = self.baselines.get(p['id_usuario'], {'checksum': 0})
+                self.baselines[p['id_usuario']] = {
+                    'marca_data': p['marca_data'],
+                    'registros': p['registros'],
+                    'checksum': anterior['checksum'] + p['checksum'],
+                    'media': [p[f'media_{m}'] for m in anomalias._METRICAS],
+                    'var': [p[f'var_{m}'] for m in anomalias._METRICAS],
+                }
+            elif sql == anomalias._INSERT_ANOMALIA:
+                usuario = next(r[1] for r in self.registros if r[0] == p['id_registro'])
+                self.anomalias[p['id_registro']] = usuario
+            else:
+                raise AssertionError(f'comando inesperado: {sql}')
+
+
+class _CursorFalso:
+    def __init__(self, banco):
+        self.banco = banco
+        self.arraysize = 100
+        self.outputtypehandler = None
+        self.rowfactory = None
+        self.description = None
+        self.statement = None
+        self._linhas = []
+
+    def execute(self, sql, params=None):
+        self.statement = sql
+        self._linhas = self.banco.executar(sql, params)
+        self.description = [('c',)] * (len(self._linhas[0]) if self._linhas else 1)
+
+    def executemany(self, sql, linhas):
+        self.banco.executar_varios(sql, linhas)
+
+    def fetchmany(self):
+        lote, self._linhas = self._linhas[: self.arraysize], self._linhas[self.arraysize :]
+        return lote
+
+    def close(self):
+        pass
+
+
+class _ConexaoFalsa:
+    def __init__(self, banco):
+        self.banco = banco
+
+    def cursor(self):
+        return _CursorFalso(self.banco)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    banco = _BancoFalso()
+    monkeypatch.setattr(anomalias, '_connect', lambda conn_info=None: _ConexaoFalsa(banco))
+    return banco
+
+
+def _processar(corte):
+    resultado = anomalias._processar_empresa(1, None, CONFIG, False, corte)
+    assert 'erro' not in resultado, resultado
+    return resultado
+
+
+def _esperado(registros):
+    """Linha de base calculada de uma vez, com os registros em ordem cronológica."""
+    novos = np.array(
+        [
+            (r[1], r[0], (r[2] - INICIO).total_seconds(), *r[3:])
+            for r in registros
+        ],
+        dtype=np.float64,
+    )
+    atualizadas, _ = anomalias.atualizar_baselines(novos, np.empty((0, 8)), CONFIG)
+    return atualizadas[0]
+
+
+def test_ewma_processa_registros_em_ordem_cronologica():
+    novos = np.array(
+        [
+            (1, 2, 200.0, 8, 2, 5),
+            (1, 1, 100.0, 2, 8, 5),
+        ]
+    )
+    atualizadas, encontradas = anomalias.atualizar_baselines(
+        novos, np.empty((0, 8)), CONFIG
+    )
+    id_usuario, marca, registros = atualizadas[0, :3]
+    assert (id_usuario, marca, registros) == (1, 2, 2)
+    # média: primeiro 2 (registro 1), depois 2 + 0.5 * (8 - 2)
+    assert atualizadas[0, 3] == pytest.approx(5.0)
+    assert atualizadas[0, 6] == pytest.approx(0.5 * (0 + 6 * 3))
+    assert len(encontradas) == 0
+
+
+def test_ewma_continua_da_linha_de_base_e_marca_anomalia():
+    baselines = np.array([(1, 10, 5.0, 5.0, 5.0, 0.0, 0.0, 0.0)])
+    novos = np.array([(1, 20, 0.0, 10, 5, 5)])
+    atualizadas, encontradas = anomalias.atualizar_baselines(novos, baselines, CONFIG)
+    assert atualizadas[0, 2] == 11
+    assert atualizadas[0, 3] == pytest.approx(7.5)
+    # desvio mínimo: z = (10 - 5) / DESVIO_MINIMO
+    assert encontradas.tolist() == [[20, 1, 10.0, 0.0, 0.0]]
+
+
+def test_registro_fora_de_ordem_abaixo_da_marca_recalcula_o_usuario(banco):
+    banco.inserir(1, 1, _dia(1), 2, 8, 5)
+    banco.inserir(2, 1, _dia(3), 4, 6, 5)
+    banco.inserir(3, 1, _dia(5), 3, 7, 6)
+    assert _processar(_dia(10))['registros'] == 3
+
+    # Confirmado depois, com id maior mas data anterior à marca
+    banco.inserir(4, 1, _dia(2), 9, 1, 2)
+    resultado = _processar(_dia(11))
+    assert resultado['recalculados'] == 1
+    assert resultado['registros'] == 4
+
+    bl = banco.baselines[1]
+    esperado = _esperado(sorted(banco.registros, key=lambda r: r[2]))
+    assert bl['registros'] == 4
+    assert bl['media'] == pytest.approx(esperado[3:6].tolist())
+    assert bl['var'] == pytest.approx(esperado[6:9].tolist())
+
+
+def test_registro_dentro_da_janela_fica_para_a_proxima_execucao(banco):
+    banco.inserir(1, 1, _dia(1), 2, 8, 5)
+    banco.inserir(3, 1, _dia(5), 3, 7, 6)
+    # Corte antes do registro 3: ele fica acima da marca
+    assert _processar(_dia(4))['registros'] == 1
+
+    # Registro com id menor confirmado com atraso, ainda acima da marca
+    banco.inserir(2, 1, _dia(4.5), 4, 6, 5)
+    resultado = _processar(_dia(10))
+    assert resultado == {**resultado, 'registros': 2, 'recalculados': 0}
+
+    esperado = _esperado(sorted(banco.registros, key=lambda r: r[2]))
+    assert banco.baselines[1]['media'] == pytest.approx(esperado[3:6].tolist())
+
+
+def test_registro_alterado_abaixo_da_marca_recalcula_o_usuario(banco):
+    banco.inserir(1, 1, _dia(1), 2, 8, 5)
+    banco.inserir(2, 1, _dia(2), 4, 6, 5)
+    _processar(_dia(10))
+
+    banco.registros[0] = (1, 1, _dia(1), 7, 3, 5)
+    resultado = _processar(_dia(11))
+    assert resultado['recalculados'] == 1
+
+    esperado = _esperado(banco.registros)
+    assert banco.baselines[1]['media'] == pytest.approx(esperado[3:6].tolist())
@@ -0,0 +1,103 @@
+"""Testes da máquina de estados do disjuntor do banco."""
+
+import types
+
+import pytest
+
+from src.services import disjuntor as modulo
+from src.services.disjuntor import ABERTO, FECHADO, MEIO_ABERTO, Disjuntor
+from src.services.exceptions import CircuitoAberto
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self):
+        return self.agora
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(modulo, 'time', types.SimpleNamespace(monotonic=relogio.monotonic))
+    return relogio
+
+
+@pytest.fixture
+def aberto(relogio):
+    d = Disjuntor(falhas=3, aberto=30.0)
+    for _ in range(3):
+        d.falha()
+    assert d.estado == ABERTO
+    return d
+
+
+def test_abre_apos_falhas_consecutivas(relogio):
+    d = Disjuntor(falhas=3, aberto=30.0)
+    d.falha()
+    d.falha()
+    d.sucesso()  # sucesso zera a contagem
+    d.falha()
+    d.falha()
+    assert d.estado == FECHADO
+    assert d.permitir() is False
+    d.falha()
+    assert d.estado == ABERTO
+
+
+def test_aberto_rejeita_ate_o_fim_do_prazo(relogio, aberto):
+    relogio.avancar(10)
+    with pytest.raises(CircuitoAberto, match='nova tentativa em 20s'):
+        aberto.permitir()
+    assert aberto.segundos_para_teste() == pytest.approx(20.0)
+
+
+def test_meio_aberto_libera_um_unico_teste(relogio, aberto):
+    relogio.avancar(30)
+    assert aberto.permitir() is True
+    assert aberto.estado == MEIO_ABERTO
+    with pytest.raises(CircuitoAberto):
+        aberto.permitir()
+
+
+def test_teste_com_sucesso_fecha(relogio, aberto):
+    relogio.avancar(30)
+    aberto.permitir()
+    aberto.sucesso()
+    assert aberto.estado == FECHADO
+    assert aberto.permitir() is False
+    # A contagem recomeça do zero
+    aberto.falha()
+    assert aberto.estado == FECHADO
+
+
+def test_teste_com_falha_reabre(relogio, aberto):
+    relogio.avancar(30)
+    aberto.permitir()
+    aberto.falha()
+    assert aberto.estado == ABERTO
+    relogio.avancar(29)
+    with pytest.raises(CircuitoAberto):
+        aberto.permitir()
+    relogio.avancar(1)
+    assert aberto.permitir() is True
+
+
+def test_teste_sem_resposta_libera_outro(relogio, aberto):
+    relogio.avancar(30)
+    assert aberto.permitir() is True
+    relogio.avancar(30)
+    assert aberto.permitir() is True
+    assert aberto.estado == MEIO_ABERTO
+
+
+def test_desligado_nunca_abre(relogio):
+    d = Disjuntor(falhas=0, aberto=30.0)
+    for _ in range(10):
+        d.falha()
+    assert d.estado == FECHADO
+    assert d.permitir() is False
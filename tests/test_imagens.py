@@ -0,0 +1,112 @@
+"""Testes das respostas de imagens (ETag, Range e liberação da conexão)."""
+
+import pytest
+from flask import Flask
+
+from src.api import imagens
+
+ETAG = 'trilha-1-20240101000000000000-10'
+DADOS = b'0123456789'
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def _responder(app, headers=None, ao_fechar=None):
+    with app.test_request_context('/', headers=headers or {}):
+        return imagens._responder(
+            ETAG, 'image/png', 'capa.png', len(DADOS), imagens._fatias(DADOS), ao_fechar
+        )
+
+
+def test_imagem_inteira(app):
+    response = _responder(app)
+    assert response.status_code == 200
+    assert response.get_data() == DADOS
+    assert response.headers['Content-Length'] == '10'
+    assert response.headers['ETag'] == f'"{ETAG}"'
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Disposition'] == 'inline; filename=capa.png'
+    assert response.mimetype == 'image/png'
+
+
+def test_if_none_match_retorna_304(app):
+    fechadas = []
+    response = _responder(
+        app, {'If-None-Match': f'"{ETAG}"'}, lambda: fechadas.append(True)
+    )
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == f'"{ETAG}"'
+    # Sem corpo: a conexão é liberada na hora
+    assert fechadas == [True]
+
+
+@pytest.mark.parametrize(
+    'faixa, inicio, fim',
+    [('bytes=2-5', 2, 6), ('bytes=7-', 7, 10), ('bytes=-3', 7, 10), ('bytes=8-99', 8, 10)],
+)
+def test_range_retorna_206(app, faixa, inicio, fim):
+    response = _responder(app, {'Range': faixa})
+    assert response.status_code == 206
+    assert response.get_data() == DADOS[inicio:fim]
+    assert response.headers['Content-Length'] == str(fim - inicio)
+    assert response.headers['Content-Range'] == f'bytes {inicio}-{fim - 1}/10'
+
+
+def test_range_fora_do_tamanho_retorna_416(app):
+    fechadas = []
+    response = _responder(app, {'Range': 'bytes=10-20'}, lambda: fechadas.append(True))
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */10'
+    assert fechadas == [True]
+
+
+@pytest.mark.parametrize(
+    'headers',
+    [
+        {'Range': 'bytes=0-1,4-5'},  # várias faixas: imagem inteira
+        {'Range': 'bytes=2-5', 'If-Range': '"outra-versao"'},
+        {'Range': 'bytes=2-5', 'If-Range': 'Wed, 21 Oct 2015 07:28:00 GMT'},
+    ],
+)
+def test_range_ignorado_retorna_200(app, headers):
+    response = _responder(app, headers)
+    assert response.status_code == 200
+    assert response.get_data() == DADOS
+
+
+def test_if_range_com_etag_atual_retorna_206(app):
+    response = _responder(app, {'Range': 'bytes=2-5', 'If-Range': f'"{ETAG}"'})
+    assert response.status_code == 206
+    assert response.get_data() == b'2345'
+
+
+class _LobFalso:
+    def __init__(self, dados: bytes):
+        self.dados = dados
+        self.leituras = []
+
+    def getchunksize(self):
+        return 4
+
+    def read(self, offset: int, amount: int):
+        self.leituras.append((offset, amount))
+        return self.dados[offset - 1 : offset - 1 + amount]
+
+
+def test_copia_do_lob_libera_a_conexao_antes_do_envio(app):
+    lob = _LobFalso(DADOS * 3)
+    fechadas = []
+    corpo, descartar = imagens._copiar_lob(lob, 8, lambda: fechadas.append(True))
+    with app.test_request_context('/', headers={'Range': 'bytes=5-24'}):
+        response = imagens._responder(ETAG, None, None, len(lob.dados), corpo, descartar)
+    # O LOB foi copiado (e a conexão liberada) ao montar a resposta
+    assert fechadas == [True]
+    assert lob.leituras == [(6, 8), (14, 8), (22, 4)]
+    assert response.status_code == 206
+    assert response.get_data() == (DADOS * 3)[5:25]
+    response.close()
+    assert fechadas == [True, True]
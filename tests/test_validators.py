@@ -0,0 +1,110 @@
+"""Testes da validação de datas e do lote de usuários."""
+
+from datetime import date
+
+import pytest
+
+from src.utils import validators
+from src.utils.validators import parse_date_fast, validate_usuarios_batch
+
+VALIDO = {
+    'nome_completo': '  Ana Souza ',
+    'email': 'ana@empresa.com',
+    'data_nascimento': '31/12/1990',
+    'nivel_carreira': 'Pleno',
+    'ocupacao': 'Analista',
+    'genero': 'Feminino',
+    'id_empresa': '3',
+    'is_admin': 'Sim',
+}
+
+
+@pytest.mark.parametrize(
+    'texto, esperado',
+    [
+        ('31/12/1990', date(1990, 12, 31)),
+        ('1990-12-31', date(1990, 12, 31)),
+        # Sem zeros à esquerda: recorre ao strptime
+        ('1/2/1990', date(1990, 2, 1)),
+        ('1990-2-1', date(1990, 2, 1)),
+        ('31/02/1990', None),
+        ('1990-13-01', None),
+        ('1990/12/31', None),
+        ('3a/12/1990', None),
+        ('', None),
+    ],
+)
+def test_parse_date_fast(texto, esperado):
+    assert parse_date_fast(texto) == esperado
+
+
+def test_lote_normaliza_linha_valida():
+    [(valores, erros)] = validate_usuarios_batch([VALIDO])
+    assert erros == []
+    assert valores == {
+        'nome_completo': 'Ana Souza',
+        'nivel_carreira': 'Pleno',
+        'ocupacao': 'Analista',
+        'genero': 'Feminino',
+        'email': 'ana@empresa.com',
+        'data_nascimento': date(1990, 12, 31),
+        'id_empresa': 3,
+        'is_admin': 1,
+    }
+
+
+def test_lote_aplica_padroes_dos_campos_opcionais():
+    linha = {
+        'nome_completo': 'Ana',
+        'email': 'ana@empresa.com',
+        'data_nascimento': '1990-12-31',
+        'ocupacao': None,
+    }
+    [(valores, erros)] = validate_usuarios_batch([linha])
+    assert erros == []
+    assert valores['nivel_carreira'] == 'Não especificado'
+    assert valores['ocupacao'] == 'Não especificado'
+    assert valores['id_empresa'] is None
+    assert valores['is_admin'] == 0
+
+
+def test_lote_reporta_erros_por_linha():
+    invalida = {
+        'nome_completo': '',
+        'email': 'sem-arroba',
+        'data_nascimento': '01/01/1800',
+        'genero': 'x' * (validators.MAX_GENERO + 1),
+        'id_empresa': '3a',
+    }
+    resultado = validate_usuarios_batch([VALIDO, invalida, {**VALIDO, 'data_nascimento': ''}])
+    assert [erros for _, erros in resultado] == [
+        [],
+        [
+            'Nome completo não pode ser vazio',
+            f'Gênero muito longo (máximo {validators.MAX_GENERO} caracteres)',
+            'Formato de email inválido',
+            'Ano de nascimento não pode ser anterior a 1900.',
+            'ID da empresa inválido (deve ser numérico)',
+        ],
+        ['Data de nascimento é obrigatória'],
+    ]
+    valores = resultado[1][0]
+    assert valores['nome_completo'] is None
+    assert valores['genero'] is None
+    assert valores['email'] is None
+    assert valores['data_nascimento'] is None
+    assert valores['id_empresa'] is None
+
+
+@pytest.mark.parametrize(
+    'data',
+    ['31/12/1990', '1990-12-31', '1/2/1990', '31/02/1990', '01/01/1899', '31/12/2999'],
+)
+def test_lote_concorda_com_validadores_escalares(data):
+    [(valores, erros)] = validate_usuarios_batch([{**VALIDO, 'data_nascimento': data}])
+    esperado, erro = validators.validate_date(data, required=True)
+    assert valores['data_nascimento'] == esperado
+    assert erros == ([erro] if erro else [])
+
+    email, erro_email = validators.validate_email(VALIDO['email'])
+    assert valores['email'] == email and erro_email is None